@@ -0,0 +1,82 @@
+"""
+Direct Postgres access for hot read paths.
+
+Vector search through PostgREST JSON-encodes every query embedding, re-parses
+it server-side and adds an HTTP hop. When DATABASE_URL is set (and asyncpg /
+pgvector are installed) queries go straight to Postgres over a pooled
+connection, with vectors sent in pgvector's binary format. Without it,
+get_pg_pool() returns None and callers fall back to Supabase RPC.
+
+Use the direct connection or the session-mode pooler (port 5432): the
+transaction-mode pooler does not support the prepared statements asyncpg
+caches per connection.
+"""
+
+import asyncio
+import logging
+from typing import Any, Optional
+
+from config.settings import settings
+
+try:
+    import asyncpg
+    from pgvector.asyncpg import register_vector
+except ImportError:  # optional dependencies
+    asyncpg = None
+    register_vector = None
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[Any] = None
+_pool_lock: Optional[asyncio.Lock] = None
+_pool_failed = False
+
+
+async def _init_connection(conn: Any) -> None:
+    """Register the pgvector codec in whichever schema holds the extension"""
+    schema = await conn.fetchval(
+        "SELECT n.nspname FROM pg_type t "
+        "JOIN pg_namespace n ON n.oid = t.typnamespace "
+        "WHERE t.typname = 'vector' LIMIT 1"
+    )
+    await register_vector(conn, schema=schema or "public")
+
+
+async def get_pg_pool() -> Optional[Any]:
+    """Get the shared asyncpg pool, creating it on first use
+
+    Returns:
+        asyncpg Pool, or None when direct access is not configured, the
+        drivers are not installed, or the pool could not be created
+    """
+    global _pool, _pool_lock, _pool_failed
+    if _pool is not None:
+        return _pool
+    if not settings.database_url or asyncpg is None or _pool_failed:
+        return None
+
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None and not _pool_failed:
+            try:
+                _pool = await asyncpg.create_pool(
+                    settings.database_url,
+                    min_size=settings.database_pool_min_size,
+                    max_size=settings.database_pool_max_size,
+                    init=_init_connection,
+                )
+                logger.info("Postgres pool initialized")
+            except Exception as e:
+                # Don't retry on every query; RPC fallback keeps serving
+                _pool_failed = True
+                logger.error(f"Failed to initialize Postgres pool, using Supabase RPC: {str(e)}")
+    return _pool
+
+
+async def close_pg_pool() -> None:
+    """Close the shared pool (called on application shutdown)"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -25,6 +25,9 @@ class Settings(BaseSettings):
     
     # Rate Limiting
     rate_limit_per_minute: int = Field(default=60, env="RATE_LIMIT_PER_MINUTE")
+    # Counters live in-process; sync them to the DB so replicas share a budget
+    # (disable for single-process deployments)
+    rate_limit_db_sync: bool = Field(default=True, env="RATE_LIMIT_DB_SYNC")
     
     # Logging
     log_level: str = Field(default="INFO", env="LOG_LEVEL")
@@ -51,6 +54,11 @@ class Settings(BaseSettings):
                 
         return origins
 
+    # Direct Postgres connection for vector search (optional, falls back to Supabase RPC)
+    database_url: Optional[str] = Field(default=None, env="DATABASE_URL")
+    database_pool_min_size: int = Field(default=4, env="DATABASE_POOL_MIN_SIZE")
+    database_pool_max_size: int = Field(default=32, env="DATABASE_POOL_MAX_SIZE")
+
     # Embeddings
     embedding_preferred: str = Field(default="openai", env="EMBEDDING_PREFERRED")
     embedding_dimension: int = Field(default=1536, env="EMBEDDING_DIMENSION")
@@ -61,6 +69,8 @@ class Settings(BaseSettings):
     gemini_api_key: Optional[str] = Field(default=None, env="GEMINI_API_KEY")
     # Embedding batching
     embedding_batch_size: int = Field(default=64, env="EMBEDDING_BATCH_SIZE")
+    # Max batches embedded/written concurrently per source (keep within provider RPM)
+    embedding_max_concurrency: int = Field(default=4, env="EMBEDDING_MAX_CONCURRENCY")
 
     # Crawler settings
     crawler_render_js: bool = Field(default=True, env="CRAWLER_RENDER_JS")
@@ -72,6 +82,8 @@ class Settings(BaseSettings):
     llm_preferred: str = Field(default="gemini", env="LLM_PREFERRED")
     openai_chat_model: str = Field(default="gpt-4o-mini", env="OPENAI_CHAT_MODEL")
     gemini_chat_model: str = Field(default="gemini-2.5-flash", env="GEMINI_CHAT_MODEL")
+    # Upper bound on retrieved context sent to the LLM (characters, ~4 per token)
+    rag_max_context_chars: int = Field(default=24000, env="RAG_MAX_CONTEXT_CHARS")
     
     class Config:
         env_file = ".env"
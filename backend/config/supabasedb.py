@@ -1,9 +1,19 @@
 import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+import httpx
 from supabase import create_client, Client
+from postgrest.utils import SyncClient
 import dotenv
-from typing import Optional
+from typing import Any, Iterator, Optional
 import logging
 
+from core.cache import TTLCache
+
 dotenv.load_dotenv()
 
 # Logger will be configured by setup_logging() in main.py
@@ -11,10 +21,171 @@ dotenv.load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+_ORJSON_DUMP_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+)
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Encode a PostgREST payload; orjson also handles numpy vectors directly"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_DUMP_OPTIONS)
+        except TypeError:
+            pass
+    return json.dumps(obj).encode("utf-8")
+
+
+class _FastJsonResponse(httpx.Response):
+    """Response whose json() decodes with orjson (PostgREST sessions only)"""
+
+    def json(self, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().json(**kwargs)
+        return orjson.loads(self.content)
+
+
+# HTTP tuning for PostgREST traffic. The default session has a single flat
+# timeout and no connect retries, so a dead keep-alive socket after a network
+# blip stalls the next request for the full timeout.
+# POSTGREST_TIMEOUT suits request-path reads and writes; analytics RPCs, bulk
+# ingestion writes and cleanup run under long_postgrest_timeout() instead.
+POSTGREST_TIMEOUT = httpx.Timeout(connect=2.0, read=10.0, write=5.0, pool=5.0)
+POSTGREST_LONG_TIMEOUT = httpx.Timeout(connect=2.0, read=120.0, write=60.0, pool=10.0)
+POSTGREST_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0)
+POSTGREST_CONNECT_RETRIES = 2
+# Cached clients are rebuilt after this many seconds (pool_recycle equivalent)
+CLIENT_RECYCLE_SECONDS = 1800
+
+try:
+    import h2  # noqa: F401
+    POSTGREST_HTTP2 = True
+except ImportError:
+    POSTGREST_HTTP2 = False
+
+
+class _SharedTransport(httpx.HTTPTransport):
+    """Process-wide transport whose pool outlives any single client.
+
+    Per-user clients are built on every request; closing one (explicitly or
+    via a context manager) must not tear down connections other clients are
+    still using.
+    """
+
+    def close(self) -> None:
+        pass
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        """Close the pool's connections (only when the transport is recycled)"""
+        super().close()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = super().handle_request(request)
+        return _FastJsonResponse(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=response.stream,
+            extensions=response.extensions,
+        )
+
+
+# Per-call timeout override for PostgREST requests made in the current context
+_request_timeout: ContextVar[Optional[httpx.Timeout]] = ContextVar("postgrest_request_timeout", default=None)
+
+
+@contextmanager
+def long_postgrest_timeout(timeout: httpx.Timeout = POSTGREST_LONG_TIMEOUT) -> Iterator[None]:
+    """Use a longer timeout for PostgREST calls made inside the block
+
+    Also usable as a decorator, for methods that run heavy queries
+    (aggregation RPCs, bulk inserts, cleanup).
+    """
+    token = _request_timeout.set(timeout)
+    try:
+        yield
+    finally:
+        _request_timeout.reset(token)
+
+
+class _PostgrestSession(SyncClient):
+    """PostgREST session that encodes JSON bodies with orjson
+
+    Also applies the long_postgrest_timeout() override, if one is active.
+
+    Scoped to PostgREST: other httpx users (LLM and embedding SDKs) keep
+    httpx's own JSON handling.
+    """
+
+    def build_request(self, method: str, url: Any, *, json: Any = None, **kwargs: Any) -> httpx.Request:
+        timeout = _request_timeout.get()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        if json is None or any(kwargs.get(k) is not None for k in ("content", "data", "files")):
+            return super().build_request(method, url, json=json, **kwargs)
+        kwargs.pop("content", None)
+        request = super().build_request(method, url, content=_dumps_json(json), **kwargs)
+        request.headers["Content-Type"] = "application/json"
+        return request
+
+
+def _new_postgrest_transport() -> _SharedTransport:
+    return _SharedTransport(
+        retries=POSTGREST_CONNECT_RETRIES,
+        limits=POSTGREST_LIMITS,
+        http2=POSTGREST_HTTP2,
+    )
+
+
+# One connection pool for all PostgREST sessions: the service client and the
+# per-request user clients reuse the same keep-alive (and TLS) connections
+_postgrest_transport = _new_postgrest_transport()
+# Pool replaced by the last recycle; clients built on it may still be
+# mid-request, so it is only closed at the following recycle
+_retired_transport: Optional[_SharedTransport] = None
+_recycle_lock = threading.Lock()
+
+
+def _recycle_postgrest_transport() -> None:
+    """Move new PostgREST sessions onto a fresh connection pool"""
+    global _postgrest_transport, _retired_transport
+    if _retired_transport is not None:
+        _retired_transport.shutdown()
+    _retired_transport = _postgrest_transport
+    _postgrest_transport = _new_postgrest_transport()
+    # Cached user clients hold sessions on the old pool; rebuild them on demand
+    _user_clients.clear()
+
+
+def _configure_postgrest_session(client: Client) -> None:
+    """Replace the client's PostgREST session with one on the shared pool.
+
+    Base URL and headers are carried over from the session postgrest-py built,
+    so auth and schema headers set by supabase-py are preserved.
+    """
+    postgrest = client.postgrest
+    session = postgrest.session
+    postgrest.session = _PostgrestSession(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=POSTGREST_TIMEOUT,
+        transport=_postgrest_transport,
+    )
+    session.close()
+
+
 class DatabaseManager:
     """Singleton pattern for database connection management"""
     _instance: Optional['DatabaseManager'] = None
     _client: Optional[Client] = None
+    _client_created_at: float = 0.0
     
     def __new__(cls):
         if cls._instance is None:
@@ -24,6 +195,15 @@ class DatabaseManager:
     # Right now using ANON key, if client req service key we need to update this with proper env of service key, but this works for user related queries
     def get_client(self) -> Client:
         """Get or create Supabase client with connection pooling"""
+        if self._client is not None and time.monotonic() - self._client_created_at > CLIENT_RECYCLE_SECONDS:
+            with _recycle_lock:
+                if self._client is not None and time.monotonic() - self._client_created_at > CLIENT_RECYCLE_SECONDS:
+                    # Swap in a fresh client and connection pool instead of reusing
+                    # sockets that may have gone stale. The old pool is not closed
+                    # here: requests already running on other threads may still use it.
+                    logger.info(f"Recycling Supabase client and connection pool after {CLIENT_RECYCLE_SECONDS}s")
+                    _recycle_postgrest_transport()
+                    self._client = None
         if self._client is None:
             try:
                 url: str = os.environ.get("SUPABASE_URL")
@@ -32,7 +212,10 @@ class DatabaseManager:
                 if not url or not key:
                     raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set in environment variables")
                 
-                self._client = create_client(url, key)
+                client = create_client(url, key)
+                _configure_postgrest_session(client)
+                self._client = client
+                self._client_created_at = time.monotonic()
                 logger.info("Supabase client initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize Supabase client: {str(e)}")
@@ -49,6 +232,13 @@ class DatabaseManager:
 db_manager = DatabaseManager()
 _service_role_warning_emitted = False
 
+# Per-user (RLS) clients, keyed by a digest of the access token. Building a
+# client sets up auth, storage and PostgREST sub-clients; a user's requests
+# within the TTL reuse it. Connections are pooled by the shared transport
+# regardless. Keep the TTL well under the JWT lifetime.
+USER_CLIENT_TTL_SECONDS = 300
+_user_clients = TTLCache(maxsize=256, ttl=USER_CLIENT_TTL_SECONDS)
+
 
 def get_supabase_client(access_token: Optional[str] = None, use_service_role: bool = False) -> Client:
     """Get the Supabase client with proper error handling
@@ -102,8 +292,14 @@ def get_supabase_client(access_token: Optional[str] = None, use_service_role: bo
                 "Service role key (SUPABASE_SERVICE_KEY) bypasses RLS and should not be used for user operations."
             )
         
+        cache_key = hashlib.sha256(access_token.encode("utf-8")).digest()
+        client = _user_clients.get(cache_key)
+        if client is not None:
+            return client
+
         # Create client with anon key
         client = create_client(url, anon_key)
+        _configure_postgrest_session(client)
         
         # Set the user's access token for RLS
         # The Supabase Python client uses postgrest for database queries
@@ -156,6 +352,7 @@ def get_supabase_client(access_token: Optional[str] = None, use_service_role: bo
                     "apikey": anon_key
                 })
         
+        _user_clients.set(cache_key, client)
         return client
     except Exception as e:
         logger.error(f"Database connection error: {str(e)}")
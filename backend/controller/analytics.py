@@ -253,25 +253,24 @@ async def get_analytics_overview(
         analytics_tier = user_plan.get("analytics_tier", "basic")
         
         analytics = AnalyticsService(access_token=access_token)
-        summary = analytics.get_summary_stats(bot_id, str(user_id), access_token=access_token, days=days or 30)
-        usage = analytics.get_usage_over_time(bot_id, str(user_id), access_token=access_token, days=days or 30)
-        
-        # Only include advanced analytics if user has full tier
-        if analytics_tier == "full":
-            top_queries = analytics.get_top_queries(bot_id, str(user_id), access_token=access_token, limit=top_limit or 10, days=days or 30)
-            unanswered = analytics.get_unanswered_queries(bot_id, str(user_id), access_token=access_token, limit=unanswered_limit or 20, days=days or 30)
-        else:
-            # Basic tier: return empty arrays
-            top_queries = []
-            unanswered = []
+        # Only include advanced analytics if user has full tier (basic tier gets empty arrays)
+        dashboard = await analytics.get_dashboard(
+            bot_id,
+            str(user_id),
+            access_token=access_token,
+            days=days or 30,
+            top_limit=top_limit or 10,
+            unanswered_limit=unanswered_limit or 20,
+            include_advanced=analytics_tier == "full",
+        )
 
         return {
             "status": "success",
             "data": {
-                "summary": summary,
-                "top_queries": top_queries,
-                "unanswered": unanswered,
-                "usage": usage,
+                "summary": dashboard["summary"],
+                "top_queries": dashboard["top_queries"],
+                "unanswered": dashboard["unanswered"],
+                "usage": dashboard["usage"],
                 "analytics_tier": analytics_tier,
             },
             "message": f"Analytics overview for the last {days} days",
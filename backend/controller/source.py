@@ -494,14 +494,15 @@ async def delete_source(
 
 
 # Background task function for parsing
-def _parse_source_background(
+async def _parse_source_background(
     source_id: UUID,
     bot_id: UUID,
     access_token: Optional[str] = None
 ):
     """
     Background task to parse a source document.
-    This runs asynchronously after the upload response is sent.
+    This runs on the event loop after the upload response is sent; blocking
+    stages of the pipeline are offloaded by ParsingService.
     
     Args:
         source_id: Source UUID to parse
@@ -510,7 +511,7 @@ def _parse_source_background(
     """
     try:
         parsing_service = ParsingService(access_token=access_token)
-        success = parsing_service.parse_source(source_id, bot_id)
+        success = await parsing_service.parse_source(source_id, bot_id)
         
         if success:
             logger.info(f"Background parsing completed: source_id={source_id}, bot_id={bot_id}")
@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+import numpy as np
+
+
+class TTLCache:
+    """Thread-safe in-process cache with per-entry expiry and LRU eviction
+
+    Used for short-lived memoization of hot lookups (authorization checks,
+    bot rows, tokens). Entries are evicted lazily on access, or oldest-first
+    once maxsize is reached.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, optionally overriding the default TTL"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Remove a key and return its value (expired or not)"""
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class _VectorRing:
+    """Ring of unit vectors with parallel values and expiry times
+
+    Storage starts small and doubles up to capacity, so rarely-queried keys
+    don't each reserve a full capacity x dimension matrix.
+    """
+
+    __slots__ = ("capacity", "vectors", "values", "expires", "size", "next")
+
+    def __init__(self, capacity: int, dimension: int):
+        self.capacity = capacity
+        initial = min(capacity, 8)
+        self.vectors = np.zeros((initial, dimension), dtype=np.float32)
+        self.values: list = [None] * initial
+        self.expires = np.zeros(initial, dtype=np.float64)
+        self.size = 0
+        self.next = 0
+
+    def append(self, unit: np.ndarray, value: Any, expires_at: float) -> None:
+        allocated = self.vectors.shape[0]
+        if self.size == allocated and allocated < self.capacity:
+            grown = min(allocated * 2, self.capacity)
+            self.vectors = np.concatenate(
+                [self.vectors, np.zeros((grown - allocated, self.vectors.shape[1]), dtype=np.float32)]
+            )
+            self.values.extend([None] * (grown - allocated))
+            self.expires = np.concatenate([self.expires, np.zeros(grown - allocated)])
+        slot = self.next
+        self.vectors[slot] = unit
+        self.values[slot] = value
+        self.expires[slot] = expires_at
+        self.size = min(self.size + 1, self.capacity)
+        self.next = (slot + 1) % self.capacity
+
+
+class SemanticCache:
+    """Thread-safe nearest-neighbour cache keyed by embedding similarity
+
+    Each key (e.g. bot id + retrieval parameters) holds a ring buffer of
+    L2-normalized vectors in one contiguous float32 matrix, so a lookup is a
+    single matrix-vector product. A lookup hits when the best cosine
+    similarity among unexpired entries reaches the threshold. Keys are
+    evicted least-recently-used once max_keys is reached.
+    """
+
+    def __init__(self, capacity: int = 256, threshold: float = 0.95, ttl: float = 300.0, max_keys: int = 1024):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._rings: "OrderedDict[Hashable, _VectorRing]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> Optional[np.ndarray]:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def get(self, key: Hashable, vector: np.ndarray, default: Optional[Any] = None) -> Any:
+        """Return the value stored for the most similar vector under key, or default"""
+        unit = self._normalize(vector)
+        if unit is None:
+            return default
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None or ring.size == 0 or ring.vectors.shape[1] != unit.shape[0]:
+                return default
+            self._rings.move_to_end(key)
+            sims = ring.vectors[: ring.size] @ unit
+            sims[ring.expires[: ring.size] <= time.monotonic()] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return default
+            return ring.values[best]
+
+    def set(self, key: Hashable, vector: np.ndarray, value: Any) -> None:
+        """Store a value for vector under key, overwriting the oldest entry when full"""
+        unit = self._normalize(vector)
+        if unit is None:
+            return
+        with self._lock:
+            ring = self._rings.get(key)
+            if ring is None or ring.vectors.shape[1] != unit.shape[0]:
+                ring = _VectorRing(self.capacity, unit.shape[0])
+                self._rings[key] = ring
+            self._rings.move_to_end(key)
+            ring.append(unit, value, time.monotonic() + self.ttl)
+            while len(self._rings) > self.max_keys:
+                self._rings.popitem(last=False)
+
+    def invalidate(self, prefix: Hashable) -> None:
+        """Drop every key that is prefix itself or a tuple starting with it"""
+        with self._lock:
+            stale = [
+                key for key in self._rings
+                if key == prefix or (isinstance(key, tuple) and key and key[0] == prefix)
+            ]
+            for key in stale:
+                del self._rings[key]
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._rings.clear()
+
+
+_MISSING = object()
@@ -17,6 +17,9 @@ from core.logging import setup_logging
 from middleware.rate_limit import rate_limit_middleware
 from middleware.widget_query_cors import WidgetQueryCORSMiddleware
 from services.rate_limit_service import rate_limit_service
+from services.parsing_service import shutdown_parse_pool
+from config.pgdb import close_pg_pool
+from services.query_log_service import flush_query_log
 
 # Setup logging
 setup_logging()
@@ -63,6 +66,14 @@ async def startup_event():
     except Exception as e:
         logger.warning(f"Failed to cleanup old rate limit windows on startup: {str(e)}")
 
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write pending query logs, stop parser workers and close the Postgres pool"""
+    await flush_query_log()
+    shutdown_parse_pool()
+    await close_pg_pool()
+
 # Include routers
 app.include_router(user_router, prefix="/api/v1", tags=["user"])
 app.include_router(bot_router, prefix="/api/v1", tags=["bot"])
@@ -4,7 +4,8 @@ from typing import Optional
 from uuid import UUID
 import logging
 import re
-from services.rate_limit_service import RateLimitService
+import time
+from services.rate_limit_service import RateLimitService, begin_request_window
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -87,20 +88,19 @@ async def rate_limit_middleware(request: Request, call_next):
     
     # Use service role for rate limiting (internal operation, doesn't need user context)
     try:
+        begin_request_window()
         # Check rate limit and increment count
-        is_allowed, current_count, max_requests, window_start = rate_limit_service.check_rate_limit(bot_id)
+        is_allowed, current_count, max_requests, window_minute = rate_limit_service.check_rate_limit(bot_id)
+        # Reset time (start of the next minute), as a Unix timestamp
+        reset_time = (window_minute + 1) * 60
         
         if not is_allowed:
             logger.warning(
                 f"Rate limit exceeded for bot {bot_id}: {current_count}/{max_requests} "
-                f"in window {window_start}"
+                f"in window {window_minute * 60}"
             )
             
-            # Calculate reset time (next minute)
-            from datetime import timedelta, datetime
-            reset_time = window_start + timedelta(minutes=1)
-            now = datetime.utcnow()
-            retry_after_seconds = max(1, int((reset_time - now).total_seconds()))
+            retry_after_seconds = max(1, int(reset_time - time.time()))
             
             response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -113,7 +113,7 @@ async def rate_limit_middleware(request: Request, call_next):
             # Add rate limit headers
             response.headers["X-RateLimit-Limit"] = str(max_requests)
             response.headers["X-RateLimit-Remaining"] = "0"
-            response.headers["X-RateLimit-Reset"] = str(int(reset_time.timestamp()))
+            response.headers["X-RateLimit-Reset"] = str(reset_time)
             response.headers["Retry-After"] = str(retry_after_seconds)
             
             return response
@@ -123,12 +123,10 @@ async def rate_limit_middleware(request: Request, call_next):
         
         # Add rate limit headers to successful responses
         remaining = max(0, max_requests - current_count)
-        from datetime import timedelta
-        reset_time = window_start + timedelta(minutes=1)
         
         response.headers["X-RateLimit-Limit"] = str(max_requests)
         response.headers["X-RateLimit-Remaining"] = str(remaining)
-        response.headers["X-RateLimit-Reset"] = str(int(reset_time.timestamp()))
+        response.headers["X-RateLimit-Reset"] = str(reset_time)
         
         return response
         
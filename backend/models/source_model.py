@@ -11,6 +11,10 @@ class SourceType(str, Enum):
     TEXT = "text"
 
 
+# Source types backed by an uploaded file in storage (everything but URLs)
+FILE_SOURCE_TYPES = frozenset({SourceType.PDF.value, SourceType.DOCX.value, SourceType.TEXT.value})
+
+
 class SourceStatus(str, Enum):
     """Source status enum matching database"""
     UPLOADED = "uploaded"
@@ -15,7 +15,7 @@ from parsers.base import BaseParser, ParseResult
 from parsers.pdf_parser import PDFParser
 from parsers.docx_parser import DOCXParser
 from parsers.text_parser import TextParser
-from parsers.factory import ParserFactory
+from parsers.factory import ParserFactory, get_parser_factory
 from parsers.exceptions import (
     ParserError,
     UnsupportedFileTypeError,
@@ -30,6 +30,7 @@ __all__ = [
     "DOCXParser",
     "TextParser",
     "ParserFactory",
+    "get_parser_factory",
     "ParserError",
     "UnsupportedFileTypeError",
     "ParsingFailedError",
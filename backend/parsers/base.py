@@ -6,7 +6,8 @@ This ensures consistency and allows for easy extension with new parsers.
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import BinaryIO, Optional, Union
+import io
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,12 +46,13 @@ class BaseParser(ABC):
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
     
     @abstractmethod
-    def parse(self, file_content: bytes, file_path: Optional[str] = None) -> ParseResult:
+    def parse(self, file_content: Union[bytes, BinaryIO], file_path: Optional[str] = None) -> ParseResult:
         """
         Parse document and extract text.
         
         Args:
-            file_content: Raw file content as bytes
+            file_content: Raw file content as bytes, or a binary file object
+                positioned at the start of the content
             file_path: Optional file path for context (e.g., for error messages)
         
         Returns:
@@ -89,3 +91,17 @@ class BaseParser(ABC):
         """Get parser name for logging/debugging"""
         return self.__class__.__name__
 
+    @staticmethod
+    def _as_stream(file_content: Union[bytes, BinaryIO]) -> BinaryIO:
+        """Return file content as a binary stream without copying file objects"""
+        if isinstance(file_content, (bytes, bytearray, memoryview)):
+            return io.BytesIO(file_content)
+        return file_content
+
+    @staticmethod
+    def _as_bytes(file_content: Union[bytes, BinaryIO]) -> bytes:
+        """Return file content as bytes, reading file objects to the end"""
+        if isinstance(file_content, (bytes, bytearray, memoryview)):
+            return bytes(file_content)
+        return file_content.read()
+
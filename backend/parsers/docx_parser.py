@@ -5,8 +5,7 @@ Extracts text from Microsoft Word DOCX documents using python-docx.
 Preserves paragraph structure and handles formatting.
 """
 
-from typing import Optional
-import io
+from typing import BinaryIO, Optional, Union
 import logging
 from parsers.base import BaseParser, ParseResult
 
@@ -33,12 +32,12 @@ class DOCXParser(BaseParser):
                 )
         return self._docx
     
-    def parse(self, file_content: bytes, file_path: Optional[str] = None) -> ParseResult:
+    def parse(self, file_content: Union[bytes, BinaryIO], file_path: Optional[str] = None) -> ParseResult:
         """
         Extract text from DOCX file.
         
         Args:
-            file_content: DOCX file content as bytes
+            file_content: DOCX file content as bytes or a binary file object
             file_path: Optional file path for error messages
         
         Returns:
@@ -47,8 +46,8 @@ class DOCXParser(BaseParser):
         try:
             Document = self._get_docx()
             
-            # Create file-like object from bytes
-            docx_file = io.BytesIO(file_content)
+            # Parsers read from a stream; bytes are wrapped, files are used as-is
+            docx_file = self._as_stream(file_content)
             
             # Load document
             doc = Document(docx_file)
@@ -5,6 +5,7 @@ Factory pattern for selecting and creating appropriate parsers based on file typ
 This centralizes parser selection logic and makes it easy to add new parsers.
 """
 
+from functools import lru_cache
 from typing import Optional
 import logging
 from parsers.base import BaseParser
@@ -96,3 +97,17 @@ class ParserFactory:
         self._parsers.append(parser)
         logger.info(f"Registered new parser: {parser.get_name()}")
 
+
+@lru_cache(maxsize=1)
+def get_parser_factory() -> ParserFactory:
+    """
+    Get the process-wide parser factory.
+    
+    Parsers are stateless (results live in ParseResult), so one set of
+    instances and one selection cache is shared by every caller in the
+    process instead of being rebuilt per ParsingService.
+    
+    Returns:
+        Shared ParserFactory instance
+    """
+    return ParserFactory()
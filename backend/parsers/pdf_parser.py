@@ -5,8 +5,7 @@ Extracts text from PDF documents using pdfplumber.
 Handles encrypted, corrupted, and multi-page PDFs.
 """
 
-from typing import Optional
-import io
+from typing import BinaryIO, Optional, Union
 import logging
 from parsers.base import BaseParser, ParseResult
 
@@ -33,12 +32,12 @@ class PDFParser(BaseParser):
                 )
         return self._pdfplumber
     
-    def parse(self, file_content: bytes, file_path: Optional[str] = None) -> ParseResult:
+    def parse(self, file_content: Union[bytes, BinaryIO], file_path: Optional[str] = None) -> ParseResult:
         """
         Extract text from PDF file.
         
         Args:
-            file_content: PDF file content as bytes
+            file_content: PDF file content as bytes or a binary file object
             file_path: Optional file path for error messages
         
         Returns:
@@ -47,8 +46,8 @@ class PDFParser(BaseParser):
         try:
             pdfplumber = self._get_pdfplumber()
             
-            # Create file-like object from bytes
-            pdf_file = io.BytesIO(file_content)
+            # Parsers read from a stream; bytes are wrapped, files are used as-is
+            pdf_file = self._as_stream(file_content)
             
             text_parts = []
             metadata = {
@@ -5,7 +5,7 @@ Extracts text from plain text files (TXT).
 Handles various text encodings (UTF-8, ASCII, etc.).
 """
 
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 import logging
 from parsers.base import BaseParser, ParseResult
 
@@ -18,18 +18,20 @@ class TextParser(BaseParser):
     def __init__(self):
         super().__init__()
     
-    def parse(self, file_content: bytes, file_path: Optional[str] = None) -> ParseResult:
+    def parse(self, file_content: Union[bytes, BinaryIO], file_path: Optional[str] = None) -> ParseResult:
         """
         Extract text from plain text file.
         
         Args:
-            file_content: Text file content as bytes
+            file_content: Text file content as bytes or a binary file object
             file_path: Optional file path for error messages
         
         Returns:
             ParseResult with extracted text
         """
         try:
+            raw = self._as_bytes(file_content)
+            
             # Try UTF-8 first (most common)
             encodings = ["utf-8", "utf-8-sig", "latin-1", "ascii", "cp1252"]
             
@@ -38,7 +40,7 @@ class TextParser(BaseParser):
             
             for encoding in encodings:
                 try:
-                    text = file_content.decode(encoding)
+                    text = raw.decode(encoding)
                     used_encoding = encoding
                     break
                 except UnicodeDecodeError:
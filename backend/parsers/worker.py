@@ -0,0 +1,33 @@
+"""
+Parser Worker
+
+Entry point for parsing in worker processes. Imports only the parsers
+package, so the forkserver can preload it without pulling in the web app,
+settings or database clients.
+"""
+
+from typing import Optional
+from parsers.base import ParseResult
+from parsers.factory import get_parser_factory
+
+
+def run_parse(
+    local_path: str,
+    storage_path: str,
+    mime_type: str,
+    file_extension: Optional[str]
+) -> ParseResult:
+    """Parse a downloaded document inside a worker process.
+
+    Top-level so it can be pickled; the parser is looked up in the worker
+    because parser instances are not sent across processes.
+    """
+    parser = get_parser_factory().get_parser(mime_type, file_extension)
+    if not parser:
+        return ParseResult(
+            text="",
+            success=False,
+            error_message=f"No parser available for MIME type: {mime_type}"
+        )
+    with open(local_path, "rb") as file_obj:
+        return parser.parse(file_obj, storage_path)
@@ -4,13 +4,13 @@ Chunk Repository
 Handles all database operations for chunks.
 """
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from uuid import UUID
 import logging
 from datetime import datetime, timezone
 
 from core.exceptions import DatabaseError, NotFoundError
-from config.supabasedb import get_supabase_client
+from config.supabasedb import get_supabase_client, long_postgrest_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +33,7 @@ class ChunkRepository:
             self.client = get_supabase_client(access_token=access_token)
         self.access_token = access_token
 
+    @long_postgrest_timeout()
     def create_chunks(self, chunks_data: List[dict]) -> List[dict]:
         """
         Create multiple chunks in a batch operation.
@@ -152,6 +153,7 @@ class ChunkRepository:
             logger.error(f"Error fetching chunk {chunk_id}: {str(e)}")
             raise DatabaseError(f"Failed to fetch chunk: {str(e)}")
 
+    @long_postgrest_timeout()
     def delete_chunks_by_source(self, source_id: UUID) -> bool:
         """
         Delete all chunks for a source.
@@ -208,13 +210,14 @@ class ChunkRepository:
             logger.error(f"Error counting chunks for source {source_id}: {str(e)}")
             raise DatabaseError(f"Failed to count chunks: {str(e)}")
 
-    def update_chunk_embeddings(self, chunk_ids: List[UUID], embeddings: List[List[float]]) -> int:
+    @long_postgrest_timeout()
+    def update_chunk_embeddings(self, chunk_ids: List[UUID], embeddings: Sequence[Sequence[float]]) -> int:
         """
         Update embeddings for a batch of chunks.
 
         Args:
             chunk_ids: IDs of chunks to update
-            embeddings: Corresponding embedding vectors
+            embeddings: Corresponding embedding vectors (lists or rows of a float32 ndarray)
 
         Returns:
             Number of updated rows
@@ -222,7 +225,7 @@ class ChunkRepository:
         Raises:
             DatabaseError: If database operation fails
         """
-        if not chunk_ids or not embeddings or len(chunk_ids) != len(embeddings):
+        if not chunk_ids or len(embeddings) == 0 or len(chunk_ids) != len(embeddings):
             return 0
 
         try:
@@ -231,7 +234,7 @@ class ChunkRepository:
             for cid, vec in zip(chunk_ids, embeddings):
                 response = (
                     self.client.table("chunks")
-                    .update({"embedding": vec})
+                    .update({"embedding": vec.tolist() if hasattr(vec, "tolist") else vec})
                     .eq("id", str(cid))
                     .execute()
                 )
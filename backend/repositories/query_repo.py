@@ -4,7 +4,7 @@ import logging
 import time
 
 from core.exceptions import DatabaseError
-from config.supabasedb import get_supabase_client
+from config.supabasedb import get_supabase_client, long_postgrest_timeout
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +17,8 @@ class QueryRepository:
         else:
             self.client = get_supabase_client(access_token=access_token)
 
-    def create_query(
-        self,
+    @staticmethod
+    def build_query_row(
         bot_id: UUID,
         session_id: str,
         query_text: str,
@@ -31,27 +31,40 @@ class QueryRepository:
         confidence: Optional[float] = None,
         latency_ms: Optional[int] = None,
     ) -> Dict[str, Any]:
+        """Build a queries table row"""
+        return {
+            "bot_id": str(bot_id),
+            "session_id": session_id,
+            "query_text": query_text,
+            "page_url": page_url,
+            "returned_sources": returned_sources,
+            "response_summary": response_summary,
+            "tokens_used": tokens_used,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "confidence": confidence,
+            "latency_ms": latency_ms,
+        }
+
+    @long_postgrest_timeout()
+    def create_queries(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Insert several query log rows in one request.
+
+        Args:
+            rows: Rows built with build_query_row
+
+        Raises:
+            DatabaseError: If database operation fails
+        """
+        if not rows:
+            return
         try:
-            payload = {
-                "bot_id": str(bot_id),
-                "session_id": session_id,
-                "query_text": query_text,
-                "page_url": page_url,
-                "returned_sources": returned_sources,
-                "response_summary": response_summary,
-                "tokens_used": tokens_used,
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "confidence": confidence,
-                "latency_ms": latency_ms,
-            }
-            resp = self.client.table("queries").insert(payload).execute()
-            if not resp.data:
-                raise DatabaseError("Failed to insert query log")
-            return resp.data[0]
+            # returning=minimal: the rows aren't needed back
+            self.client.table("queries").insert(rows, returning="minimal").execute()
         except Exception as e:
-            logger.error(f"Error inserting query log: {str(e)}")
-            raise DatabaseError(f"Failed to insert query log: {str(e)}")
+            logger.error(f"Error inserting {len(rows)} query logs: {str(e)}")
+            raise DatabaseError(f"Failed to insert query logs: {str(e)}")
 
     def get_recent_messages(self, bot_id: UUID, session_id: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
@@ -1,8 +1,8 @@
 from typing import Dict, Any, Optional, Tuple
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 import logging
-from config.supabasedb import get_supabase_client
+from config.supabasedb import get_supabase_client, long_postgrest_timeout
 from core.exceptions import DatabaseError
 
 logger = logging.getLogger(__name__)
@@ -113,6 +113,47 @@ class RateLimitRepository:
                 raise
             raise DatabaseError(f"Failed to increment rate limit: {str(e)}")
 
+    def add_to_window(self, bot_id: UUID, window_start: datetime, delta: int) -> int:
+        """
+        Add several requests to a rate limit window in one atomic update.
+
+        Creates the window if needed. Requires the add_rate_limit_count
+        function from scripts/add-rate-limit-increment.sql.
+
+        Args:
+            bot_id: Bot UUID
+            window_start: Start of the time window
+            delta: Number of requests to add
+
+        Returns:
+            The window's count after the update (includes other replicas' requests)
+
+        Raises:
+            DatabaseError: If database operation fails
+        """
+        try:
+            # Atomic upsert-and-increment (scripts/add-rate-limit-increment.sql),
+            # so concurrent flushes from several replicas all count
+            result = self.supabase.rpc(
+                "add_rate_limit_count",
+                {
+                    "p_bot_id": str(bot_id),
+                    "p_window_start": window_start.isoformat(),
+                    "p_delta": delta,
+                },
+            ).execute()
+
+            if not result or result.data is None:
+                raise DatabaseError("Failed to update rate limit count")
+
+            return int(result.data)
+
+        except Exception as e:
+            logger.error(f"Failed to add to rate limit window: {str(e)}")
+            if isinstance(e, DatabaseError):
+                raise
+            raise DatabaseError(f"Failed to add to rate limit window: {str(e)}")
+
     def check_and_increment(
         self, bot_id: UUID, window_start: datetime, max_requests: int
     ) -> Tuple[bool, int]:
@@ -177,6 +218,7 @@ class RateLimitRepository:
             logger.error(f"Failed to get rate limit count: {str(e)}")
             return 0  # Fail open - allow request if we can't check
 
+    @long_postgrest_timeout()
     def cleanup_old_windows(self, older_than_hours: int = 1) -> int:
         """
         Clean up old rate limit windows.
@@ -188,7 +230,7 @@ class RateLimitRepository:
             Number of deleted records
         """
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=older_than_hours)
+            cutoff_time = datetime.now(timezone.utc) - timedelta(hours=older_than_hours)
             
             # Try to use the database function first (if it exists)
             # The function takes no parameters, so pass empty dict
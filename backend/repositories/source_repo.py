@@ -5,7 +5,8 @@ Handles all database operations for sources.
 Sources can be files (PDF, DOCX, TXT) or URLs (HTML).
 """
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
+from datetime import datetime, timezone
 from uuid import UUID
 import logging
 
@@ -14,6 +15,13 @@ from config.supabasedb import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+# Columns returned to API clients (SourceResponseModel); etag/checksum
+# bookkeeping columns stay in the database
+SOURCE_COLUMNS = (
+    "id,bot_id,source_type,original_url,canonical_url,storage_path,status,"
+    "error_message,file_size,mime_type,created_at,updated_at"
+)
+
 
 class SourceRepository:
     """Repository for source operations"""
@@ -57,12 +65,13 @@ class SourceRepository:
                 raise
             raise DatabaseError(f"Failed to create source: {str(e)}")
 
-    def get_source_by_id(self, source_id: UUID) -> Optional[dict]:
+    def get_source_by_id(self, source_id: UUID, columns: str = SOURCE_COLUMNS) -> Optional[dict]:
         """
         Get source by ID.
 
         Args:
             source_id: ID of the source
+            columns: Comma-separated columns to select
 
         Returns:
             Source record if found, None otherwise
@@ -73,7 +82,7 @@ class SourceRepository:
         try:
             response = (
                 self.client.table("sources")
-                .select("*")
+                .select(columns)
                 .eq("id", str(source_id))
                 .maybe_single()
                 .execute()
@@ -85,12 +94,48 @@ class SourceRepository:
             logger.error(f"Error fetching source {source_id}: {str(e)}")
             raise DatabaseError(f"Failed to fetch source: {str(e)}")
 
-    def get_sources_by_bot(self, bot_id: UUID) -> List[dict]:
+    def get_sources_by_ids(
+        self,
+        source_ids: List[Union[UUID, str]],
+        columns: str = "*",
+    ) -> Dict[str, dict]:
+        """
+        Get several sources by ID in a single query.
+
+        Args:
+            source_ids: IDs of the sources (UUIDs or strings)
+            columns: Comma-separated columns to select (must include "id")
+
+        Returns:
+            Source records keyed by ID (missing IDs are omitted)
+
+        Raises:
+            DatabaseError: If database operation fails
+        """
+        if not source_ids:
+            return {}
+
+        try:
+            response = (
+                self.client.table("sources")
+                .select(columns)
+                .in_("id", [str(source_id) for source_id in source_ids])
+                .execute()
+            )
+
+            return {source["id"]: source for source in response.data or []}
+
+        except Exception as e:
+            logger.error(f"Error fetching sources {source_ids}: {str(e)}")
+            raise DatabaseError(f"Failed to fetch sources: {str(e)}")
+
+    def get_sources_by_bot(self, bot_id: UUID, columns: str = SOURCE_COLUMNS) -> List[dict]:
         """
         Get all sources for a bot.
 
         Args:
             bot_id: ID of the bot
+            columns: Comma-separated columns to select
 
         Returns:
             List of source records
@@ -101,7 +146,7 @@ class SourceRepository:
         try:
             response = (
                 self.client.table("sources")
-                .select("*")
+                .select(columns)
                 .eq("bot_id", str(bot_id))
                 .order("created_at", desc=True)
                 .execute()
@@ -113,6 +158,74 @@ class SourceRepository:
             logger.error(f"Error fetching sources for bot {bot_id}: {str(e)}")
             raise DatabaseError(f"Failed to fetch sources: {str(e)}")
 
+    def get_bot_with_sources(self, bot_id: UUID, columns: str = SOURCE_COLUMNS) -> Optional[dict]:
+        """
+        Get a bot's owner together with all of its sources in a single query.
+
+        The bot row is read with the caller's token, so RLS hides bots the
+        user doesn't own.
+
+        Args:
+            bot_id: ID of the bot
+            columns: Comma-separated source columns to select
+
+        Returns:
+            Dict with "id", "created_by" and "sources" (newest first),
+            or None if the bot is not visible
+
+        Raises:
+            DatabaseError: If database operation fails
+        """
+        try:
+            response = (
+                self.client.table("bots")
+                .select(f"id,created_by,sources({columns})")
+                .eq("id", str(bot_id))
+                .order("created_at", desc=True, foreign_table="sources")
+                .maybe_single()
+                .execute()
+            )
+
+            return response.data if response and response.data else None
+
+        except Exception as e:
+            logger.error(f"Error fetching sources for bot {bot_id}: {str(e)}")
+            raise DatabaseError(f"Failed to fetch sources: {str(e)}")
+
+    def get_source_for_bot(
+        self, source_id: UUID, bot_id: UUID, columns: str = SOURCE_COLUMNS
+    ) -> Optional[dict]:
+        """
+        Get a source of a bot together with the bot's owner in a single query.
+
+        Args:
+            source_id: ID of the source
+            bot_id: ID of the bot the source must belong to
+            columns: Comma-separated source columns to select
+
+        Returns:
+            Source record with the bot owner under "bots" ({"created_by": ...}),
+            or None if not found
+
+        Raises:
+            DatabaseError: If database operation fails
+        """
+        try:
+            response = (
+                self.client.table("sources")
+                .select(f"{columns},bots!inner(created_by)")
+                .eq("id", str(source_id))
+                .eq("bot_id", str(bot_id))
+                .maybe_single()
+                .execute()
+            )
+
+            return response.data if response and response.data else None
+
+        except Exception as e:
+            logger.error(f"Error fetching source {source_id}: {str(e)}")
+            raise DatabaseError(f"Failed to fetch source: {str(e)}")
+
     def update_source_status(
         self,
         source_id: UUID,
@@ -134,7 +247,6 @@ class SourceRepository:
             DatabaseError: If database operation fails
         """
         try:
-            from datetime import datetime, timezone
             update_data = {
                 "status": status,
                 "updated_at": datetime.now(timezone.utc).isoformat(),
@@ -177,26 +289,18 @@ class SourceRepository:
             DatabaseError: If database operation fails
         """
         try:
-            # First verify the source belongs to the bot
+            # Filtered by bot too, so a source of another bot is never deleted;
+            # RLS likewise leaves rows of bots the user doesn't own untouched
             response = (
                 self.client.table("sources")
-                .select("id")
+                .delete()
                 .eq("id", str(source_id))
                 .eq("bot_id", str(bot_id))
-                .maybe_single()
                 .execute()
             )
 
             if not response.data:
-                raise NotFoundError(f"Source {source_id} not found")
-
-            # Delete the source
-            delete_response = (
-                self.client.table("sources")
-                .delete()
-                .eq("id", str(source_id))
-                .execute()
-            )
+                raise NotFoundError("Source", str(source_id))
 
             logger.info(f"Deleted source {source_id} for bot {bot_id}")
             return True
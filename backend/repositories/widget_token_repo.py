@@ -6,7 +6,7 @@ Widget tokens are used for authenticating embedded chat widgets on client websit
 """
 
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from uuid import UUID
 import logging
 
@@ -30,10 +30,19 @@ class WidgetTokenRepository:
         # For widget token validation (access_token=None), use service role
         if access_token is None:
             self.client = get_supabase_client(use_service_role=True)
+            self._service_client = self.client
         else:
             self.client = get_supabase_client(access_token=access_token)
+            self._service_client = None
         self.access_token = access_token
 
+    @property
+    def service_client(self):
+        """Service role client for widget queries, resolved once per repository"""
+        if self._service_client is None:
+            self._service_client = get_supabase_client(use_service_role=True)
+        return self._service_client
+
     def create_token(
         self,
         bot_id: UUID,
@@ -128,10 +137,8 @@ class WidgetTokenRepository:
         """
         try:
             # Use service role for widget token validation (bypasses RLS)
-            service_client = get_supabase_client(use_service_role=True)
-            
             response = (
-                service_client.table("widget_tokens")
+                self.service_client.table("widget_tokens")
                 .select("*")
                 .eq("token_hash", token_hash)
                 .maybe_single()
@@ -202,11 +209,8 @@ class WidgetTokenRepository:
             True if updated successfully
         """
         try:
-            service_client = get_supabase_client(use_service_role=True)
-            
-            from datetime import timezone
             response = (
-                service_client.table("widget_tokens")
+                self.service_client.table("widget_tokens")
                 .update({"last_used_at": datetime.now(timezone.utc).isoformat()})
                 .eq("id", str(token_id))
                 .execute()
@@ -3,19 +3,34 @@ Analytics Service
 
 Provides analytics and insights from query data.
 Aggregates query statistics, usage patterns, and performance metrics.
+
+Database dependencies:
+- scripts/add-analytics-functions.sql: bot_* RPCs and the queries_daily_stats rollup
+  (table-query fallbacks are used when they are missing)
+- scripts/add-analytics-covering-index.sql: idx_queries_bot_created_covering on
+  queries(bot_id, created_at DESC) INCLUDE (...), which keeps the per-bot date window
+  scans (distinct sessions, fallbacks) index-only
 """
 
 from typing import List, Dict, Any, Optional, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
+import asyncio
+import heapq
 import logging
 
+from core.cache import TTLCache
 from core.exceptions import DatabaseError, AuthorizationError
-from config.supabasedb import get_supabase_client
+from config.supabasedb import get_supabase_client, long_postgrest_timeout
 from services.bot_service import BotService
 
 logger = logging.getLogger(__name__)
 
+# Successful (bot_id, user_id) ownership checks. Bot ownership never changes,
+# so a short TTL only delays revocation when a bot is deleted, and its
+# analytics rows are removed with it.
+_authorized_bots = TTLCache(maxsize=4096, ttl=60)
+
 
 class AnalyticsService:
     """Service for analytics operations"""
@@ -32,92 +47,167 @@ class AnalyticsService:
         self.client = get_supabase_client(use_service_role=True)
         self.bot_service = BotService()
 
-    def get_summary_stats(self, bot_id: UUID, user_id: str, access_token: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+    def _authorize(self, bot_id: UUID, user_id: str, access_token: Optional[str] = None) -> None:
         """
-        Get summary statistics for a bot.
+        Verify the user owns the bot.
 
-        Args:
-            bot_id: ID of the bot
-            user_id: ID of the user (for authorization)
-            days: Number of days to look back (default: 30)
+        Positive results are cached briefly so dashboards that hit several
+        analytics endpoints for the same bot only pay for one lookup.
 
-        Returns:
-            Dictionary with summary statistics
+        Raises:
+            AuthorizationError: If the bot does not exist or belongs to another user
         """
-        # Verify user owns the bot
+        cache_key = (str(bot_id), user_id)
+        if cache_key in _authorized_bots:
+            return
+
         try:
             self.bot_service.get_bot(str(bot_id), user_id, access_token=access_token)
         except Exception:
             raise AuthorizationError("You do not have access to this bot's analytics")
 
-        start_date = datetime.now() - timedelta(days=days)
+        _authorized_bots.set(cache_key, True)
+
+    async def get_dashboard(
+        self,
+        bot_id: UUID,
+        user_id: str,
+        access_token: Optional[str] = None,
+        days: int = 30,
+        top_limit: int = 10,
+        unanswered_limit: int = 20,
+        include_advanced: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Get all analytics sections for a bot concurrently.
 
-        try:
-            # Get total queries
-            total_queries_resp = self.client.table("queries")\
-                .select("*", count="exact")\
-                .eq("bot_id", str(bot_id))\
-                .gte("created_at", start_date.isoformat())\
-                .execute()
+        Ownership is checked once, then the section queries run in parallel
+        worker threads so the dashboard pays roughly one round trip instead of four.
 
-            total_queries = total_queries_resp.count or 0
+        Args:
+            bot_id: ID of the bot
+            user_id: ID of the user (for authorization)
+            access_token: User's access token for authorization
+            days: Number of days to look back
+            top_limit: Number of top queries to return
+            unanswered_limit: Number of unanswered queries to return
+            include_advanced: Whether to fetch top and unanswered queries
 
-            # Get unique sessions
-            unique_sessions_resp = self.client.table("queries")\
-                .select("session_id")\
-                .eq("bot_id", str(bot_id))\
-                .gte("created_at", start_date.isoformat())\
-                .execute()
+        Returns:
+            Dictionary with summary, usage, top_queries and unanswered sections
+        """
+        await asyncio.to_thread(self._authorize, bot_id, user_id, access_token)
 
-            unique_sessions = len(set(row["session_id"] for row in unique_sessions_resp.data or []))
+        tasks = [
+            asyncio.to_thread(self._summary_stats, bot_id, days),
+            asyncio.to_thread(self._usage_over_time, bot_id, days),
+        ]
+        if include_advanced:
+            tasks.append(asyncio.to_thread(self._top_queries, bot_id, top_limit, days))
+            tasks.append(asyncio.to_thread(self._unanswered_queries, bot_id, unanswered_limit, days))
 
-            # Get token usage stats
-            token_stats_resp = self.client.table("queries")\
-                .select("tokens_used, prompt_tokens, completion_tokens")\
-                .eq("bot_id", str(bot_id))\
-                .gte("created_at", start_date.isoformat())\
-                .execute()
+        results = await asyncio.gather(*tasks)
 
-            token_data = token_stats_resp.data or []
-            total_tokens = sum(row.get("tokens_used", 0) for row in token_data)
-            prompt_tokens = sum(row.get("prompt_tokens", 0) for row in token_data if row.get("prompt_tokens"))
-            completion_tokens = sum(row.get("completion_tokens", 0) for row in token_data if row.get("completion_tokens"))
+        return {
+            "summary": results[0],
+            "usage": results[1],
+            "top_queries": results[2] if include_advanced else [],
+            "unanswered": results[3] if include_advanced else [],
+        }
 
-            # Get average confidence
-            confidence_resp = self.client.table("queries")\
-                .select("confidence")\
-                .eq("bot_id", str(bot_id))\
-                .gte("created_at", start_date.isoformat())\
-                .execute()
+    def get_summary_stats(self, bot_id: UUID, user_id: str, access_token: Optional[str] = None, days: int = 30) -> Dict[str, Any]:
+        """
+        Get summary statistics for a bot.
 
-            confidence_scores = [row["confidence"] for row in confidence_resp.data or [] if row["confidence"] is not None]
-            avg_confidence = sum(confidence_scores) / len(confidence_scores) if confidence_scores else None
+        Args:
+            bot_id: ID of the bot
+            user_id: ID of the user (for authorization)
+            days: Number of days to look back (default: 30)
 
-            # Get average latency
-            latency_resp = self.client.table("queries")\
-                .select("latency_ms")\
-                .eq("bot_id", str(bot_id))\
-                .gte("created_at", start_date.isoformat())\
-                .execute()
+        Returns:
+            Dictionary with summary statistics
+        """
+        self._authorize(bot_id, user_id, access_token)
+        return self._summary_stats(bot_id, days)
 
-            latency_scores = [row["latency_ms"] for row in latency_resp.data or [] if row["latency_ms"] is not None]
-            avg_latency = sum(latency_scores) / len(latency_scores) if latency_scores else None
+    @long_postgrest_timeout()
+    def _summary_stats(self, bot_id: UUID, days: int) -> Dict[str, Any]:
+        """Summary statistics without the ownership check (callers must authorize first)"""
+        start_date = datetime.now() - timedelta(days=days)
 
-            return {
-                "total_queries": total_queries,
-                "unique_sessions": unique_sessions,
-                "total_tokens": total_tokens,
-                "prompt_tokens": prompt_tokens,
-                "completion_tokens": completion_tokens,
-                "avg_confidence": avg_confidence,
-                "avg_latency_ms": avg_latency,
-                "period_days": days,
-            }
+        try:
+            stats = self._fetch_summary_stats(bot_id, start_date)
+            stats["period_days"] = days
+            return stats
 
         except Exception as e:
             logger.error(f"Error getting summary stats for bot {bot_id}: {str(e)}")
             raise DatabaseError(f"Failed to get summary statistics: {str(e)}")
 
+    def _fetch_summary_stats(self, bot_id: UUID, start_date: datetime) -> Dict[str, Any]:
+        """
+        Aggregate summary statistics in a single round trip.
+
+        Uses the bot_summary_stats RPC (scripts/add-analytics-functions.sql) and
+        falls back to a single table query if the function is not installed.
+        """
+        try:
+            result = self.client.rpc(
+                "bot_summary_stats",
+                {"p_bot_id": str(bot_id), "p_start": start_date.isoformat()},
+            ).execute()
+
+            if result.data:
+                row = result.data[0]
+                return {
+                    "total_queries": row.get("total_queries") or 0,
+                    "unique_sessions": row.get("unique_sessions") or 0,
+                    "total_tokens": row.get("total_tokens") or 0,
+                    "prompt_tokens": row.get("prompt_tokens") or 0,
+                    "completion_tokens": row.get("completion_tokens") or 0,
+                    "avg_confidence": row.get("avg_confidence"),
+                    "avg_latency_ms": row.get("avg_latency_ms"),
+                }
+        except Exception as rpc_error:
+            # RPC function might not exist yet, fall back to table queries
+            logger.debug(f"bot_summary_stats RPC failed, using table queries: {str(rpc_error)}")
+
+        # Fallback: one table query, aggregated in a single pass with running
+        # totals so no per-metric lists are materialized
+        rows_resp = self.client.table("queries")\
+            .select("session_id, tokens_used, prompt_tokens, completion_tokens, confidence, latency_ms", count="exact")\
+            .eq("bot_id", str(bot_id))\
+            .gte("created_at", start_date.isoformat())\
+            .execute()
+
+        sessions = set()
+        total_tokens = prompt_tokens = completion_tokens = 0
+        confidence_sum = 0.0
+        confidence_count = 0
+        latency_sum = 0
+        latency_count = 0
+        for row in rows_resp.data or []:
+            sessions.add(row["session_id"])
+            total_tokens += row.get("tokens_used") or 0
+            prompt_tokens += row.get("prompt_tokens") or 0
+            completion_tokens += row.get("completion_tokens") or 0
+            if row.get("confidence") is not None:
+                confidence_sum += row["confidence"]
+                confidence_count += 1
+            if row.get("latency_ms") is not None:
+                latency_sum += row["latency_ms"]
+                latency_count += 1
+
+        return {
+            "total_queries": rows_resp.count or 0,
+            "unique_sessions": len(sessions),
+            "total_tokens": total_tokens,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "avg_confidence": confidence_sum / confidence_count if confidence_count else None,
+            "avg_latency_ms": latency_sum / latency_count if latency_count else None,
+        }
+
     def get_top_queries(self, bot_id: UUID, user_id: str, access_token: Optional[str] = None, limit: int = 10, days: int = 30) -> List[Dict[str, Any]]:
         """
         Get top queries by frequency.
@@ -132,17 +222,29 @@ class AnalyticsService:
         Returns:
             List of top queries with frequency and stats
         """
-        # Verify user owns the bot
-        try:
-            self.bot_service.get_bot(str(bot_id), user_id, access_token=access_token)
-        except Exception:
-            raise AuthorizationError("You do not have access to this bot's analytics")
+        self._authorize(bot_id, user_id, access_token)
+        return self._top_queries(bot_id, limit, days)
 
+    @long_postgrest_timeout()
+    def _top_queries(self, bot_id: UUID, limit: int, days: int) -> List[Dict[str, Any]]:
+        """Top queries without the ownership check (callers must authorize first)"""
         start_date = datetime.now() - timedelta(days=days)
 
         try:
-            # Use RPC to aggregate queries by text
-            # This would need a custom RPC function in Supabase, but for now we'll fetch and aggregate in Python
+            # Group, filter and rank in SQL (scripts/add-analytics-functions.sql)
+            try:
+                result = self.client.rpc(
+                    "bot_top_queries",
+                    {"p_bot_id": str(bot_id), "p_start": start_date.isoformat(), "p_limit": limit},
+                ).execute()
+
+                if result.data is not None:
+                    return result.data
+            except Exception as rpc_error:
+                # RPC function might not exist yet, fall back to aggregating in Python
+                logger.debug(f"bot_top_queries RPC failed, aggregating in Python: {str(rpc_error)}")
+
+            # Fallback: fetch the window and aggregate in Python
             queries_resp = self.client.table("queries")\
                 .select("query_text, confidence, tokens_used, created_at")\
                 .eq("bot_id", str(bot_id))\
@@ -181,23 +283,27 @@ class AnalyticsService:
                 if row["created_at"] > stats["last_seen"]:
                     stats["last_seen"] = row["created_at"]
 
-            # Calculate averages and sort by frequency
+            # Pick the N most frequent repeated queries (count >= 2) without sorting
+            # every distinct query; nlargest keeps sorted()'s tie order
+            top_stats = heapq.nlargest(
+                limit,
+                (stats for stats in query_stats.values() if stats["count"] >= 2),
+                key=lambda stats: stats["count"],
+            )
+
+            # Calculate averages only for the returned rows
             top_queries = []
-            for query_text, stats in query_stats.items():
-                if stats["count"] >= 2:  # Only include queries that appear multiple times
-                    avg_confidence = stats["total_confidence"] / stats["confidence_count"] if stats["confidence_count"] > 0 else None
-                    top_queries.append({
-                        "query_text": stats["query_text"],
-                        "frequency": stats["count"],
-                        "avg_confidence": avg_confidence,
-                        "total_tokens": stats["total_tokens"],
-                        "first_seen": stats["first_seen"],
-                        "last_seen": stats["last_seen"],
-                    })
-
-            # Sort by frequency (descending) and return top N
-            top_queries.sort(key=lambda x: x["frequency"], reverse=True)
-            return top_queries[:limit]
+            for stats in top_stats:
+                avg_confidence = stats["total_confidence"] / stats["confidence_count"] if stats["confidence_count"] > 0 else None
+                top_queries.append({
+                    "query_text": stats["query_text"],
+                    "frequency": stats["count"],
+                    "avg_confidence": avg_confidence,
+                    "total_tokens": stats["total_tokens"],
+                    "first_seen": stats["first_seen"],
+                    "last_seen": stats["last_seen"],
+                })
+            return top_queries
 
         except Exception as e:
             logger.error(f"Error getting top queries for bot {bot_id}: {str(e)}")
@@ -217,76 +323,56 @@ class AnalyticsService:
         Returns:
             List of unanswered queries
         """
-        # Verify user owns the bot
-        try:
-            self.bot_service.get_bot(str(bot_id), user_id, access_token=access_token)
-        except Exception:
-            raise AuthorizationError("You do not have access to this bot's analytics")
+        self._authorize(bot_id, user_id, access_token)
+        return self._unanswered_queries(bot_id, limit, days)
 
+    @long_postgrest_timeout()
+    def _unanswered_queries(self, bot_id: UUID, limit: int, days: int) -> List[Dict[str, Any]]:
+        """Unanswered queries without the ownership check (callers must authorize first)"""
         start_date = datetime.now() - timedelta(days=days)
 
         try:
-            # Get queries with low confidence (filter in Python)
-            low_confidence_resp = self.client.table("queries")\
-                .select("query_text, confidence, returned_sources, response_summary, created_at")\
-                .eq("bot_id", str(bot_id))\
-                .gte("created_at", start_date.isoformat())\
-                .order("created_at", desc=True)\
-                .execute()
-
-            # Get queries with empty sources (check array length in Python)
-            empty_sources_resp = self.client.table("queries")\
-                .select("query_text, confidence, returned_sources, response_summary, created_at")\
-                .eq("bot_id", str(bot_id))\
-                .gte("created_at", start_date.isoformat())\
-                .order("created_at", desc=True)\
-                .execute()
-
-            # Combine and deduplicate results
-            all_unanswered = []
-            seen_queries = set()
-
-            # Process low confidence queries
-            for row in low_confidence_resp.data or []:
-                confidence = row.get("confidence")
-                if confidence is not None and confidence < 0.3:
-                    query_key = (row["query_text"], row["created_at"])
-                    if query_key not in seen_queries:
-                        seen_queries.add(query_key)
-                        all_unanswered.append(row)
-
-            # Process queries with empty sources
-            for row in empty_sources_resp.data or []:
-                sources = row.get("returned_sources", [])
-                if len(sources) == 0:  # Check for empty sources
-                    query_key = (row["query_text"], row["created_at"])
-                    if query_key not in seen_queries:
-                        seen_queries.add(query_key)
-                        all_unanswered.append(row)
-
-            # Sort by created_at desc and limit
-            unanswered_resp = sorted(all_unanswered, key=lambda x: x["created_at"], reverse=True)[:limit]
+            # Filter and limit in SQL (scripts/add-analytics-functions.sql)
+            rows = None
+            try:
+                result = self.client.rpc(
+                    "bot_unanswered",
+                    {"p_bot_id": str(bot_id), "p_start": start_date.isoformat(), "p_limit": limit},
+                ).execute()
+                rows = result.data
+            except Exception as rpc_error:
+                # RPC function might not exist yet, fall back to a filtered table query
+                logger.debug(f"bot_unanswered RPC failed, using table query: {str(rpc_error)}")
+
+            if rows is None:
+                # Fallback: same predicate expressed as a PostgREST filter
+                unanswered_resp = self.client.table("queries")\
+                    .select("query_text, confidence, returned_sources, response_summary, created_at")\
+                    .eq("bot_id", str(bot_id))\
+                    .gte("created_at", start_date.isoformat())\
+                    .or_("confidence.lt.0.3,returned_sources.eq.[]")\
+                    .order("created_at", desc=True)\
+                    .limit(limit)\
+                    .execute()
+
+                rows = [
+                    {
+                        **row,
+                        "sources_count": len(row.get("returned_sources") or []),
+                        "response_summary": (row.get("response_summary") or "")[:200],
+                    }
+                    for row in unanswered_resp.data or []
+                ]
 
             unanswered_queries = []
-            for row in unanswered_resp:
-                # Check if sources array is empty or confidence is very low
-                sources_count = len(row.get("returned_sources", []))
-                confidence = row.get("confidence")
-
-                is_unanswered = (
-                    confidence is not None and confidence < 0.3
-                ) or (
-                    sources_count == 0
-                )
-
-                if is_unanswered:
-                    unanswered_queries.append({
-                        "query_text": row["query_text"],
-                        "confidence": confidence,
-                        "sources_count": sources_count,
-                        "response_summary": row.get("response_summary", "")[:200],
-                        "created_at": row["created_at"],
-                    })
+            for row in rows:
+                unanswered_queries.append({
+                    "query_text": row["query_text"],
+                    "confidence": row.get("confidence"),
+                    "sources_count": row.get("sources_count") or 0,
+                    "response_summary": row.get("response_summary") or "",
+                    "created_at": row["created_at"],
+                })
 
             return unanswered_queries
 
@@ -307,16 +393,29 @@ class AnalyticsService:
         Returns:
             List of daily usage statistics
         """
-        # Verify user owns the bot
-        try:
-            self.bot_service.get_bot(str(bot_id), user_id, access_token=access_token)
-        except Exception:
-            raise AuthorizationError("You do not have access to this bot's analytics")
+        self._authorize(bot_id, user_id, access_token)
+        return self._usage_over_time(bot_id, days)
 
+    @long_postgrest_timeout()
+    def _usage_over_time(self, bot_id: UUID, days: int) -> List[Dict[str, Any]]:
+        """Daily usage without the ownership check (callers must authorize first)"""
         start_date = datetime.now() - timedelta(days=days)
 
         try:
-            # Get daily aggregates
+            # Bucket by day in Postgres (scripts/add-analytics-functions.sql)
+            try:
+                result = self.client.rpc(
+                    "bot_usage_daily",
+                    {"p_bot_id": str(bot_id), "p_start": start_date.isoformat()},
+                ).execute()
+
+                if result.data is not None:
+                    return result.data
+            except Exception as rpc_error:
+                # RPC function might not exist yet, fall back to aggregating in Python
+                logger.debug(f"bot_usage_daily RPC failed, aggregating in Python: {str(rpc_error)}")
+
+            # Fallback: Get daily aggregates
             usage_resp = self.client.table("queries")\
                 .select("created_at, tokens_used, confidence")\
                 .eq("bot_id", str(bot_id))\
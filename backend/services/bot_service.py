@@ -1,12 +1,24 @@
 from typing import Dict, Any, Optional, List
 import logging
+from config.supabasedb import get_supabase_client
 from models.bot_model import BotCreateModel, BotUpdateModel
 from repositories.bot_repo import BotRepository
 from services.plan_service import PlanService
+from core.cache import TTLCache
 from core.exceptions import ValidationError, NotFoundError, AuthorizationError
 
 logger = logging.getLogger(__name__)
 
+# Bot rows are read on every answered query and ownership check but change
+# rarely. Writes through this module invalidate immediately; other worker
+# processes pick up changes once the TTL lapses.
+_bot_cache = TTLCache(maxsize=1024, ttl=60)
+
+
+def invalidate_bot_cache(bot_id: str) -> None:
+    """Drop a cached bot row after it was updated or deleted"""
+    _bot_cache.pop(str(bot_id))
+
 
 class BotService:
     """Service for bot business logic"""
@@ -65,11 +77,57 @@ class BotService:
             logger.error(f"Bot creation failed: user_id={user_id}, name={bot.name}, error={str(e)}")
             raise
 
-    def get_bot(self, bot_id: str, user_id: str, access_token: Optional[str] = None) -> Dict[str, Any]:
-        """Get bot with authorization check"""
+    def _get_bot_cached(
+        self,
+        bot_id: str,
+        access_token: Optional[str] = None,
+        use_cache: bool = True,
+        user_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get a bot row, from the process cache when possible
+
+        Fetched with the caller's token (RLS) when given, otherwise with the
+        service role. Returns a copy so callers cannot mutate the cached row.
+
+        The cache is shared by both kinds of read, so a token caller (user_id)
+        is only served a cached row RLS would have shown them, i.e. their own
+        bot; anyone else goes to the database and gets None, as before.
+        """
+        bot = _bot_cache.get(bot_id) if use_cache else None
+        if bot is not None and access_token and bot.get("created_by") != user_id:
+            bot = None
+        if bot is None:
+            if access_token:
+                bot = self._get_repository(access_token=access_token).get_bot_by_id(bot_id)
+            else:
+                try:
+                    service_db = get_supabase_client(use_service_role=True)
+                    result = service_db.table("bots").select("*").eq("id", bot_id).maybe_single().execute()
+                    bot = result.data if result and result.data else None
+                except Exception as e:
+                    logger.error(f"Failed to get bot {bot_id}: {str(e)}")
+                    bot = None
+            if not bot:
+                return None
+            _bot_cache.set(bot_id, bot)
+        return dict(bot)
+
+    def get_bot(
+        self,
+        bot_id: str,
+        user_id: str,
+        access_token: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """Get bot with authorization check
+
+        Pass use_cache=False when the result feeds a read-modify-write
+        (e.g. recording the previous system prompt).
+        """
         try:
-            repository = self._get_repository(access_token=access_token)
-            bot = repository.get_bot_by_id(bot_id)
+            bot = self._get_bot_cached(
+                bot_id, access_token=access_token, use_cache=use_cache, user_id=user_id
+            )
             
             if not bot:
                 raise NotFoundError("Bot", bot_id)
@@ -87,6 +145,44 @@ class BotService:
             logger.error(f"Bot retrieval failed: bot_id={bot_id}, user_id={user_id}, error={str(e)}")
             raise
 
+    def get_bot_for_widget(self, bot_id: str) -> Optional[Dict[str, Any]]:
+        """Get bot without an ownership check (service role)
+
+        Only for widget queries, where the widget token already proved
+        access to the bot.
+        """
+        return self._get_bot_cached(bot_id)
+
+    def get_system_prompt(
+        self,
+        bot_id: str,
+        user_id: Optional[str] = None,
+        access_token: Optional[str] = None
+    ) -> Optional[str]:
+        """Get a bot's system prompt for answering a query
+
+        Served from the bot cache, so repeated queries skip the bot fetch.
+        Ownership is verified when user_id is given (authenticated queries);
+        widget queries pass no user_id, since the widget token already proved
+        access to the bot.
+
+        Returns:
+            The system prompt, or None if unset (or, for widget queries, if
+            the bot could not be fetched)
+
+        Raises:
+            NotFoundError: If an authenticated caller's bot doesn't exist
+            AuthorizationError: If user_id doesn't own the bot
+        """
+        if user_id:
+            bot = self.get_bot(bot_id, user_id, access_token=access_token)
+        else:
+            bot = self.get_bot_for_widget(bot_id)
+            if bot is None:
+                logger.warning(f"Failed to fetch bot for widget query: bot_id={bot_id}")
+                return None
+        return bot.get("system_prompt")
+
     def get_user_bots(self, user_id: str, access_token: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get all bots for a user"""
         try:
@@ -123,6 +219,7 @@ class BotService:
                     update_data["llm_config"] = existing_config
 
             result = repository.update_bot(bot_id, update_data)
+            invalidate_bot_cache(bot_id)
             logger.info(f"Bot updated: bot_id={bot_id}, user_id={user_id}, fields={list(update_data.keys())}")
             return result
         except (NotFoundError, AuthorizationError):
@@ -145,6 +242,7 @@ class BotService:
                 raise AuthorizationError("You do not have permission to delete this bot")
 
             result = repository.delete_bot(bot_id)
+            invalidate_bot_cache(bot_id)
             logger.info(f"Bot deleted: bot_id={bot_id}, user_id={user_id}")
             return result
         except (NotFoundError, AuthorizationError):
@@ -5,7 +5,7 @@ Business logic for chunk operations.
 Orchestrates chunking, storage, and retrieval.
 """
 
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from uuid import UUID
 import logging
 
@@ -31,49 +31,65 @@ class ChunkService:
         self.access_token = access_token
         self.repository = ChunkRepository(access_token=access_token)
         self.chunking_service = ChunkingService()
+        self.bot_service = BotService()
 
-    def chunk_and_store_source(
+    def iter_chunk_batches(
         self,
         source_id: UUID,
         bot_id: UUID,
         text: str,
         source_type: SourceType,
+        batch_size: int,
         default_heading: Optional[str] = None
-    ) -> List[dict]:
+    ) -> Iterator[List[dict]]:
         """
-        Chunk text and store chunks in database.
+        Chunk text and store chunks in batches, yielding each stored batch.
+
+        Lets callers embed the first rows while later batches are still
+        being inserted, instead of waiting for the whole document.
 
         Args:
             source_id: Source UUID
             bot_id: Bot UUID
             text: Extracted text to chunk
             source_type: Type of source (pdf, docx, text, html)
+            batch_size: Number of chunks inserted (and yielded) per batch
+            default_heading: Heading for chunks that have none
 
-        Returns:
-            List of created chunk records
+        Yields:
+            Lists of created chunk records
 
         Raises:
-            ValidationError: If validation fails
             DatabaseError: If database operation fails
         """
         if not text or not text.strip():
             logger.warning(f"Empty text provided for chunking source {source_id}")
-            return []
-
-        # Verify bot ownership (authorization)
-        bot_service = BotService()
-        # Note: We need user_id for authorization, but in parsing context we might not have it
-        # For now, we'll use service role to bypass RLS since we've already verified ownership
-        # during source creation/parsing
-        
-        # Chunk the text
+            return
+
         text_chunks = self.chunking_service.chunk_text(text, source_type.value)
-        
         if not text_chunks:
             logger.warning(f"No chunks generated for source {source_id}")
-            return []
+            return
+
+        chunks_data = self._build_chunk_rows(text_chunks, source_id, bot_id, default_heading)
+        for start in range(0, len(chunks_data), batch_size):
+            batch = chunks_data[start:start + batch_size]
+            try:
+                created_chunks = self.repository.create_chunks(batch)
+            except Exception as e:
+                logger.error(f"Chunk storage failed: source_id={source_id}, bot_id={bot_id}, error={str(e)}")
+                raise DatabaseError(f"Failed to store chunks: {str(e)}")
+            logger.debug(f"Chunks stored: source_id={source_id}, bot_id={bot_id}, count={len(created_chunks)}")
+            yield created_chunks
 
-        # Convert TextChunk objects to dicts for database insertion
+    @staticmethod
+    def _build_chunk_rows(
+        text_chunks: List[TextChunk],
+        source_id: UUID,
+        bot_id: UUID,
+        default_heading: Optional[str] = None
+    ) -> List[dict]:
+        """Convert TextChunk objects to dicts for database insertion"""
         chunks_data = []
         for text_chunk in text_chunks:
             chunk_dict = text_chunk.to_dict()
@@ -85,15 +101,7 @@ class ChunkService:
                 "bot_id": str(bot_id),
             })
             chunks_data.append(chunk_dict)
-
-        # Store chunks in database
-        try:
-            created_chunks = self.repository.create_chunks(chunks_data)
-            logger.debug(f"Chunks stored: source_id={source_id}, bot_id={bot_id}, count={len(created_chunks)}")
-            return created_chunks
-        except Exception as e:
-            logger.error(f"Chunk storage failed: source_id={source_id}, bot_id={bot_id}, error={str(e)}")
-            raise DatabaseError(f"Failed to store chunks: {str(e)}")
+        return chunks_data
 
     def get_chunks_by_source(
         self,
@@ -118,8 +126,7 @@ class ChunkService:
             DatabaseError: If database operation fails
         """
         # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        self.bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
 
         return self.repository.get_chunks_by_source(source_id)
 
@@ -145,8 +152,7 @@ class ChunkService:
             DatabaseError: If database operation fails
         """
         # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        self.bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
 
         return self.repository.get_chunks_by_bot(bot_id, limit)
 
@@ -173,8 +179,7 @@ class ChunkService:
             DatabaseError: If database operation fails
         """
         # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        self.bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
 
         chunk = self.repository.get_chunk_by_id(chunk_id)
         if not chunk:
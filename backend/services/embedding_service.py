@@ -1,15 +1,121 @@
-from typing import List, Optional, Tuple
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import hashlib
 import logging
 from uuid import UUID
 
-from services.embeddings.base import EmbeddingProvider, TransientEmbeddingError, FatalEmbeddingError
+import numpy as np
+
+from services.embeddings.base import (
+    EmbeddingProvider,
+    TransientEmbeddingError,
+    FatalEmbeddingError,
+    FatalProviderConfigError,
+)
 from config.settings import settings
 from services.embeddings.openai_provider import OpenAIEmbeddingProvider
 from services.embeddings.gemini_provider import GeminiEmbeddingProvider
 from repositories.chunk_repo import ChunkRepository
+from core.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Widget traffic repeats the same questions (FAQs); cached query vectors skip
+# the embedding API round trip. Keyed by provider chain + a digest of the
+# normalized text so memory stays bounded by vector size, not query length.
+_query_embedding_cache = TTLCache(maxsize=10000, ttl=24 * 3600)
+
+# Query batching: while a provider call is in flight, further queries wait up
+# to QUERY_BATCH_WINDOW_MS to share the next call (up to QUERY_BATCH_MAX texts)
+QUERY_BATCH_MAX = 32
+QUERY_BATCH_WINDOW_MS = 8
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-query embeddings into one provider call
+
+    A query submitted while the batcher is idle is sent immediately, so a
+    quiet process adds no latency. Queries arriving while a call is in flight
+    are collected for up to window_ms (or until max_batch is reached) and sent
+    together, amortizing the HTTPS round trip across concurrent requests.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Tuple[np.ndarray, str]],
+        max_batch: int = QUERY_BATCH_MAX,
+        window_ms: float = QUERY_BATCH_WINDOW_MS,
+    ):
+        self._embed_fn = embed_fn
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight = 0
+
+    async def submit(self, text: str) -> Tuple[np.ndarray, str]:
+        """Embed one text as part of the next batch
+
+        Returns:
+            Tuple of (float32 vector, provider name)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch or not self._in_flight:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._in_flight += 1
+        asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        try:
+            vectors, provider = await asyncio.to_thread(self._embed_fn, [text for text, _ in batch])
+            if len(batch) > 1:
+                logger.debug(f"Embedded {len(batch)} queries in one batch via {provider}")
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    # Copy, so cached rows don't pin the whole batch array
+                    future.set_result((vectors[i].copy(), provider))
+        except Exception as e:
+            input_error = isinstance(e, FatalEmbeddingError) and not isinstance(e, FatalProviderConfigError)
+            if len(batch) > 1 and input_error:
+                # One bad input shouldn't fail its neighbours: retry one by one.
+                # Transient and config errors would fail every item the same way.
+                await asyncio.gather(*(self._run_single(text, future) for text, future in batch))
+            else:
+                self._fail(batch, e)
+        finally:
+            self._in_flight -= 1
+
+    async def _run_single(self, text: str, future: asyncio.Future) -> None:
+        try:
+            vectors, provider = await asyncio.to_thread(self._embed_fn, [text])
+            if not future.done():
+                future.set_result((vectors[0], provider))
+        except Exception as e:
+            self._fail([(text, future)], e)
+
+    @staticmethod
+    def _fail(batch: List[Tuple[str, asyncio.Future]], error: Exception) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+_batchers: Dict[Hashable, EmbeddingBatcher] = {}
+
 
 class EmbeddingService:
     def __init__(
@@ -20,22 +126,24 @@ class EmbeddingService:
         gemini_model: str = settings.gemini_embedding_model,
         embedding_dimension: int = settings.embedding_dimension,
         batch_size: int = settings.embedding_batch_size,
+        max_concurrency: int = settings.embedding_max_concurrency,
     ):
         self.access_token = access_token
         self.batch_size = batch_size
+        self.max_concurrency = max(1, max_concurrency)
         self.embedding_dimension = embedding_dimension
 
         self.providers: List[EmbeddingProvider] = []
         # Preferred-first provider order
         if preferred == "openai":
             self.providers = [
-                OpenAIEmbeddingProvider(model=openai_model),
+                OpenAIEmbeddingProvider(model=openai_model, target_dimension=embedding_dimension),
                 GeminiEmbeddingProvider(model=gemini_model, target_dimension=embedding_dimension),
             ]
         else:
             self.providers = [
                 GeminiEmbeddingProvider(model=gemini_model, target_dimension=embedding_dimension),
-                OpenAIEmbeddingProvider(model=openai_model),
+                OpenAIEmbeddingProvider(model=openai_model, target_dimension=embedding_dimension),
             ]
 
         self.repository = ChunkRepository(access_token=access_token)
@@ -43,23 +151,39 @@ class EmbeddingService:
     def _select_provider(self) -> List[EmbeddingProvider]:
         return self.providers
 
-    def _embed_with_fallback(self, texts: List[str], user: Optional[str] = None) -> Tuple[List[List[float]], str]:
+    def _embed_with_fallback(self, texts: List[str], user: Optional[str] = None) -> Tuple[np.ndarray, str]:
         last_error: Optional[Exception] = None
         for provider in self._select_provider():
             try:
                 vectors = provider.embed_texts(texts, user=user)
-                # dimension guard
-                if any(len(v) != self.embedding_dimension for v in vectors):
+                # Sanity check: providers request the target size from the API, so a
+                # mismatch means a misconfigured model/dimension pair
+                if vectors.ndim != 2 or vectors.shape[0] != len(texts):
+                    raise TransientEmbeddingError(
+                        f"{provider.name}:{provider.model} returned {vectors.shape} vectors for {len(texts)} texts"
+                    )
+                if vectors.shape[1] != self.embedding_dimension:
+                    if vectors.shape[1] < self.embedding_dimension:
+                        raise TransientEmbeddingError(
+                            f"{provider.name}:{provider.model} returned vectors shorter than {self.embedding_dimension} dims"
+                        )
                     logger.warning(
-                        f"Provider {provider.name}:{provider.model} returned mismatched dimension; conforming"
+                        f"Provider {provider.name}:{provider.model} returned more than {self.embedding_dimension} dims; truncating"
                     )
-                    vectors = [v[: self.embedding_dimension] for v in vectors]
-                return vectors, provider.name
-            except FatalEmbeddingError as e:
-                logger.error(f"Fatal error from {provider.name} embeddings: {e}")
+                    vectors = vectors[:, : self.embedding_dimension]
+                # Callers get packed float32 rows whatever the provider returned; a
+                # no-op (no copy) for the common case, and what pgvector's binary
+                # codec and numpy-aware JSON encoding expect
+                return np.ascontiguousarray(vectors, dtype=np.float32), provider.name
+            except FatalProviderConfigError as e:
+                # This provider is unusable (SDK/key), the fallback provider may not be
+                logger.error(f"Provider {provider.name} is misconfigured: {e}; trying fallback")
                 last_error = e
-                # Fatal: do not continue to next (but we still try fallback provider)
                 continue
+            except FatalEmbeddingError as e:
+                # Not provider-specific (e.g. invalid input): the fallback would fail too
+                logger.error(f"Fatal error from {provider.name} embeddings: {e}")
+                raise
             except TransientEmbeddingError as e:
                 logger.warning(f"Transient error from {provider.name} embeddings: {e}; trying fallback")
                 last_error = e
@@ -70,33 +194,50 @@ class EmbeddingService:
                 continue
         raise TransientEmbeddingError(str(last_error) if last_error else "Embedding failed")
 
-    def embed_chunks_for_source(self, source_id: UUID, texts: List[str], chunk_ids: List[UUID]) -> int:
-        if not texts or not chunk_ids or len(texts) != len(chunk_ids):
-            logger.warning("embed_chunks_for_source called with invalid inputs")
-            return 0
-
-        total_updated = 0
-        total = len(texts)
-        total_batches = (total + self.batch_size - 1) // self.batch_size
-        logger.info(f"Embedding started: source_id={source_id}, chunks={total}, batch_size={self.batch_size}, batches={total_batches}")
-
-        for i in range(0, total, self.batch_size):
-            batch_num = (i // self.batch_size) + 1
-            batch_texts = texts[i : i + self.batch_size]
-            batch_ids = chunk_ids[i : i + self.batch_size]
-            logger.debug(
-                f"Processing batch {batch_num}/{total_batches} for source {source_id}: size={len(batch_texts)}"
-            )
-
-            vectors, provider_used = self._embed_with_fallback(batch_texts)
-            logger.debug(
-                f"Embedded batch {batch_num}/{total_batches} (size={len(batch_texts)}) using provider {provider_used}"
-            )
-            # Persist embeddings in batch
-            updated = self.repository.update_chunk_embeddings(batch_ids, vectors)
-            logger.debug(
-                f"Updated {updated}/{len(batch_ids)} chunk embeddings for batch {batch_num}/{total_batches}"
-            )
-            total_updated += updated
-        logger.info(f"Embedding completed: source_id={source_id}, updated={total_updated}/{total}")
-        return total_updated
+    async def embed_query_async(self, query_text: str) -> Tuple[np.ndarray, str]:
+        """Embed a single search query, reusing cached vectors for repeated queries
+
+        Cache misses are batched with concurrent queries into one provider call.
+
+        Args:
+            query_text: Raw user query
+
+        Returns:
+            Tuple of (read-only float32 vector, provider name)
+        """
+        key = self._query_cache_key(query_text)
+        cached = _query_embedding_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # One batcher per provider configuration (key[:2]) and process
+        batcher = _batchers.get(key[:2])
+        if batcher is None:
+            batcher = _batchers.setdefault(key[:2], EmbeddingBatcher(self._embed_with_fallback))
+        vector, provider = await batcher.submit(query_text)
+        return self._cache_query_vector(key, vector, provider)
+
+    def _query_cache_key(self, query_text: str) -> tuple:
+        normalized = " ".join(query_text.split()).lower()
+        return (
+            tuple((p.name, p.model) for p in self.providers),
+            self.embedding_dimension,
+            hashlib.sha1(normalized.encode("utf-8")).digest(),
+        )
+
+    @staticmethod
+    def _cache_query_vector(key: tuple, vector: np.ndarray, provider: str) -> Tuple[np.ndarray, str]:
+        # Shared across requests, so guard against in-place modification
+        vector.setflags(write=False)
+        _query_embedding_cache.set(key, (vector, provider))
+        return vector, provider
+
+    def embed_batch(self, source_id: UUID, texts: List[str], chunk_ids: List[UUID], batch_num: int = 1) -> int:
+        """Embed and persist one batch of chunks (used by streaming ingestion)"""
+        logger.debug(f"Processing batch {batch_num} for source {source_id}: size={len(texts)}")
+        vectors, provider_used = self._embed_with_fallback(texts)
+        logger.debug(f"Embedded batch {batch_num} (size={len(texts)}) using provider {provider_used}")
+        # Persist embeddings in batch
+        updated = self.repository.update_chunk_embeddings(chunk_ids, vectors)
+        logger.debug(f"Updated {updated}/{len(chunk_ids)} chunk embeddings for batch {batch_num}")
+        return updated
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import List, Optional
 
+import numpy as np
+
 
 class EmbeddingError(Exception):
     """Generic embedding error."""
@@ -11,7 +13,11 @@ class TransientEmbeddingError(EmbeddingError):
 
 
 class FatalEmbeddingError(EmbeddingError):
-    """Errors that should not be retried (e.g., invalid key)."""
+    """Errors that should not be retried with any provider (e.g., invalid input)."""
+
+
+class FatalProviderConfigError(FatalEmbeddingError):
+    """Errors specific to one provider's setup (missing SDK, bad/missing key); another provider may still work."""
 
 
 class EmbeddingProvider(ABC):
@@ -33,9 +39,9 @@ class EmbeddingProvider(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def embed_texts(self, texts: List[str], *, user: Optional[str] = None) -> List[List[float]]:
+    def embed_texts(self, texts: List[str], *, user: Optional[str] = None) -> np.ndarray:
         """
         Compute embeddings for a batch of texts.
-        Must return one vector per input text.
+        Must return a float32 array of shape (len(texts), dimension), one row per input text.
         """
         raise NotImplementedError
@@ -1,23 +1,46 @@
 import os
+import re
 import logging
 from typing import List, Optional
 
+import numpy as np
+
 from services.embeddings.base import (
     EmbeddingProvider,
+    EmbeddingError,
     TransientEmbeddingError,
     FatalEmbeddingError,
+    FatalProviderConfigError,
 )
 
 logger = logging.getLogger(__name__)
 
+# Error classification, compiled once instead of substring scans per failure
+_TRANSIENT_RE = re.compile(r"rate|quota|temporar|try again|timeout", re.IGNORECASE)
+_CONFIG_RE = re.compile(r"api key|unauthorized|forbidden|permission denied|not found|does not exist", re.IGNORECASE)
+_FATAL_RE = re.compile(r"invalid", re.IGNORECASE)
+
+# Full output size per model, used to decide whether to request a reduced size
+_NATIVE_DIMENSIONS = {
+    "text-embedding-004": 768,
+    "embedding-001": 768,
+    "gemini-embedding-001": 3072,
+}
+
+# genai.configure() rebuilds the SDK's global client; only redo it when the key changes
+_configured_api_key: Optional[str] = None
+
 
 class GeminiEmbeddingProvider(EmbeddingProvider):
-    def __init__(self, model: str = "text-embedding-004", target_dimension: int = 1536, on_mismatch: str = "truncate"):
+    def __init__(self, model: str = "text-embedding-004", target_dimension: int = 1536):
         self._model = model
         self._target_dimension = target_dimension
-        self._on_mismatch = on_mismatch
-        # text-embedding-004 returns 3072 dims
-        self._dimension = 3072 if model == "text-embedding-004" else target_dimension
+        native = _NATIVE_DIMENSIONS.get(model.split("/")[-1])
+        # Ask the API for the target size (output_dimensionality) instead of
+        # truncating full-size vectors locally; models smaller than the target
+        # return their native size
+        self._output_dimensionality = target_dimension if native is None or target_dimension < native else None
+        self._dimension = target_dimension if self._output_dimensionality else native
 
     @property
     def name(self) -> str:
@@ -31,50 +54,52 @@ class GeminiEmbeddingProvider(EmbeddingProvider):
     def dimension(self) -> int:
         return self._dimension
 
-    def _conform_dimension(self, vec: List[float]) -> List[float]:
-        if len(vec) == self._target_dimension:
-            return vec
-        if self._on_mismatch == "truncate":
-            return vec[: self._target_dimension]
-        if self._on_mismatch == "pad":
-            return (vec + [0.0] * self._target_dimension)[: self._target_dimension]
-        # default truncate
-        return vec[: self._target_dimension]
-
-    def embed_texts(self, texts: List[str], *, user: Optional[str] = None) -> List[List[float]]:
+    def embed_texts(self, texts: List[str], *, user: Optional[str] = None) -> np.ndarray:
+        global _configured_api_key
         try:
             import google.generativeai as genai
         except Exception as e:
-            raise FatalEmbeddingError(f"Google Generative AI SDK not available: {e}")
+            raise FatalProviderConfigError(f"Google Generative AI SDK not available: {e}")
 
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
         if not api_key:
-            raise FatalEmbeddingError("Missing GOOGLE_API_KEY/GEMINI_API_KEY")
+            raise FatalProviderConfigError("Missing GOOGLE_API_KEY/GEMINI_API_KEY")
 
         if not texts:
-            return []
+            return np.empty((0, self._dimension), dtype=np.float32)
 
         try:
-            genai.configure(api_key=api_key)
+            if _configured_api_key != api_key:
+                genai.configure(api_key=api_key)
+                _configured_api_key = api_key
             # Ensure model id is in the correct form for the SDK
             model_id = self._model if self._model.startswith("models/") else f"models/{self._model}"
-            # Batch by looping; embed_content is per-text
+            # A list of texts is sent as batchEmbedContents requests (the SDK
+            # splits into chunks of 100), one round trip instead of one per text
+            res = genai.embed_content(
+                model=model_id,
+                content=list(texts),
+                output_dimensionality=self._output_dimensionality,
+            )
+            raw_vectors = res.get("embedding")
+            if not isinstance(raw_vectors, list) or len(raw_vectors) != len(texts):
+                raise TransientEmbeddingError("Invalid embedding response from Gemini")
             vectors: List[List[float]] = []
-            for t in texts:
-                res = genai.embed_content(model=model_id, content=t)
-                raw = res.get("embedding") or res.get("data", [{}])[0].get("embedding")
-                if isinstance(raw, dict) and "values" in raw:
-                    vec = raw["values"]
-                else:
-                    vec = raw
+            for raw in raw_vectors:
+                vec = raw["values"] if isinstance(raw, dict) and "values" in raw else raw
                 if not isinstance(vec, list):
                     raise TransientEmbeddingError("Invalid embedding response from Gemini")
-                vectors.append(self._conform_dimension(vec))
-            return vectors
+                vectors.append(vec)
+            return np.asarray(vectors, dtype=np.float32)
+        except EmbeddingError:
+            # Already classified above (e.g. malformed response is transient)
+            raise
         except Exception as e:
-            message = str(e).lower()
-            if any(t in message for t in ["rate", "quota", "temporar", "try again", "timeout"]):
+            message = str(e)
+            if _TRANSIENT_RE.search(message):
                 raise TransientEmbeddingError(str(e))
-            if any(t in message for t in ["api key", "invalid", "unauthorized", "forbidden"]):
+            if _CONFIG_RE.search(message):
+                raise FatalProviderConfigError(str(e))
+            if _FATAL_RE.search(message):
                 raise FatalEmbeddingError(str(e))
             raise TransientEmbeddingError(str(e))
@@ -1,18 +1,69 @@
 import os
+import re
+import base64
 import logging
+import threading
 from typing import List, Optional
 
+import httpx
+import numpy as np
+
+try:
+    import orjson as _json
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    import json as _json
+
 from services.embeddings.base import (
     EmbeddingProvider,
     TransientEmbeddingError,
     FatalEmbeddingError,
+    FatalProviderConfigError,
 )
 
 logger = logging.getLogger(__name__)
 
+# Error classification, compiled once instead of substring scans per failure
+_TRANSIENT_RE = re.compile(r"rate|overloaded|timeout|temporar|try again", re.IGNORECASE)
+_CONFIG_RE = re.compile(r"api key|unauthorized|forbidden|permission denied|not found|does not exist", re.IGNORECASE)
+_FATAL_RE = re.compile(r"invalid", re.IGNORECASE)
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+
+# One HTTP client (and connection pool) for the process. The embeddings
+# endpoint is called directly instead of through the SDK: vectors come back
+# base64-encoded and are decoded straight into numpy, skipping per-float
+# JSON parsing and pydantic model construction. No retries here, since
+# EmbeddingService already falls back across providers.
+_http_client: Optional[httpx.Client] = None
+_http_client_lock = threading.Lock()
+
+
+def _get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = httpx.Client(
+                    base_url=OPENAI_BASE_URL,
+                    timeout=httpx.Timeout(30.0, connect=5.0),
+                    limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                )
+    return _http_client
+
+
+def _classify_status(status_code: int, message: str) -> Exception:
+    """Map an HTTP error response to the provider error hierarchy"""
+    if status_code == 429 or status_code >= 500:
+        return TransientEmbeddingError(message)
+    if status_code in (401, 403, 404):
+        return FatalProviderConfigError(message)
+    if status_code == 400:
+        return FatalEmbeddingError(message)
+    return TransientEmbeddingError(message)
+
 
 class OpenAIEmbeddingProvider(EmbeddingProvider):
-    def __init__(self, model: str = "text-embedding-3-large"):
+    def __init__(self, model: str = "text-embedding-3-large", target_dimension: Optional[int] = None):
         self._model = model
         # text-embedding-3-large outputs 3072 dims; -small outputs 1536
         if model == "text-embedding-3-small":
@@ -22,6 +73,12 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
         else:
             # default to 1536 for compatibility unless overridden
             self._dimension = 1536
+        # text-embedding-3 models can return shortened vectors server-side
+        # (the "dimensions" parameter); older models ignore it and reject the param
+        self._request_dimensions: Optional[int] = None
+        if target_dimension and model.startswith("text-embedding-3") and target_dimension < self._dimension:
+            self._request_dimensions = target_dimension
+            self._dimension = target_dimension
 
     @property
     def name(self) -> str:
@@ -35,33 +92,51 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
     def dimension(self) -> int:
         return self._dimension
 
-    def embed_texts(self, texts: List[str], *, user: Optional[str] = None) -> List[List[float]]:
-        try:
-            from openai import OpenAI
-        except Exception as e:
-            raise FatalEmbeddingError(f"OpenAI SDK not available: {e}")
-
+    def embed_texts(self, texts: List[str], *, user: Optional[str] = None) -> np.ndarray:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
-            raise FatalEmbeddingError("Missing OPENAI_API_KEY")
+            raise FatalProviderConfigError("Missing OPENAI_API_KEY")
 
         if not texts:
-            return []
+            return np.empty((0, self._dimension), dtype=np.float32)
+
+        params = {"model": self._model, "input": texts, "encoding_format": "base64"}
+        if user:
+            params["user"] = user
+        if self._request_dimensions:
+            params["dimensions"] = self._request_dimensions
 
         try:
-            client = OpenAI(api_key=api_key)
-            response = client.embeddings.create(
-                model=self._model,
-                input=texts,
-                user=user,
+            response = _get_http_client().post(
+                "/embeddings",
+                content=_json.dumps(params),
+                headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
             )
-            vectors = [item.embedding for item in response.data]
-            return vectors
+        except httpx.TimeoutException as e:
+            raise TransientEmbeddingError(f"OpenAI embeddings timeout: {e}")
+        except httpx.HTTPError as e:
+            raise TransientEmbeddingError(f"OpenAI embeddings request failed: {e}")
+
+        if response.status_code != 200:
+            raise _classify_status(
+                response.status_code,
+                f"OpenAI embeddings error {response.status_code}: {response.text[:500]}",
+            )
+
+        try:
+            data = _json.loads(response.content)["data"]
+            # The API returns items in input order, but index is authoritative
+            data.sort(key=lambda item: item["index"])
+            buffer = b"".join(base64.b64decode(item["embedding"]) for item in data)
+            vectors = np.frombuffer(buffer, dtype=np.float32)
+            return vectors.reshape(len(data), -1)
         except Exception as e:
-            message = str(e).lower()
-            if any(t in message for t in ["rate", "overloaded", "timeout", "temporar", "try again"]):
-                raise TransientEmbeddingError(str(e))
-            if any(t in message for t in ["api key", "invalid", "unauthorized", "forbidden"]):
-                raise FatalEmbeddingError(str(e))
+            message = str(e)
+            if _TRANSIENT_RE.search(message):
+                raise TransientEmbeddingError(message)
+            if _CONFIG_RE.search(message):
+                raise FatalProviderConfigError(message)
+            if _FATAL_RE.search(message):
+                raise FatalEmbeddingError(message)
             # default transient to allow fallback
-            raise TransientEmbeddingError(str(e))
+            raise TransientEmbeddingError(message)
@@ -18,7 +18,7 @@ class LLMService:
         self.openai_model = openai_model
         self.gemini_model = gemini_model
 
-    def _generate_openai(self, prompt: str):
+    def _generate_openai(self, prompt: str, system_prompt: Optional[str] = None):
         try:
             from openai import OpenAI
         except Exception as e:
@@ -27,9 +27,12 @@ class LLMService:
         if not api_key:
             raise RuntimeError("Missing OPENAI_API_KEY")
         client = OpenAI(api_key=api_key)
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
         resp = client.chat.completions.create(
             model=self.openai_model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=messages,
             temperature=0.2,
         )
         text = resp.choices[0].message.content or ""
@@ -41,7 +44,7 @@ class LLMService:
         }
         return text, usage_out
 
-    def _generate_gemini(self, prompt: str):
+    def _generate_gemini(self, prompt: str, system_prompt: Optional[str] = None):
         try:
             import google.generativeai as genai
         except Exception as e:
@@ -50,7 +53,7 @@ class LLMService:
         if not api_key:
             raise RuntimeError("Missing GOOGLE_API_KEY/GEMINI_API_KEY")
         genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(self.gemini_model)
+        model = genai.GenerativeModel(self.gemini_model, system_instruction=system_prompt or None)
         resp = model.generate_content(prompt)
         text = (getattr(resp, "text", None) or resp.candidates[0].content.parts[0].text)
         um = getattr(resp, "usage_metadata", None)
@@ -62,16 +65,16 @@ class LLMService:
         }
         return text, usage_out
 
-    def generate(self, prompt: str):
+    def generate(self, prompt: str, system_prompt: Optional[str] = None):
         providers = [self.preferred, "openai" if self.preferred == "gemini" else "gemini"]
         last_err: Optional[Exception] = None
         for p in providers:
             try:
                 if p == "openai":
-                    text, usage = self._generate_openai(prompt)
+                    text, usage = self._generate_openai(prompt, system_prompt)
                     return text, usage, "openai"
                 else:
-                    text, usage = self._generate_gemini(prompt)
+                    text, usage = self._generate_gemini(prompt, system_prompt)
                     return text, usage, "gemini"
             except Exception as e:
                 logger.warning(f"LLM provider {p} failed: {e}")
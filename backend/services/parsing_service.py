@@ -6,18 +6,118 @@ Coordinates between parsers, storage, and source repository.
 Handles parsing asynchronously with proper error handling and status updates.
 """
 
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
+import asyncio
 import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import httpx
+from config.settings import settings
 from config.supabasedb import get_supabase_client
-from parsers.factory import ParserFactory
+from parsers.factory import get_parser_factory
 from parsers.base import ParseResult
+from parsers.worker import run_parse
 from repositories.source_repo import SourceRepository
 from services.chunk_service import ChunkService
-from models.source_model import SourceStatus, SourceType
+from models.source_model import SourceStatus, SourceType, FILE_SOURCE_TYPES
 
 logger = logging.getLogger(__name__)
 
+# Sources ingested concurrently per process. Parsing and embedding are the
+# expensive stages, so more in-flight sources than cores only adds contention.
+INGEST_CONCURRENCY = max(1, os.cpu_count() or 1)
+_ingest_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_ingest_semaphore() -> asyncio.Semaphore:
+    # Created lazily so it binds to the running event loop
+    global _ingest_semaphore
+    if _ingest_semaphore is None:
+        _ingest_semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+    return _ingest_semaphore
+
+
+# Embedding API calls in flight across all sources being ingested, so
+# concurrent sources share the provider budget instead of multiplying it
+_embed_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_embed_semaphore() -> asyncio.Semaphore:
+    global _embed_semaphore
+    if _embed_semaphore is None:
+        _embed_semaphore = asyncio.Semaphore(max(1, settings.embedding_max_concurrency))
+    return _embed_semaphore
+
+
+# PDF/DOCX extraction is CPU-bound and holds the GIL, so it runs in worker
+# processes shared by all ParsingService instances, leaving a core for the
+# event loop and request threads.
+PARSE_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                # Not fork: the pool is created inside a running, multi-threaded
+                # server, and forked children can deadlock on inherited locks.
+                # Preloading the worker module means each worker starts with
+                # the parsers imported, and without the rest of the app.
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["parsers.worker"])
+                _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=context)
+    return _parse_pool
+
+
+def shutdown_parse_pool() -> None:
+    """Stop parser worker processes (called on application shutdown)"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False, cancel_futures=True)
+            _parse_pool = None
+
+
+# Source files are streamed from storage to a local temp file in chunks
+# rather than buffered whole in memory; parser workers then read the file
+# from disk, so file bytes are never pickled through the process pool.
+SIGNED_URL_TTL_SECONDS = 300
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+_download_client: Optional[httpx.Client] = None
+_download_client_lock = threading.Lock()
+
+
+def _get_download_client() -> httpx.Client:
+    global _download_client
+    if _download_client is None:
+        with _download_client_lock:
+            if _download_client is None:
+                _download_client = httpx.Client(timeout=httpx.Timeout(60.0, connect=5.0))
+    return _download_client
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError as e:
+        logger.warning("Failed to remove temp file: path=%s, error=%s", path, e)
+
+
+# Stored chunk batches waiting for embedding; bounds memory when the
+# embedding API is slower than chunk inserts
+EMBED_QUEUE_SIZE = 4
+
+
+class _ChunkingFailed(Exception):
+    """Chunking or chunk storage failed (as opposed to embedding)"""
+
 
 class ParsingService:
     """
@@ -39,10 +139,11 @@ class ParsingService:
             access_token: User's JWT token for RLS-enabled operations
         """
         self.access_token = access_token
-        self.parser_factory = ParserFactory()
+        self.parser_factory = get_parser_factory()
         self.source_repo = SourceRepository(access_token=access_token)
         self.chunk_service = ChunkService(access_token=access_token)
         self.storage_client = get_supabase_client(use_service_role=True)
+        self._pending_status_updates: List[asyncio.Task] = []
 
     @staticmethod
     def _derive_title_from_url(url: str) -> str:
@@ -62,7 +163,7 @@ class ParsingService:
         except Exception:
             return url
     
-    def parse_source(self, source_id: UUID, bot_id: UUID) -> bool:
+    async def parse_source(self, source_id: UUID, bot_id: UUID) -> bool:
         """
         Parse a source document.
         
@@ -72,7 +173,12 @@ class ParsingService:
         3. Selects appropriate parser
         4. Extracts text
         5. Updates source status
-        6. Stores extracted text (to be used in Phase 5 for chunking)
+        6. Chunks and embeds the extracted text
+        
+        Each stage is awaited, with blocking I/O and parser work running off
+        the event loop, so concurrent ingestions overlap: one source can
+        download while another parses or embeds. The number of sources in
+        flight per process is capped by a shared semaphore.
         
         Args:
             source_id: Source UUID
@@ -81,16 +187,22 @@ class ParsingService:
         Returns:
             True if parsing succeeded, False otherwise
         """
+        async with _get_ingest_semaphore():
+            try:
+                return await self._run_pipeline(source_id, bot_id)
+            finally:
+                await self._flush_status_updates()
+                # Chunks may have been added even if a later stage failed
+                from services.rag_service import invalidate_retrieval_cache
+                invalidate_retrieval_cache(bot_id)
+
+    async def _run_pipeline(self, source_id: UUID, bot_id: UUID) -> bool:
         try:
-            # Update status to parsing
-            self.source_repo.update_source_status(
-                source_id=source_id,
-                status=SourceStatus.PARSING.value
-            )
-            logger.info(f"Parsing started: source_id={source_id}, bot_id={bot_id}")
+            # Intermediate status: written in the background while the pipeline proceeds
+            self._update_status_background(source_id, SourceStatus.PARSING.value)
+            source = await asyncio.to_thread(self.source_repo.get_source_by_id, source_id)
+            logger.debug("Parsing started: source_id=%s, bot_id=%s", source_id, bot_id)
             
-            # Get source metadata
-            source = self.source_repo.get_source_by_id(source_id)
             if not source:
                 raise ValueError(f"Source {source_id} not found")
             
@@ -99,21 +211,16 @@ class ParsingService:
             mime_type = source.get("mime_type")
             
             # Handle file sources
-            if source_type in (SourceType.PDF.value, SourceType.DOCX.value, SourceType.TEXT.value):
+            if source_type in FILE_SOURCE_TYPES:
                 if not storage_path:
                     raise ValueError(f"Storage path missing for source {source_id}")
                 
-                logger.debug(f"Parsing file: source_id={source_id}, type={source_type}, mime_type={mime_type}, path={storage_path}")
-                
-                # Download file from storage
-                file_content = self._download_file(storage_path)
-                file_size = len(file_content)
-                logger.debug(f"File downloaded: source_id={source_id}, size_bytes={file_size}")
+                logger.debug("Parsing file: source_id=%s, type=%s, mime_type=%s, path=%s", source_id, source_type, mime_type, storage_path)
                 
                 # Get file extension from storage path
                 file_extension = self._get_file_extension(storage_path)
                 
-                # Get parser
+                # Get parser (before downloading, so unsupported files are never fetched)
                 parser = self.parser_factory.get_parser(mime_type or "", file_extension)
                 if not parser:
                     raise ValueError(
@@ -121,98 +228,85 @@ class ParsingService:
                         f"MIME type: {mime_type}"
                     )
                 
-                logger.debug(f"Parser selected: source_id={source_id}, parser={parser.get_name()}")
+                logger.debug("Parser selected: source_id=%s, parser=%s", source_id, parser.get_name())
+                
+                # Download file from storage
+                local_path, file_size = await self._download_file_async(storage_path)
+                logger.debug("File downloaded: source_id=%s, size_bytes=%d", source_id, file_size)
                 
                 # Parse document
-                result: ParseResult = parser.parse(file_content, storage_path)
+                try:
+                    result: ParseResult = await self._parse_async(
+                        local_path, storage_path, mime_type or "", file_extension
+                    )
+                finally:
+                    _remove_file(local_path)
                 
                 if not result.success:
                     # Update status to failed
-                    self.source_repo.update_source_status(
-                        source_id=source_id,
-                        status=SourceStatus.FAILED.value,
+                    await self._set_final_status(
+                        source_id,
+                        SourceStatus.FAILED.value,
                         error_message=result.error_message
                     )
-                    logger.error(f"Parsing failed: source_id={source_id}, error={result.error_message}")
+                    logger.error("Parsing failed: source_id=%s, error=%s", source_id, result.error_message)
                     return False
                 
-                # Store extracted text (for now, we'll just log it)
-                # In Phase 5, we'll create chunks from this text
                 extracted_text = result.text
                 metadata = result.metadata
                 
-                # Log extracted text details
-                text_length = len(extracted_text)
-                text_preview = extracted_text[:500] if text_length > 500 else extracted_text
-                text_preview_suffix = "..." if text_length > 500 else ""
-                
-                # Build metadata summary
-                metadata_summary = []
-                if "page_count" in metadata:
-                    metadata_summary.append(f"{metadata['page_count']} pages")
-                if "paragraph_count" in metadata:
-                    metadata_summary.append(f"{metadata['paragraph_count']} paragraphs")
-                if "total_lines" in metadata:
-                    metadata_summary.append(f"{metadata['total_lines']} lines")
-                if "encoding" in metadata:
-                    metadata_summary.append(f"encoding: {metadata['encoding']}")
-                
-                metadata_str = ", ".join(metadata_summary) if metadata_summary else "no metadata"
-                
-                logger.info(f"Parsing completed: source_id={source_id}, chars={text_length}, metadata={metadata_str}")
-                
-                # Log full text if it's relatively small (for debugging)
-                if text_length <= 5000:
-                    logger.debug(f"Full extracted text for source {source_id}:\n{extracted_text}")
+                # Summary is only built when it will actually be logged
+                if logger.isEnabledFor(logging.DEBUG):
+                    text_length = len(extracted_text)
+                    metadata_summary = []
+                    if "page_count" in metadata:
+                        metadata_summary.append(f"{metadata['page_count']} pages")
+                    if "paragraph_count" in metadata:
+                        metadata_summary.append(f"{metadata['paragraph_count']} paragraphs")
+                    if "total_lines" in metadata:
+                        metadata_summary.append(f"{metadata['total_lines']} lines")
+                    if "encoding" in metadata:
+                        metadata_summary.append(f"encoding: {metadata['encoding']}")
+                    
+                    metadata_str = ", ".join(metadata_summary) if metadata_summary else "no metadata"
+                    
+                    logger.debug("Parsing completed: source_id=%s, chars=%d, metadata=%s", source_id, text_length, metadata_str)
+                    
+                    # Log full text if it's relatively small (for debugging)
+                    if text_length <= 5000:
+                        logger.debug("Full extracted text for source %s:\n%s", source_id, extracted_text)
                 
-                # Chunk the extracted text and store in database
-                logger.debug(f"Chunking started: source_id={source_id}")
+                # Chunk, store and embed as a pipeline: embedding of the first
+                # stored batch starts while later batches are still being inserted
+                logger.debug("Chunking started: source_id=%s", source_id)
                 try:
-                    created_chunks = self.chunk_service.chunk_and_store_source(
+                    chunk_count, updated = await self._chunk_and_embed_async(
                         source_id=source_id,
                         bot_id=bot_id,
                         text=extracted_text,
                         source_type=SourceType(source_type)
                     )
-                    
-                    logger.info(f"Chunking completed: source_id={source_id}, chunks={len(created_chunks)}")
-                    
-                except Exception as e:
-                    logger.error(f"Chunking failed: source_id={source_id}, error={str(e)}", exc_info=True)
+                    logger.debug("Embeddings updated: source_id=%s, chunks=%s/%s", source_id, updated, chunk_count)
+                except _ChunkingFailed as e:
+                    logger.error("Chunking failed: source_id=%s, error=%s", source_id, e, exc_info=True)
                     # Update status to failed if chunking fails
-                    self.source_repo.update_source_status(
-                        source_id=source_id,
-                        status=SourceStatus.FAILED.value,
+                    await self._set_final_status(
+                        source_id,
+                        SourceStatus.FAILED.value,
                         error_message=f"Chunking failed: {str(e)}"
                     )
                     return False
-                
-                # Phase 6: Generate embeddings for created chunks
-                try:
-                    from services.embedding_service import EmbeddingService
-                    chunk_texts = [c.get("excerpt", "") for c in created_chunks]
-                    chunk_ids = [c.get("id") for c in created_chunks]
-                    embedding_service = EmbeddingService(access_token=self.access_token)
-                    updated = embedding_service.embed_chunks_for_source(
-                        source_id=source_id,
-                        texts=chunk_texts,
-                        chunk_ids=chunk_ids,
-                    )
-                    logger.info(f"Embeddings updated: source_id={source_id}, chunks={updated}/{len(created_chunks)}")
                 except Exception as e:
-                    logger.error(f"Embedding failed: source_id={source_id}, error={str(e)}", exc_info=True)
-                    self.source_repo.update_source_status(
-                        source_id=source_id,
-                        status=SourceStatus.FAILED.value,
+                    logger.error("Embedding failed: source_id=%s, error=%s", source_id, e, exc_info=True)
+                    await self._set_final_status(
+                        source_id,
+                        SourceStatus.FAILED.value,
                         error_message=f"Embedding failed: {str(e)}"
                     )
                     return False
 
                 # Update status to indexed (chunking + embeddings complete)
-                self.source_repo.update_source_status(
-                    source_id=source_id,
-                    status=SourceStatus.INDEXED.value
-                )
+                await self._set_final_status(source_id, SourceStatus.INDEXED.value)
 
                 return True
             
@@ -224,26 +318,23 @@ class ParsingService:
                     start_url = source.get("original_url") or source.get("canonical_url")
                     if not start_url:
                         raise ValueError("Source has no URL")
-                    logger.info(f"Crawl started: source_id={source_id}, url={start_url}")
-                    crawl_result = crawler.crawl_single(start_url)
+                    logger.debug("Crawl started: source_id=%s, url=%s", source_id, start_url)
+                    crawl_result = await asyncio.to_thread(crawler.crawl_single, start_url)
                     if not crawl_result.success:
-                        self.source_repo.update_source_status(
-                            source_id=source_id,
-                            status=SourceStatus.FAILED.value,
+                        await self._set_final_status(
+                            source_id,
+                            SourceStatus.FAILED.value,
                             error_message=f"Crawl failed: {crawl_result.error}"
                         )
-                        logger.error(f"Crawl failed: source_id={source_id}, error={crawl_result.error}")
+                        logger.error("Crawl failed: source_id=%s, error=%s", source_id, crawl_result.error)
                         return False
 
                     # Update source with canonical_url and metadata
-                    try:
-                        self.source_repo.update_source_status(
-                            source_id=source_id,
-                            status=SourceStatus.PARSING.value,
-                            error_message=None
-                        )
-                    except Exception:
-                        pass
+                    self._update_status_background(
+                        source_id,
+                        SourceStatus.PARSING.value,
+                        error_message=None
+                    )
 
                     # Use extracted text and continue pipeline (chunk + embed)
                     extracted_text = crawl_result.text
@@ -261,52 +352,32 @@ class ParsingService:
                         default_heading = self._derive_title_from_url(crawl_result.canonical_url)
 
                     # Log details
-                    text_length = len(extracted_text)
-                    logger.info(f"Crawl completed: source_id={source_id}, url={crawl_result.canonical_url}, chars={text_length}")
+                    logger.debug("Crawl completed: source_id=%s, url=%s, chars=%d", source_id, crawl_result.canonical_url, len(extracted_text))
 
                     # Chunk and embed (reuse same flow as files)
-                    logger.debug(f"Chunking started: source_id={source_id}")
-                    created_chunks = self.chunk_service.chunk_and_store_source(
+                    logger.debug("Chunking started: source_id=%s", source_id)
+                    chunk_count, updated = await self._chunk_and_embed_async(
                         source_id=source_id,
                         bot_id=bot_id,
                         text=extracted_text,
                         source_type=SourceType.HTML,
                         default_heading=default_heading
                     )
-                    if not created_chunks:
-                        logger.warning(f"No chunks generated: source_id={source_id}, reason=empty_or_non_extractive")
-                        self.source_repo.update_source_status(
-                            source_id=source_id,
-                            status=SourceStatus.INDEXED.value
-                        )
+                    if not chunk_count:
+                        logger.warning("No chunks generated: source_id=%s, reason=empty_or_non_extractive", source_id)
+                        await self._set_final_status(source_id, SourceStatus.INDEXED.value)
                         return True
-                    else:
-                        logger.info(f"Chunking completed: source_id={source_id}, chunks={len(created_chunks)}")
-
-                    # Embeddings
-                    from services.embedding_service import EmbeddingService
-                    chunk_texts = [c.get("excerpt", "") for c in created_chunks]
-                    chunk_ids = [c.get("id") for c in created_chunks]
-                    embedding_service = EmbeddingService(access_token=self.access_token)
-                    updated = embedding_service.embed_chunks_for_source(
-                        source_id=source_id,
-                        texts=chunk_texts,
-                        chunk_ids=chunk_ids,
-                    )
-                    logger.info(f"Embeddings updated: source_id={source_id}, chunks={updated}/{len(created_chunks)}")
+                    logger.debug("Embeddings updated: source_id=%s, chunks=%s/%s", source_id, updated, chunk_count)
 
                     # Mark indexed
-                    self.source_repo.update_source_status(
-                        source_id=source_id,
-                        status=SourceStatus.INDEXED.value
-                    )
+                    await self._set_final_status(source_id, SourceStatus.INDEXED.value)
                     return True
                 except Exception as e:
                     error_msg = f"Crawl error: {str(e)}"
-                    logger.error(f"Crawl error: source_id={source_id}, error={str(e)}", exc_info=True)
-                    self.source_repo.update_source_status(
-                        source_id=source_id,
-                        status=SourceStatus.FAILED.value,
+                    logger.error("Crawl error: source_id=%s, error=%s", source_id, e, exc_info=True)
+                    await self._set_final_status(
+                        source_id,
+                        SourceStatus.FAILED.value,
                         error_message=error_msg
                     )
                     return False
@@ -316,46 +387,207 @@ class ParsingService:
                 
         except Exception as e:
             error_msg = f"Error parsing source {source_id}: {str(e)}"
-            logger.error(f"Parsing error: source_id={source_id}, bot_id={bot_id}, error={str(e)}", exc_info=True)
+            logger.error("Parsing error: source_id=%s, bot_id=%s, error=%s", source_id, bot_id, e, exc_info=True)
             
             # Update status to failed
             try:
-                self.source_repo.update_source_status(
-                    source_id=source_id,
-                    status=SourceStatus.FAILED.value,
+                await self._set_final_status(
+                    source_id,
+                    SourceStatus.FAILED.value,
                     error_message=error_msg
                 )
             except Exception as update_error:
-                logger.error(f"Status update failed: source_id={source_id}, error={str(update_error)}")
+                logger.error("Status update failed: source_id=%s, error=%s", source_id, update_error)
             
             return False
+
+    async def _update_status_async(
+        self,
+        source_id: UUID,
+        status: str,
+        error_message: Optional[str] = None
+    ) -> None:
+        """Update source status without blocking the event loop"""
+        await asyncio.to_thread(
+            self.source_repo.update_source_status,
+            source_id=source_id,
+            status=status,
+            error_message=error_message
+        )
+
+    def _update_status_background(
+        self,
+        source_id: UUID,
+        status: str,
+        error_message: Optional[str] = None
+    ) -> None:
+        """Start an intermediate status write without waiting for it"""
+        self._pending_status_updates.append(
+            asyncio.create_task(self._update_status_async(source_id, status, error_message))
+        )
+
+    async def _flush_status_updates(self) -> None:
+        """Wait for in-flight intermediate status writes, logging failures"""
+        pending, self._pending_status_updates = self._pending_status_updates, []
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.warning("Intermediate status update failed: error=%s", result)
+
+    async def _set_final_status(
+        self,
+        source_id: UUID,
+        status: str,
+        error_message: Optional[str] = None
+    ) -> None:
+        """Write a terminal status once earlier writes have landed, so it is never overwritten"""
+        await self._flush_status_updates()
+        await self._update_status_async(source_id, status, error_message)
+
+    async def _download_file_async(self, storage_path: str) -> Tuple[str, int]:
+        """Download a file from storage without blocking the event loop"""
+        return await asyncio.to_thread(self._download_file, storage_path)
+
+    async def _parse_async(
+        self,
+        local_path: str,
+        storage_path: str,
+        mime_type: str,
+        file_extension: Optional[str]
+    ) -> ParseResult:
+        """Run CPU-bound parser work in the shared process pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _get_parse_pool(), run_parse, local_path, storage_path, mime_type, file_extension
+        )
+
+    async def _chunk_and_embed_async(
+        self,
+        source_id: UUID,
+        bot_id: UUID,
+        text: str,
+        source_type: SourceType,
+        default_heading: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """
+        Chunk, store and embed text with storage and embedding overlapped.
+        
+        A producer inserts chunks batch by batch and hands each stored batch
+        to embedding workers through a bounded queue, so the embedding API is
+        busy while later batches are still being written.
+        
+        Returns:
+            Tuple of (chunks stored, chunks embedded)
+        
+        Raises:
+            _ChunkingFailed: If chunking or chunk storage fails
+            Exception: Any embedding failure, as raised by EmbeddingService
+        """
+        from services.embedding_service import EmbeddingService
+        embedding_service = EmbeddingService(access_token=self.access_token)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EMBED_QUEUE_SIZE)
+        workers = max(1, embedding_service.max_concurrency)
+        counts = {"chunks": 0, "embedded": 0}
+
+        async def produce() -> None:
+            batches = self.chunk_service.iter_chunk_batches(
+                source_id=source_id,
+                bot_id=bot_id,
+                text=text,
+                source_type=source_type,
+                batch_size=embedding_service.batch_size,
+                default_heading=default_heading
+            )
+            try:
+                while True:
+                    batch = await asyncio.to_thread(next, batches, None)
+                    if batch is None:
+                        break
+                    counts["chunks"] += len(batch)
+                    await queue.put(batch)
+            except Exception as e:
+                raise _ChunkingFailed(str(e)) from e
+            for _ in range(workers):
+                await queue.put(None)
+
+        async def consume() -> None:
+            batch_num = 0
+            while True:
+                batch = await queue.get()
+                if batch is None:
+                    return
+                batch_num += 1
+                # Single pass; inserted rows always carry id and excerpt (NOT NULL)
+                chunk_texts, chunk_ids = [], []
+                for c in batch:
+                    chunk_texts.append(c["excerpt"])
+                    chunk_ids.append(c["id"])
+                async with _get_embed_semaphore():
+                    counts["embedded"] += await asyncio.to_thread(
+                        embedding_service.embed_batch, source_id, chunk_texts, chunk_ids, batch_num
+                    )
+
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(workers)]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            # Producer first, so a storage failure is reported as such
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception():
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        logger.debug("Chunking completed: source_id=%s, chunks=%d", source_id, counts["chunks"])
+        return counts["chunks"], counts["embedded"]
     
-    def _download_file(self, storage_path: str) -> bytes:
+    def _download_file(self, storage_path: str) -> Tuple[str, int]:
         """
-        Download file from Supabase Storage.
+        Download file from Supabase Storage into a local temporary file.
+        
+        The file is streamed in chunks through a signed URL, so it is never
+        held in memory as a whole. The caller is responsible for deleting it.
         
         Args:
             storage_path: Path to file in storage bucket (format: bots/{bot_id}/sources/{source_id}/{filename})
         
         Returns:
-            File content as bytes
+            Tuple of (local temporary file path, size in bytes)
         
         Raises:
             ValueError: If file download fails
         """
+        local_path = None
         try:
             # Storage path format: bots/{bot_id}/sources/{source_id}/{filename}
-            # Supabase Storage download uses the full path as stored (same as upload)
-            # Download from sources bucket
-            response = self.storage_client.storage.from_("sources").download(storage_path)
+            # Supabase Storage uses the full path as stored (same as upload)
+            signed = self.storage_client.storage.from_("sources").create_signed_url(
+                storage_path, SIGNED_URL_TTL_SECONDS
+            )
+            signed_url = signed.get("signedURL") or signed.get("signedUrl")
+            if not signed_url:
+                raise ValueError(f"Failed to create signed URL for: {storage_path}")
             
-            if not response:
+            file_size = 0
+            with tempfile.NamedTemporaryFile(
+                prefix="source-", suffix=self._get_file_extension(storage_path) or "", delete=False
+            ) as tmp:
+                local_path = tmp.name
+                with _get_download_client().stream("GET", signed_url) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(DOWNLOAD_CHUNK_BYTES):
+                        tmp.write(chunk)
+                        file_size += len(chunk)
+            
+            if not file_size:
                 raise ValueError(f"Failed to download file from storage: {storage_path}")
             
-            return response
+            return local_path, file_size
             
         except Exception as e:
-            logger.error(f"File download failed: path={storage_path}, error={str(e)}")
+            if local_path:
+                _remove_file(local_path)
+            logger.error("File download failed: path=%s, error=%s", storage_path, e)
             raise ValueError(f"Failed to download file: {str(e)}")
     
     def _get_file_extension(self, file_path: str) -> Optional[str]:
@@ -368,11 +600,9 @@ class ParsingService:
         Returns:
             File extension with dot (e.g., '.pdf') or None
         """
-        if "." not in file_path:
+        idx = file_path.rfind(".")
+        # A dot in a directory name (e.g. "bots/v1.2/sources/readme") is not an extension
+        if idx < 0 or idx < file_path.rfind("/"):
             return None
-        
-        parts = file_path.rsplit(".", 1)
-        if len(parts) == 2:
-            return f".{parts[1].lower()}"
-        return None
+        return file_path[idx:].lower()
 
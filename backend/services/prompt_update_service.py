@@ -10,7 +10,7 @@ import logging
 
 from repositories.prompt_update_repo import PromptUpdateRepository
 from repositories.bot_repo import BotRepository
-from services.bot_service import BotService
+from services.bot_service import BotService, invalidate_bot_cache
 from core.exceptions import ValidationError, NotFoundError, AuthorizationError
 
 logger = logging.getLogger(__name__)
@@ -57,7 +57,7 @@ class PromptUpdateService:
             ValidationError: If prompt is invalid
         """
         # Verify user owns the bot
-        bot = self.bot_service.get_bot(str(bot_id), user_id, access_token=self.access_token)
+        bot = self.bot_service.get_bot(str(bot_id), user_id, access_token=self.access_token, use_cache=False)
         if not bot:
             raise NotFoundError("Bot", str(bot_id))
 
@@ -162,6 +162,7 @@ class PromptUpdateService:
             bot_id,
             {"system_prompt": new_prompt}
         )
+        invalidate_bot_cache(str(bot_id))
 
         logger.info(f"Prompt update applied: bot_id={bot_id}, update_id={update_id}, user_id={user_id}")
         return updated_bot
@@ -188,7 +189,7 @@ class PromptUpdateService:
             NotFoundError: If update doesn't exist
         """
         # Verify user owns the bot
-        bot = self.bot_service.get_bot(str(bot_id), user_id, access_token=self.access_token)
+        bot = self.bot_service.get_bot(str(bot_id), user_id, access_token=self.access_token, use_cache=False)
         if not bot:
             raise NotFoundError("Bot", str(bot_id))
 
@@ -224,6 +225,7 @@ class PromptUpdateService:
             bot_id,
             {"system_prompt": old_prompt}
         )
+        invalidate_bot_cache(str(bot_id))
 
         logger.info(f"Prompt reverted: bot_id={bot_id}, update_id={update_id}, user_id={user_id}")
         return updated_bot
@@ -0,0 +1,134 @@
+"""
+Query Log Service
+
+Writes query logs in the background so answers don't wait on an INSERT.
+Rows are queued in-process and inserted in batches (up to
+QUERY_LOG_BATCH_SIZE rows, or whatever arrived within QUERY_LOG_FLUSH_SECONDS
+of the first one). The queue is bounded: when full, the oldest row is dropped
+with a warning rather than blocking the request. A batch that still fails
+after retries is split in half repeatedly, so only rows the database rejects
+are dropped. Remaining rows are written by flush_query_log() on application
+shutdown.
+"""
+
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+
+from repositories.query_repo import QueryRepository
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_BATCH_SIZE = 50
+QUERY_LOG_FLUSH_SECONDS = 0.1
+QUERY_LOG_MAX_QUEUE = 10000
+QUERY_LOG_MAX_ATTEMPTS = 3
+
+# Queued by flush() to make the worker write what it has and exit
+_STOP = object()
+
+
+class QueryLogWriter:
+    """Batches query log rows into bulk inserts on a background task"""
+
+    def __init__(
+        self,
+        batch_size: int = QUERY_LOG_BATCH_SIZE,
+        flush_seconds: float = QUERY_LOG_FLUSH_SECONDS,
+        max_queue: int = QUERY_LOG_MAX_QUEUE,
+    ):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._worker: Optional[asyncio.Task] = None
+        self._repository: Optional[QueryRepository] = None
+
+    def enqueue(self, row: Dict[str, Any]) -> None:
+        """Queue a row built with QueryRepository.build_query_row; never blocks"""
+        if self._queue.full():
+            self._queue.get_nowait()
+            logger.warning("Query log queue full, dropped oldest entry")
+        self._queue.put_nowait(row)
+        self._ensure_worker()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            row = await self._queue.get()
+            if row is _STOP:
+                return
+            rows = [row]
+            # Give concurrent requests a moment to add to this batch
+            if self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_seconds)
+            while len(rows) < self.batch_size and not self._queue.empty():
+                row = self._queue.get_nowait()
+                if row is _STOP:
+                    stopping = True
+                    break
+                rows.append(row)
+            await self._write(rows)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> None:
+        # Service role: rows from different users share one insert, and
+        # each query was authorized before it was answered
+        if self._repository is None:
+            self._repository = QueryRepository(access_token=None)
+        await asyncio.to_thread(self._repository.create_queries, rows)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        for attempt in range(1, QUERY_LOG_MAX_ATTEMPTS + 1):
+            try:
+                await self._insert(rows)
+                return
+            except Exception as e:
+                if attempt == QUERY_LOG_MAX_ATTEMPTS:
+                    if len(rows) > 1:
+                        logger.warning(f"Query log insert of {len(rows)} rows failed after {attempt} attempts, splitting: {str(e)}")
+                        await self._write_split(rows)
+                    else:
+                        logger.error(f"Dropping query log after {attempt} attempts: {str(e)}")
+                    return
+                logger.warning(f"Query log insert failed (attempt {attempt}), retrying: {str(e)}")
+                await asyncio.sleep(0.5 * attempt)
+
+    async def _write_split(self, rows: List[Dict[str, Any]]) -> None:
+        """Bisect a failing batch so only rows that can't be inserted are dropped"""
+        mid = len(rows) // 2
+        for half in (rows[:mid], rows[mid:]):
+            try:
+                await self._insert(half)
+            except Exception as e:
+                if len(half) > 1:
+                    await self._write_split(half)
+                else:
+                    logger.error(f"Dropping query log for bot {half[0].get('bot_id')}: {str(e)}")
+
+    async def flush(self) -> None:
+        """Write everything still queued and stop the background task"""
+        if self._queue.empty() and (self._worker is None or self._worker.done()):
+            return
+        self._ensure_worker()
+        await self._queue.put(_STOP)
+        await self._worker
+
+
+_writer: Optional[QueryLogWriter] = None
+
+
+def get_query_log_writer() -> QueryLogWriter:
+    """Get the process-wide query log writer (call from the event loop)"""
+    global _writer
+    if _writer is None:
+        _writer = QueryLogWriter()
+    return _writer
+
+
+async def flush_query_log() -> None:
+    """Write pending query logs (called on application shutdown)"""
+    if _writer is not None:
+        await _writer.flush()
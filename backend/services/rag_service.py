@@ -1,23 +1,61 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal, Tuple
+from datetime import datetime, timezone
 from uuid import UUID
+import asyncio
 import logging
+import posixpath
 import time
 
+import numpy as np
+
 from config.supabasedb import get_supabase_client
+from config.pgdb import get_pg_pool
+from config.settings import settings
 from services.embedding_service import EmbeddingService
 from services.llm_service import LLMService
 from services.bot_service import BotService
 from services.plan_service import PlanService
+from services.query_log_service import get_query_log_writer
 from repositories.query_repo import QueryRepository
 from repositories.source_repo import SourceRepository
+from models.source_model import FILE_SOURCE_TYPES
+from core.cache import SemanticCache
 from core.exceptions import ValidationError, DatabaseError
 
 logger = logging.getLogger(__name__)
 
+CONTEXT_PREVIEW_CHARS = 1000
+
+NO_CONTEXT_ANSWER = (
+    "I couldn't find relevant information in my knowledge base to answer that. "
+    "Could you try rephrasing your question?"
+)
+
+# Citation detail returned to the client: nothing, chunk ids only, or scores
+# plus source info (which also computes confidence)
+CitationsMode = Literal["none", "ids", "full"]
+
+# Source columns read by _citation_source
+CITATION_SOURCE_COLUMNS = "id,source_type,original_url,canonical_url,storage_path"
+
+# Near-duplicate queries (cosine >= 0.95 between query embeddings) reuse
+# recent retrieval results, skipping the vector search, and recent answers,
+# skipping the LLM call. Keyed per bot and retrieval parameters; dropped when
+# a bot's sources change, and short TTLs bound staleness across processes.
+_retrieval_cache = SemanticCache(capacity=256, threshold=0.95, ttl=300, max_keys=1024)
+_answer_cache = SemanticCache(capacity=64, threshold=0.95, ttl=60, max_keys=1024)
+
+
+def invalidate_retrieval_cache(bot_id: UUID) -> None:
+    """Forget cached retrievals and answers after a bot's sources changed"""
+    _retrieval_cache.invalidate(str(bot_id))
+    _answer_cache.invalidate(str(bot_id))
+
 
 class RagService:
     def __init__(self, access_token: Optional[str] = None):
         self.access_token = access_token
+        self.bot_service = BotService()
         # For widget queries (access_token=None), use service role
         if access_token is None:
             self.db = get_supabase_client(use_service_role=True)
@@ -33,92 +71,102 @@ class RagService:
             self.query_repo = QueryRepository(access_token=access_token)
             self.source_repo = SourceRepository(access_token=access_token)
 
-    def retrieve(self, bot_id: UUID, query_text: str, top_k: int = 5, min_score: float = 0.25) -> List[Dict[str, Any]]:
+    async def retrieve(self, bot_id: UUID, query_text: str, top_k: int = 5, min_score: float = 0.25) -> List[Dict[str, Any]]:
+        chunks, _ = await self._retrieve(bot_id, query_text, top_k, min_score)
+        return chunks
+
+    async def _retrieve(self, bot_id: UUID, query_text: str, top_k: int, min_score: float) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """Retrieve chunks for a query, also returning the query embedding"""
         if not query_text or not query_text.strip():
             raise ValidationError("query_text is required")
 
-        # Embed query (single-vector batch)
-        vectors, provider = self.embedding._embed_with_fallback([query_text])
-        query_vec = vectors[0]
+        # Embed query (cached for repeated questions, batched with concurrent ones)
+        query_vec, provider = await self.embedding.embed_query_async(query_text)
         logger.debug(f"Query embedded: bot_id={bot_id}, provider={provider}")
 
+        cache_key = (str(bot_id), int(top_k), float(min_score))
+        cached = _retrieval_cache.get(cache_key, query_vec)
+        if cached is not None:
+            logger.debug(f"Retrieval cache hit: bot_id={bot_id}, count={len(cached)}")
+            return cached, query_vec
+
         # Call SQL function search_similar_chunks(bot_id, embedding, threshold, limit)
         try:
-            # Supabase Python client: use rpc with exact SQL arg names
-            response = self.db.rpc(
-                "search_similar_chunks",
-                {
-                    "bot_uuid": str(bot_id),
-                    "query_embedding": query_vec,
-                    "match_threshold": float(min_score),
-                    "match_count": int(top_k),
-                },
-            ).execute()
-
-            data = response.data or []
+            pool = await get_pg_pool()
+            if pool is not None:
+                # Direct connection: the vector goes over the wire in pgvector's binary format
+                rows = await pool.fetch(
+                    "SELECT * FROM public.search_similar_chunks($1, $2, $3, $4)",
+                    UUID(str(bot_id)),
+                    query_vec,
+                    float(min_score),
+                    int(top_k),
+                )
+                # Match the PostgREST row shape (UUIDs as strings)
+                data = [
+                    {k: str(v) if isinstance(v, UUID) else v for k, v in row.items()}
+                    for row in rows
+                ]
+            else:
+                # Supabase Python client: use rpc with exact SQL arg names
+                response = await asyncio.to_thread(
+                    self.db.rpc(
+                        "search_similar_chunks",
+                        {
+                            "bot_uuid": str(bot_id),
+                            "query_embedding": query_vec.tolist(),
+                            "match_threshold": float(min_score),
+                            "match_count": int(top_k),
+                        },
+                    ).execute
+                )
+                data = response.data or []
+
             logger.debug(f"Chunks retrieved: bot_id={bot_id}, count={len(data)}, top_k={top_k}, min_score={min_score}")
-            return data
         except Exception as e:
             logger.error(f"Retrieval failed: bot_id={bot_id}, error={str(e)}")
             raise DatabaseError(f"Retrieval failed: {str(e)}")
 
-    def answer(self, bot_id: UUID, user_id: Optional[str], query_text: str, top_k: int = 5, min_score: float = 0.25, session_id: Optional[str] = None, page_url: Optional[str] = None, include_metadata: bool = False, chat_history: Optional[List[Dict[str, str]]] = None, custom_prompt: Optional[str] = None) -> Dict[str, Any]:
-        # Check query limits before processing
-        plan_service = PlanService(use_service_role=True)
-        
-        # Get plan for bot owner (works for both authenticated and widget queries)
-        bot_plan = plan_service.get_plan_for_bot(str(bot_id))
-        
-        # Check query per bot per day limit
-        max_queries_per_day = bot_plan.get("max_queries_per_bot_per_day")
-        if max_queries_per_day is not None:
-            # Count queries for this bot today (since midnight UTC)
-            from datetime import datetime, timezone, timedelta
-            now = datetime.now(timezone.utc)
-            midnight_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            try:
-                # Use service role to count queries
-                service_db = get_supabase_client(use_service_role=True)
-                query_count_resp = service_db.table("queries")\
-                    .select("*", count="exact")\
-                    .eq("bot_id", str(bot_id))\
-                    .gte("created_at", midnight_today.isoformat())\
-                    .execute()
-                
-                current_query_count = query_count_resp.count or 0
-                
-                if current_query_count >= max_queries_per_day:
-                    plan_name = bot_plan.get("display_name", "your plan")
-                    upgrade_email = "info@singlebit.xyz"
-                    raise ValidationError(
-                        f"You've reached the daily query limit ({max_queries_per_day} queries per bot per day) "
-                        f"on the {plan_name} plan. Payments are coming soon, but if you'd like "
-                        f"to use paid features now, please email us at {upgrade_email}."
-                    )
-            except ValidationError:
-                raise
-            except Exception as e:
-                logger.warning(f"Error checking query limit for bot {bot_id}: {str(e)}")
-                # Continue with query if limit check fails (fail open to avoid blocking)
-        
-        # Retrieve context
+        _retrieval_cache.set(cache_key, query_vec, data)
+        return data, query_vec
+
+    async def answer(self, bot_id: UUID, user_id: Optional[str], query_text: str, top_k: int = 5, min_score: float = 0.25, session_id: Optional[str] = None, page_url: Optional[str] = None, include_metadata: bool = False, chat_history: Optional[List[Dict[str, str]]] = None, custom_prompt: Optional[str] = None, citations_mode: Optional[CitationsMode] = None) -> Dict[str, Any]:
+        # include_metadata selects full citations unless a mode is given explicitly
+        if citations_mode is None:
+            citations_mode = "full" if include_metadata else "ids"
+
+        # Check query limits before spending anything on retrieval or generation
+        await asyncio.to_thread(self._check_query_limit, bot_id)
+
+        # Retrieval, system prompt lookup (with ownership check) and DB chat history
+        # are independent; run them concurrently so only the LLM call waits on all of them
         t0 = time.time()
-        chunks = self.retrieve(bot_id, query_text, top_k=top_k, min_score=min_score)
-        context = "\n\n".join([c.get("excerpt", "") for c in chunks])
+        fetch_db_history = not chat_history and bool(session_id)
+        (chunks, query_vec), bot_prompt, db_history_str = await asyncio.gather(
+            self._retrieve(bot_id, query_text, top_k, min_score),
+            asyncio.to_thread(
+                self.bot_service.get_system_prompt,
+                str(bot_id),
+                str(user_id) if user_id else None,
+                self.access_token,
+            ),
+            asyncio.to_thread(self._fetch_history, bot_id, session_id) if fetch_db_history else _resolved(""),
+        )
+        context = self._build_context(chunks, settings.rag_max_context_chars)
         
         confidence = None
         citations = []
         
         # Only calculate confidence and fetch source info if metadata is requested (for testing/debugging)
-        if include_metadata:
+        if citations_mode == "full":
             # Calculate confidence from similarity scores (average of top scores)
-            similarity_scores = [float(c.get("similarity", 0.0)) for c in chunks if c.get("similarity") is not None]
-            if similarity_scores:
-                # Average similarity as confidence (0-1 scale)
-                confidence = sum(similarity_scores) / len(similarity_scores)
-                # Cap at 1.0
-                confidence = min(confidence, 1.0)
+            similarity_scores = np.fromiter(
+                (score for score in (c.get("similarity") for c in chunks) if score is not None),
+                dtype=np.float64,
+            )
+            if similarity_scores.size:
+                # Average similarity as confidence (0-1 scale), capped at 1.0
+                confidence = float(min(similarity_scores.mean(), 1.0))
             
             # Fetch source info for citations
             source_ids = set()
@@ -136,74 +184,52 @@ class RagService:
                 self.source_repo = SourceRepository(access_token=self.access_token)
             
             sources_map = {}
-            for source_id in source_ids:
-                try:
-                    source = self.source_repo.get_source_by_id(UUID(source_id))
-                    if source:
-                        sources_map[source_id] = source
-                except Exception as e:
-                    logger.warning(f"Failed to fetch source {source_id}: {e}")
+            try:
+                sources_map = await asyncio.to_thread(
+                    self.source_repo.get_sources_by_ids,
+                    list(source_ids),
+                    CITATION_SOURCE_COLUMNS,
+                )
+            except Exception as e:
+                logger.warning(f"Failed to fetch sources {sorted(source_ids)}: {e}")
+            for source_id in source_ids - sources_map.keys():
+                logger.warning(f"Source not found for citation: source_id={source_id}")
+            
+            # Source sub-dicts are built once per source rather than per chunk;
+            # top_k chunks usually come from only one or two sources
+            source_dicts = {
+                source_id: self._citation_source(source_id, source_info)
+                for source_id, source_info in sources_map.items()
+            }
             
             # Build citations with source info
             for c in chunks:
                 chunk_id = c.get("id")
-                source_id = chunk_source_map.get(chunk_id)
-                source_info = sources_map.get(source_id) if source_id else None
-                
                 citation = {
                     "chunk_id": chunk_id,
                     "heading": c.get("heading"),
                     "score": c.get("similarity"),
                 }
-                
-                # Add source info if available
-                if source_info:
-                    citation["source"] = {
-                        "source_id": source_id,
-                        "source_type": source_info.get("source_type"),
-                        "original_url": source_info.get("original_url"),
-                        "canonical_url": source_info.get("canonical_url"),
-                        "storage_path": source_info.get("storage_path"),
-                    }
-                    # Extract filename from storage_path for file sources
-                    if source_info.get("source_type") in ["pdf", "docx", "txt"]:
-                        storage_path = source_info.get("storage_path", "")
-                        if storage_path:
-                            # Extract filename from path like "bots/{bot_id}/sources/{source_id}/{filename}"
-                            parts = storage_path.split("/")
-                            if parts:
-                                citation["source"]["filename"] = parts[-1]
-                
+                source_dict = source_dicts.get(chunk_source_map.get(chunk_id))
+                if source_dict:
+                    citation["source"] = source_dict
                 citations.append(citation)
+            returned_sources = citations
         else:
-            # Lightweight citations for production (just chunk IDs)
-            citations = [{"chunk_id": c.get("id")} for c in chunks]
-
-        # Fetch bot to verify ownership and get system_prompt
-        bot_service = BotService()
-        bot = None
-        if user_id:
-            # Authenticated user query: verify ownership
-            bot = bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
-        else:
-            # Widget query: get bot without ownership check (token already validates access)
-            # Use service role to bypass RLS
-            service_db = get_supabase_client(use_service_role=True)
-            try:
-                result = service_db.table("bots").select("*").eq("id", str(bot_id)).single().execute()
-                bot = result.data if result.data else None
-            except Exception as e:
-                logger.warning(f"Failed to fetch bot for widget query: {e}")
-        
+            # Lightweight citations for production (just chunk IDs). Always
+            # logged, since analytics counts returned sources per query
+            returned_sources = [{"chunk_id": c.get("id")} for c in chunks]
+            if citations_mode == "ids":
+                citations = returned_sources
+
         # Use custom prompt if provided (for sandbox testing), otherwise use bot's prompt
         if custom_prompt:
             system_prompt = custom_prompt
         else:
-            system_prompt = (bot or {}).get("system_prompt") if isinstance(bot, dict) else None
-            system_prompt = system_prompt or "You are a helpful assistant. Use the provided context to answer. If unsure, say you don't know."
+            system_prompt = bot_prompt or "You are a helpful assistant. Use the provided context to answer. If unsure, say you don't know."
 
-        # Build chat history string from provided chat_history or fetch from DB
-        chat_history_str = ""
+        # Build chat history string from provided chat_history or the DB fallback
+        chat_history_str = db_history_str
         if chat_history:
             # Use chat history provided by client (from localStorage)
             history_parts = []
@@ -216,71 +242,171 @@ class RagService:
             if history_parts:
                 chat_history_str = "\n\n".join(history_parts)
                 logger.debug(f"Using {len(history_parts)} previous messages from client chat history")
-        elif session_id:
-            # Fallback: fetch from database if chat_history not provided
-            try:
-                recent_messages = self.query_repo.get_recent_messages(bot_id, session_id, limit=5)
-                if recent_messages:
-                    history_parts = []
-                    for msg in recent_messages:
-                        query = msg.get("query_text", "")
-                        response = msg.get("response_summary", "")
-                        if query and response:
-                            history_parts.append(f"User: {query}\nAssistant: {response}")
-                    
-                    if history_parts:
-                        chat_history_str = "\n\n".join(history_parts)
-                        logger.debug(f"Retrieved {len(recent_messages)} previous messages from database for session {session_id}")
-            except Exception as e:
-                logger.warning(f"Failed to retrieve chat history from database: {e}")
-
-        # Build prompt with chat history if available
-        if chat_history_str:
-            prompt = (
-                f"System prompt: {system_prompt}\n\n"
-                f"Previous conversation:\n{chat_history_str}\n\n"
-                f"Context from knowledge base:\n{context}\n\n"
-                f"User question: {query_text}\n\n"
-                f"Answer concisely and cite sources by heading if helpful. Consider the conversation history when answering."
-            )
-        else:
-            prompt = (
-                f"System prompt: {system_prompt}\n\n"
-                f"Context:\n{context}\n\n"
-                f"User question: {query_text}\n\n"
-                f"Answer concisely and cite sources by heading if helpful."
-            )
 
-        llm = LLMService()
-        answer_text, usage, provider_used = llm.generate(prompt)
+        # Answers depend on the prompt and history too, so only stateless
+        # queries against the bot's own prompt are cached
+        answer_key = None
+        if not chat_history_str and not custom_prompt:
+            answer_key = (str(bot_id), int(top_k), float(min_score), hash(system_prompt))
+        answer_text = _answer_cache.get(answer_key, query_vec) if answer_key else None
+        if answer_text is not None:
+            logger.debug(f"Answer cache hit: bot_id={bot_id}")
+            usage = {}
+        elif not chunks and not chat_history_str:
+            # Nothing retrieved and no conversation to draw on: the LLM could
+            # only say it doesn't know, so skip the call
+            logger.debug(f"No chunks retrieved, skipping LLM: bot_id={bot_id}")
+            answer_text = NO_CONTEXT_ANSWER
+            usage = {}
+            if citations_mode == "full":
+                confidence = 0.0
+        else:
+            # System prompt goes to the provider separately (system message /
+            # instruction), so the repeated prefix is eligible for prompt caching
+            if chat_history_str:
+                prompt = "".join([
+                    "Previous conversation:\n", chat_history_str,
+                    "\n\nContext from knowledge base:\n", context,
+                    "\n\nUser question: ", query_text,
+                    "\n\nAnswer concisely and cite sources by heading if helpful. "
+                    "Consider the conversation history when answering.",
+                ])
+            else:
+                prompt = "".join([
+                    "Context:\n", context,
+                    "\n\nUser question: ", query_text,
+                    "\n\nAnswer concisely and cite sources by heading if helpful.",
+                ])
+            llm = LLMService()
+            answer_text, usage, provider_used = await asyncio.to_thread(llm.generate, prompt, system_prompt)
+            if answer_key and answer_text:
+                _answer_cache.set(answer_key, query_vec, answer_text)
         latency_ms = int((time.time() - t0) * 1000)
 
         result = {
             "answer": answer_text,
             "citations": citations,
             "confidence": confidence,
-            "context_preview": context[:1000],
+            "context_preview": context[:CONTEXT_PREVIEW_CHARS],
         }
 
-        # Log query
+        # Log query (written in the background, batched with other requests)
         try:
             sid = session_id or "server-session"
-            self.query_repo.create_query(
+            get_query_log_writer().enqueue(QueryRepository.build_query_row(
                 bot_id=bot_id,
                 session_id=sid,
                 query_text=query_text,
                 page_url=page_url,
-                returned_sources=citations,
+                returned_sources=returned_sources,
                 response_summary=answer_text[:2000],
                 tokens_used=(usage.get("total_tokens") if isinstance(usage, dict) else 0) or 0,
                 prompt_tokens=(usage.get("prompt_tokens") if isinstance(usage, dict) else None),
                 completion_tokens=(usage.get("completion_tokens") if isinstance(usage, dict) else None),
                 confidence=confidence,
                 latency_ms=latency_ms,
-            )
+            ))
         except Exception as e:
             logger.warning(f"Failed to log query: {e}")
 
         return result
 
+    @staticmethod
+    def _build_context(chunks: List[Dict[str, Any]], max_chars: int) -> str:
+        """Join chunk excerpts in rank order, stopping at the context budget
+
+        Chunks arrive sorted by similarity, so dropping the tail keeps the most
+        relevant context while bounding prompt size (and LLM token cost). The
+        top chunk is always included, truncated if it alone exceeds the budget.
+        """
+        parts = []
+        total = 0
+        for c in chunks:
+            # search_similar_chunks always returns excerpt (NOT NULL column)
+            text = c["excerpt"]
+            if total + len(text) > max_chars:
+                if not parts:
+                    parts.append(text[:max_chars])
+                break
+            parts.append(text)
+            total += len(text) + 2  # separator
+        return "\n\n".join(parts)
+
+    @staticmethod
+    def _citation_source(source_id: str, source_info: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the citation "source" entry for a source row"""
+        source_type = source_info.get("source_type")
+        storage_path = source_info.get("storage_path")
+        source = {
+            "source_id": source_id,
+            "source_type": source_type,
+            "original_url": source_info.get("original_url"),
+            "canonical_url": source_info.get("canonical_url"),
+            "storage_path": storage_path,
+        }
+        # Extract filename from path like "bots/{bot_id}/sources/{source_id}/{filename}"
+        if storage_path and source_type in FILE_SOURCE_TYPES:
+            source["filename"] = posixpath.basename(storage_path)
+        return source
+
+    def _check_query_limit(self, bot_id: UUID) -> None:
+        """Raise ValidationError if the bot has used up its daily query quota"""
+        plan_service = PlanService(use_service_role=True)
+        
+        # Get plan for bot owner (works for both authenticated and widget queries)
+        bot_plan = plan_service.get_plan_for_bot(str(bot_id))
+        
+        # Check query per bot per day limit
+        max_queries_per_day = bot_plan.get("max_queries_per_bot_per_day")
+        if max_queries_per_day is not None:
+            # Count queries for this bot today (since midnight UTC)
+            now = datetime.now(timezone.utc)
+            midnight_today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            
+            try:
+                # Use service role to count queries
+                service_db = get_supabase_client(use_service_role=True)
+                query_count_resp = service_db.table("queries")\
+                    .select("*", count="exact")\
+                    .eq("bot_id", str(bot_id))\
+                    .gte("created_at", midnight_today.isoformat())\
+                    .execute()
+                
+                current_query_count = query_count_resp.count or 0
+                
+                if current_query_count >= max_queries_per_day:
+                    plan_name = bot_plan.get("display_name", "your plan")
+                    upgrade_email = "info@singlebit.xyz"
+                    raise ValidationError(
+                        f"You've reached the daily query limit ({max_queries_per_day} queries per bot per day) "
+                        f"on the {plan_name} plan. Payments are coming soon, but if you'd like "
+                        f"to use paid features now, please email us at {upgrade_email}."
+                    )
+            except ValidationError:
+                raise
+            except Exception as e:
+                logger.warning(f"Error checking query limit for bot {bot_id}: {str(e)}")
+                # Continue with query if limit check fails (fail open to avoid blocking)
+
+    def _fetch_history(self, bot_id: UUID, session_id: str) -> str:
+        """Build the chat history string from the session's logged queries"""
+        try:
+            recent_messages = self.query_repo.get_recent_messages(bot_id, session_id, limit=5)
+            if recent_messages:
+                history_parts = []
+                for msg in recent_messages:
+                    query = msg.get("query_text", "")
+                    response = msg.get("response_summary", "")
+                    if query and response:
+                        history_parts.append(f"User: {query}\nAssistant: {response}")
+                
+                if history_parts:
+                    logger.debug(f"Retrieved {len(recent_messages)} previous messages from database for session {session_id}")
+                    return "\n\n".join(history_parts)
+        except Exception as e:
+            logger.warning(f"Failed to retrieve chat history from database: {e}")
+        return ""
+
 
+async def _resolved(value: Any) -> Any:
+    return value
@@ -1,12 +1,135 @@
-from typing import Optional, Tuple, Dict, Any
-from datetime import datetime, timedelta
+from typing import Optional, Tuple, Dict, Any, List
+from contextvars import ContextVar
+from datetime import datetime, timezone
 from uuid import UUID
 import logging
+import threading
+import time
 from repositories.rate_limit_repo import RateLimitRepository
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Counters are kept in-process so the per-request check never waits on the
+# DB: bot_id -> [epoch_minute, synced_count, pending]. synced_count is the
+# window total last seen in the DB (all replicas), pending are this process's
+# requests not yet written. A background thread adds pending counts to the DB
+# every RATE_LIMIT_FLUSH_SECONDS, so replicas converge on a shared budget with
+# at most that much lag (the check already failed open on DB errors).
+RATE_LIMIT_FLUSH_SECONDS = 0.5
+_windows: Dict[str, list] = {}
+# (bot_id, epoch_minute, pending) for windows that ended with unsynced requests;
+# written by the next flush so a new minute doesn't discard them
+_closed_windows: List[Tuple[str, int, int]] = []
+_windows_lock = threading.Lock()
+_flush_thread: Optional[threading.Thread] = None
+# Windows that keep failing to sync are dropped once they are this old
+CLOSED_WINDOW_RETENTION_MINUTES = 60
+# Set when the DB lacks add_rate_limit_count; counters then stay per process
+_db_sync_disabled = False
+
+# Current window (integer minutes since the epoch), pinned at request entry
+# so every check within one request uses the same bucket
+_request_minute: ContextVar[Optional[int]] = ContextVar("rate_limit_request_minute", default=None)
+
+
+def _epoch_minute() -> int:
+    """Current rate limit window as minutes since the epoch"""
+    minute = _request_minute.get()
+    return int(time.time()) // 60 if minute is None else minute
+
+
+def begin_request_window() -> None:
+    """Pin the current window for the rest of this request's context"""
+    _request_minute.set(int(time.time()) // 60)
+
+
+def window_start_datetime(epoch_minute: int) -> datetime:
+    """Convert an epoch-minute window to its (UTC) start time"""
+    return datetime.fromtimestamp(epoch_minute * 60, tz=timezone.utc)
+
+
+def _db_sync_enabled() -> bool:
+    return settings.rate_limit_db_sync and not _db_sync_disabled
+
+
+def _is_missing_function(error: Exception) -> bool:
+    message = str(error)
+    return "PGRST202" in message or "Could not find the function" in message
+
+
+def _disable_db_sync(error: Exception) -> None:
+    global _db_sync_disabled
+    with _windows_lock:
+        _db_sync_disabled = True
+        _closed_windows.clear()
+    logger.error(
+        "Rate limit DB sync disabled: add_rate_limit_count is missing "
+        f"(run scripts/add-rate-limit-increment.sql or set RATE_LIMIT_DB_SYNC=false): {str(error)}"
+    )
+
+
+def _flush_windows(repo: RateLimitRepository) -> None:
+    """Write pending counts to the DB and drop counters for past windows"""
+    current_window = int(time.time()) // 60
+    with _windows_lock:
+        closed = _closed_windows[:]
+        _closed_windows.clear()
+        batch = [(bot_id, None, window_minute, pending) for bot_id, window_minute, pending in closed]
+        for bot_id, entry in list(_windows.items()):
+            window_minute, _, pending = entry
+            if pending:
+                # Count them as synced now so the local estimate doesn't dip
+                entry[1] += pending
+                entry[2] = 0
+                batch.append((bot_id, entry, window_minute, pending))
+            elif window_minute < current_window:
+                del _windows[bot_id]
+
+    failed = []
+    last_error: Optional[Exception] = None
+    for bot_id, entry, window_minute, pending in batch:
+        try:
+            total = repo.add_to_window(UUID(bot_id), window_start_datetime(window_minute), pending)
+        except Exception as e:
+            if _is_missing_function(e):
+                _disable_db_sync(e)
+                return
+            failed.append((bot_id, entry, window_minute, pending))
+            last_error = e
+            continue
+        if entry is None:
+            continue
+        with _windows_lock:
+            # Picks up requests other replicas counted in the same window
+            entry[1] = max(entry[1], total)
+
+    if not failed:
+        return
+    dropped = 0
+    with _windows_lock:
+        # Put the counts back so the next flush retries them
+        for bot_id, entry, window_minute, pending in failed:
+            if window_minute < current_window - CLOSED_WINDOW_RETENTION_MINUTES:
+                dropped += pending
+            elif entry is not None and _windows.get(bot_id) is entry and entry[0] == window_minute:
+                entry[1] -= pending
+                entry[2] += pending
+            else:
+                _closed_windows.append((bot_id, window_minute, pending))
+    logger.warning(
+        f"Rate limit sync failed for {len(failed)} window(s), dropped {dropped} stale request(s): {str(last_error)}"
+    )
+
+
+def _flush_loop(repo: RateLimitRepository) -> None:
+    while _db_sync_enabled():
+        time.sleep(RATE_LIMIT_FLUSH_SECONDS)
+        try:
+            _flush_windows(repo)
+        except Exception as e:
+            logger.error(f"Rate limit flush failed: {str(e)}")
+
 
 class RateLimitService:
     """Service for rate limiting operations using database"""
@@ -22,26 +145,9 @@ class RateLimitService:
         self.default_limit = settings.rate_limit_per_minute
         self.window_size_minutes = 1  # 1-minute windows
 
-    def _get_window_start(self, timestamp: Optional[datetime] = None) -> datetime:
-        """
-        Get the start of the current rate limit window.
-        
-        Args:
-            timestamp: Optional timestamp (defaults to now)
-            
-        Returns:
-            Window start time (minute-precision)
-        """
-        if timestamp is None:
-            timestamp = datetime.utcnow()
-        
-        # Round down to the nearest minute
-        window_start = timestamp.replace(second=0, microsecond=0)
-        return window_start
-
     def check_rate_limit(
         self, bot_id: UUID, max_requests: Optional[int] = None
-    ) -> Tuple[bool, int, int, datetime]:
+    ) -> Tuple[bool, int, int, int]:
         """
         Check if a request is allowed for a bot.
         
@@ -50,31 +156,45 @@ class RateLimitService:
             max_requests: Maximum requests allowed (defaults to settings.rate_limit_per_minute)
             
         Returns:
-            Tuple of (is_allowed, current_count, max_requests, window_start)
+            Tuple of (is_allowed, current_count, max_requests, window_minute),
+            where window_minute is the window start in minutes since the epoch
         """
         max_requests = max_requests or self.default_limit
-        window_start = self._get_window_start()
+        window_minute = _epoch_minute()
 
-        try:
-            # Optimized: Check and increment in one operation (reduces from 2 queries to 1-2 queries)
-            # Still need get_or_create_window, but we avoid the separate get_current_count call
-            is_allowed, new_count = self.repo.check_and_increment(
-                bot_id, window_start, max_requests
-            )
+        with _windows_lock:
+            entry = _windows.get(str(bot_id))
+            if entry is None or entry[0] != window_minute:
+                if entry is not None and entry[2] and _db_sync_enabled():
+                    _closed_windows.append((str(bot_id), entry[0], entry[2]))
+                entry = [window_minute, 0, 0]
+                _windows[str(bot_id)] = entry
+            current_count = entry[1] + entry[2]
+            is_allowed = current_count < max_requests
+            if is_allowed:
+                entry[2] += 1
+                current_count += 1
 
-            if not is_allowed:
-                logger.warning(
-                    f"Rate limit exceeded for bot {bot_id}: {new_count}/{max_requests} in window {window_start}"
-                )
-                return False, new_count, max_requests, window_start
+        if _db_sync_enabled():
+            self._ensure_flush_thread()
 
-            return True, new_count, max_requests, window_start
+        if not is_allowed:
+            logger.warning(
+                f"Rate limit exceeded for bot {bot_id}: {current_count}/{max_requests} in window {window_minute * 60}"
+            )
+        return is_allowed, current_count, max_requests, window_minute
 
-        except Exception as e:
-            logger.error(f"Rate limit check failed for bot {bot_id}: {str(e)}")
-            # Fail open - allow request if we can't check rate limit
-            # This prevents rate limiting from breaking the service
-            return True, 0, max_requests, window_start
+    def _ensure_flush_thread(self) -> None:
+        """Start the background DB sync thread if it isn't running"""
+        global _flush_thread
+        if _flush_thread is not None and _flush_thread.is_alive():
+            return
+        with _windows_lock:
+            if _flush_thread is None or not _flush_thread.is_alive():
+                _flush_thread = threading.Thread(
+                    target=_flush_loop, args=(self.repo,), name="rate-limit-flush", daemon=True
+                )
+                _flush_thread.start()
 
     def get_rate_limit_status(
         self, bot_id: UUID, max_requests: Optional[int] = None
@@ -90,12 +210,19 @@ class RateLimitService:
             Dictionary with rate limit status
         """
         max_requests = max_requests or self.default_limit
-        window_start = self._get_window_start()
+        window_minute = _epoch_minute()
+        window_start = window_start_datetime(window_minute)
+        reset_time = window_start_datetime(window_minute + self.window_size_minutes)
 
         try:
-            current_count = self.repo.get_current_count(bot_id, window_start)
+            with _windows_lock:
+                entry = _windows.get(str(bot_id))
+                local_count = entry[1] + entry[2] if entry and entry[0] == window_minute else None
+            if local_count is None:
+                current_count = self.repo.get_current_count(bot_id, window_start) if _db_sync_enabled() else 0
+            else:
+                current_count = local_count
             remaining = max(0, max_requests - current_count)
-            reset_time = window_start + timedelta(minutes=self.window_size_minutes)
 
             return {
                 "bot_id": str(bot_id),
@@ -113,7 +240,7 @@ class RateLimitService:
                 "max_requests": max_requests,
                 "remaining": max_requests,
                 "window_start": window_start.isoformat(),
-                "reset_time": (window_start + timedelta(minutes=self.window_size_minutes)).isoformat(),
+                "reset_time": reset_time.isoformat(),
             }
 
     def cleanup_old_windows(self, older_than_hours: int = 1) -> int:
@@ -11,14 +11,16 @@ import logging
 from urllib.parse import urlparse
 
 from core.exceptions import ValidationError, NotFoundError, AuthorizationError, DatabaseError
-from repositories.source_repo import SourceRepository
-from services.bot_service import BotService
+from repositories.source_repo import SourceRepository, SOURCE_COLUMNS
 from services.plan_service import PlanService
-from models.source_model import SourceType, SourceStatus
+from services.rag_service import invalidate_retrieval_cache
+from models.source_model import SourceType, SourceStatus, FILE_SOURCE_TYPES
 from config.supabasedb import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+ALLOWED_URL_SCHEMES = frozenset({"http", "https"})
+
 
 class SourceService:
     """Service for source operations"""
@@ -48,27 +50,28 @@ class SourceService:
         """
         try:
             parsed = urlparse(url)
-            
-            # Must have scheme and netloc
-            if not parsed.scheme or not parsed.netloc:
-                raise ValidationError(f"Invalid URL format: {url}")
-            
-            # Only allow http and https
-            if parsed.scheme not in ("http", "https"):
-                raise ValidationError(f"Only http and https URLs are allowed. Got: {parsed.scheme}")
-            
-            # Normalize URL (remove fragment, default ports, trailing slashes)
-            canonical_url = f"{parsed.scheme}://{parsed.netloc}{parsed.path.rstrip('/')}"
-            if parsed.query:
-                canonical_url += f"?{parsed.query}"
-            
-            return canonical_url, url
-
-        except Exception as e:
-            if isinstance(e, ValidationError):
-                raise
+            port = parsed.port
+        except ValueError as e:  # e.g. malformed IPv6 netloc or bad port
             raise ValidationError(f"Invalid URL: {str(e)}")
 
+        # Must have scheme and host
+        if not parsed.scheme or not parsed.hostname:
+            raise ValidationError(f"Invalid URL format: {url}")
+
+        # Only allow http and https
+        if parsed.scheme not in ALLOWED_URL_SCHEMES:
+            raise ValidationError(f"Only http and https URLs are allowed. Got: {parsed.scheme}")
+
+        # Normalize URL: lowercase host only (userinfo is case-sensitive),
+        # remove fragment and trailing slashes
+        host = f"[{parsed.hostname}]" if ":" in parsed.hostname else parsed.hostname
+        userinfo = parsed.netloc.rpartition("@")[0]
+        netloc = (f"{userinfo}@" if userinfo else "") + host + (f":{port}" if port is not None else "")
+        canonical_url = f"{parsed.scheme}://{netloc}{parsed.path.rstrip('/')}" + (
+            f"?{parsed.query}" if parsed.query else ""
+        )
+        return canonical_url, url
+
     def create_file_source(
         self,
         bot_id: UUID,
@@ -97,20 +100,18 @@ class SourceService:
             AuthorizationError: If user doesn't own the bot
             DatabaseError: If database operation fails
         """
-        # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
-
         # Validate source type for files
         if source_type not in (SourceType.PDF, SourceType.DOCX, SourceType.TEXT):
             raise ValidationError(f"Invalid source type for file upload: {source_type}")
 
+        # Fetching the bot's sources also verifies the user owns the bot
+        existing_sources = self.get_sources_by_bot(bot_id, user_id, columns="id,source_type")
+
         # Get user plan to check limits
         plan_service = PlanService(use_service_role=True)
         user_plan = plan_service.get_plan_for_user(str(user_id))
         
         # Check document limit per bot
-        existing_sources = self.get_sources_by_bot(bot_id, user_id)
         # Count document sources (pdf, docx, text) for this bot
         document_sources = [s for s in existing_sources if s.get("source_type") in ("pdf", "docx", "text")]
         current_doc_count = len(document_sources)
@@ -174,16 +175,14 @@ class SourceService:
             AuthorizationError: If user doesn't own the bot
             DatabaseError: If database operation fails
         """
-        # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        # Fetching the bot's sources also verifies the user owns the bot
+        existing_sources = self.get_sources_by_bot(bot_id, user_id, columns="id,source_type")
 
         # Get user plan to check limits
         plan_service = PlanService(use_service_role=True)
         user_plan = plan_service.get_plan_for_user(str(user_id))
         
         # Check URL limit per bot
-        existing_sources = self.get_sources_by_bot(bot_id, user_id)
         # Count URL sources (html) for this bot
         url_sources = [s for s in existing_sources if s.get("source_type") == "html"]
         current_url_count = len(url_sources)
@@ -215,13 +214,16 @@ class SourceService:
 
         return self.repository.create_source(source_data)
 
-    def get_sources_by_bot(self, bot_id: UUID, user_id: UUID) -> List[dict]:
+    def get_sources_by_bot(
+        self, bot_id: UUID, user_id: UUID, columns: str = SOURCE_COLUMNS
+    ) -> List[dict]:
         """
         Get all sources for a bot.
 
         Args:
             bot_id: ID of the bot
             user_id: ID of the user (for authorization)
+            columns: Comma-separated columns to select
 
         Returns:
             List of source records
@@ -230,13 +232,18 @@ class SourceService:
             AuthorizationError: If user doesn't own the bot
             DatabaseError: If database operation fails
         """
-        # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        # One query returns the bot's owner and its sources
+        bot = self.repository.get_bot_with_sources(bot_id, columns)
+        if not bot:
+            raise NotFoundError("Bot", str(bot_id))
+        if bot.get("created_by") != str(user_id):
+            raise AuthorizationError("You do not have access to this bot")
 
-        return self.repository.get_sources_by_bot(bot_id)
+        return bot.get("sources") or []
 
-    def get_source(self, source_id: UUID, bot_id: UUID, user_id: UUID) -> dict:
+    def get_source(
+        self, source_id: UUID, bot_id: UUID, user_id: UUID, columns: str = SOURCE_COLUMNS
+    ) -> dict:
         """
         Get a source by ID.
 
@@ -244,26 +251,24 @@ class SourceService:
             source_id: ID of the source
             bot_id: ID of the bot
             user_id: ID of the user (for authorization)
+            columns: Comma-separated columns to select
 
         Returns:
             Source record
 
         Raises:
             AuthorizationError: If user doesn't own the bot
-            NotFoundError: If source not found
+            NotFoundError: If source not found (or not in this bot)
             DatabaseError: If database operation fails
         """
-        # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
-
-        source = self.repository.get_source_by_id(source_id)
+        # One query checks the source belongs to the bot and returns the bot's owner
+        source = self.repository.get_source_for_bot(source_id, bot_id, columns)
         if not source:
             raise NotFoundError("Source", str(source_id))
 
-        # Verify source belongs to bot
-        if source.get("bot_id") != str(bot_id):
-            raise AuthorizationError("Source does not belong to this bot")
+        owner = source.pop("bots", None) or {}
+        if owner.get("created_by") != str(user_id):
+            raise AuthorizationError("You do not have access to this bot")
 
         return source
 
@@ -284,20 +289,14 @@ class SourceService:
             NotFoundError: If source not found
             DatabaseError: If database operation fails
         """
-        # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
-
-        # Get source details before deletion to get storage path
-        source = self.repository.get_source_by_id(source_id)
-        if not source:
-            raise NotFoundError("Source", str(source_id))
+        # Get source details (and verify ownership) before deletion to get storage path
+        source = self.get_source(source_id, bot_id, user_id, columns="id,source_type,storage_path")
 
         storage_path = source.get("storage_path")
         source_type = source.get("source_type")
 
         # Delete file from storage if it's a file source (not URL)
-        if source_type in (SourceType.PDF.value, SourceType.DOCX.value, SourceType.TEXT.value) and storage_path:
+        if source_type in FILE_SOURCE_TYPES and storage_path:
             try:
                 # TODO: check why service role and not token?
                 # Use service role to delete from storage (we've already verified ownership)
@@ -321,6 +320,8 @@ class SourceService:
             # URL sources don't have files in storage, nothing to delete
             logger.info(f"Skipping storage deletion for URL source {source_id}")
 
-        # Delete the database row
-        return self.repository.delete_source(source_id, bot_id)
+        # Delete the database row (chunks cascade)
+        deleted = self.repository.delete_source(source_id, bot_id)
+        invalidate_retrieval_cache(bot_id)
+        return deleted
 
@@ -5,13 +5,17 @@ Business logic for widget token management.
 Handles token generation, validation, and CRUD operations.
 """
 
+import base64
 import secrets
 import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 from uuid import UUID
 import logging
 
+from core.cache import TTLCache
 from core.exceptions import ValidationError, NotFoundError, AuthorizationError
 from repositories.widget_token_repo import WidgetTokenRepository
 from services.bot_service import BotService
@@ -19,6 +23,60 @@ from services.plan_service import PlanService
 
 logger = logging.getLogger(__name__)
 
+# Widgets send the same token on every query. Token rows are cached by the
+# raw token (high-entropy, so safe as an in-process key; never log it),
+# skipping the hash and the DB lookup. Expiry and origin are still checked on
+# every request. Revoking a token clears this process's cache; other worker
+# processes notice within the TTL.
+_token_cache = TTLCache(maxsize=10_000, ttl=30)
+
+# last_used_at is informational: write it at most once per token per
+# LAST_USED_DEBOUNCE_SECONDS, off the request path
+LAST_USED_DEBOUNCE_SECONDS = 5
+_last_used_recent = TTLCache(maxsize=10_000, ttl=LAST_USED_DEBOUNCE_SECONDS)
+_last_used_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="token-last-used")
+
+
+def _expiry_epoch(expires_at: Optional[str]) -> Optional[float]:
+    """Parse a token's expires_at timestamp to epoch seconds (None if it never expires)"""
+    if not expires_at:
+        return None
+    parsed = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
+    # Timestamps without an offset are UTC
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class OriginMatcher:
+    """Allowed-domain check compiled once per token
+
+    Entries are either full origins ("https://example.com"), which must match
+    exactly, or bare hosts ("example.com"), which match that host and its
+    subdomains under any scheme and port ("localhost:3000" pins the port).
+    Prefix matches are deliberately not allowed: "example.com" must not
+    admit "example.com.attacker.net".
+    """
+
+    __slots__ = ("exact", "suffixes")
+
+    def __init__(self, allowed_domains: List[str]):
+        normalized = [d.strip().rstrip("/").lower() for d in allowed_domains if d and d.strip()]
+        self.exact = frozenset(normalized)
+        self.suffixes = tuple(f".{d}" for d in normalized if "://" not in d)
+
+    def matches(self, origin: str) -> bool:
+        origin = origin.rstrip("/").lower()
+        if origin in self.exact:
+            return True
+        host = origin.split("://", 1)[-1]
+        if host in self.exact:
+            return True
+        hostname, _, port = host.rpartition(":")
+        if not (hostname and port.isdigit()):
+            hostname = host
+        return hostname in self.exact or (bool(self.suffixes) and hostname.endswith(self.suffixes))
+
 
 class WidgetTokenService:
     """Service for widget token operations"""
@@ -32,23 +90,24 @@ class WidgetTokenService:
         """
         self.access_token = access_token
         self.repository = WidgetTokenRepository(access_token=access_token)
+        self.bot_service = BotService()
 
-    def _generate_token(self) -> tuple[str, str]:
+    def _generate_token(self) -> tuple[str, str, str]:
         """
-        Generate a secure random token and its hash.
+        Generate a secure random token, its hash and display prefix.
 
         Returns:
-            Tuple of (plain_token, token_hash)
+            Tuple of (plain_token, token_hash, token_prefix)
         """
-        # Generate a secure random token (64 bytes = 512 bits)
-        plain_token = secrets.token_urlsafe(64)
-        
-        # Hash the token using SHA-256
-        token_hash = hashlib.sha256(plain_token.encode()).hexdigest()
-        
+        # 48 random bytes (384 bits) -> 64 URL-safe characters, no padding
+        plain_token = base64.urlsafe_b64encode(secrets.token_bytes(48)).decode("ascii")
+
+        # Hash the token string using SHA-256 (validate_token hashes the same form)
+        token_hash = hashlib.sha256(plain_token.encode("ascii")).hexdigest()
+
         # Get first 8 characters for identification (shown to user)
         token_prefix = plain_token[:8]
-        
+
         return plain_token, token_hash, token_prefix
 
     def create_token(
@@ -78,8 +137,7 @@ class WidgetTokenService:
             DatabaseError: If database operation fails
         """
         # Verify user owns the bot
-        bot_service = BotService()
-        bot = bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        bot = self.bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
 
         # Get user plan to check limits
         plan_service = PlanService(use_service_role=True)
@@ -102,7 +160,6 @@ class WidgetTokenService:
             raise ValidationError(error_msg or "Widget token limit exceeded")
 
         # Validate expiration date
-        from datetime import timezone
         if expires_at:
             # Ensure expires_at is timezone-aware
             if expires_at.tzinfo is None:
@@ -148,8 +205,7 @@ class WidgetTokenService:
             DatabaseError: If database operation fails
         """
         # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        self.bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
 
         return self.repository.get_tokens_by_bot(bot_id)
 
@@ -165,33 +221,28 @@ class WidgetTokenService:
             Token record if valid, None otherwise
         """
         try:
-            # Hash the provided token
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            cached = _token_cache.get(token)
+            if cached is not None:
+                token_data, origin_matcher, expires_epoch = cached
+            else:
+                # Hash the provided token
+                token_hash = hashlib.sha256(token.encode()).hexdigest()
 
-            # Get token from database
-            token_data = self.repository.get_token_by_hash(token_hash)
+                # Get token from database
+                token_data = self.repository.get_token_by_hash(token_hash)
 
-            if not token_data:
-                logger.warning("Token not found")
-                return None
+                if not token_data:
+                    logger.warning("Token not found")
+                    return None
+                origin_matcher = OriginMatcher(token_data.get("allowed_domains") or [])
+                # Parsed once here; cached lookups only compare numbers
+                expires_epoch = _expiry_epoch(token_data.get("expires_at"))
+                _token_cache.set(token, (token_data, origin_matcher, expires_epoch))
 
             # Check expiration
-            from datetime import timezone
-            if token_data.get("expires_at"):
-                expires_at_str = token_data["expires_at"]
-                # Handle different timestamp formats
-                if expires_at_str.endswith("Z"):
-                    expires_at = datetime.fromisoformat(expires_at_str.replace("Z", "+00:00"))
-                else:
-                    expires_at = datetime.fromisoformat(expires_at_str)
-                
-                # Ensure timezone-aware
-                if expires_at.tzinfo is None:
-                    expires_at = expires_at.replace(tzinfo=timezone.utc)
-                
-                if expires_at <= datetime.now(timezone.utc):
-                    logger.warning(f"Token {token_data['id']} has expired")
-                    return None
+            if expires_epoch is not None and time.time() >= expires_epoch:
+                logger.warning(f"Token {token_data['id']} has expired")
+                return None
 
             # Check domain whitelist
             allowed_domains = token_data.get("allowed_domains", [])
@@ -211,20 +262,7 @@ class WidgetTokenService:
                     logger.debug(f"Dev mode: Allowing origin=None for token {token_data['id']} with allowed_domains")
                 else:
                     # Origin provided - validate it matches allowed domains
-                    origin_normalized = origin.rstrip("/")
-                    
-                    # Check if origin matches any allowed domain
-                    domain_match = False
-                    for domain in allowed_domains:
-                        domain_normalized = domain.rstrip("/")
-                        # Exact match or subdomain match
-                        if (origin_normalized == domain_normalized or
-                            origin_normalized.endswith(f".{domain_normalized}") or
-                            origin_normalized.startswith(domain_normalized)):
-                            domain_match = True
-                            break
-
-                    if not domain_match:
+                    if not origin_matcher.matches(origin):
                         logger.warning(f"Origin {origin} not in allowed domains for token {token_data['id']}::{allowed_domains}")
                         return None
             else:
@@ -235,15 +273,23 @@ class WidgetTokenService:
                     return None
                 # In dev mode, allow origin=None for tokens without domain restrictions
 
-            # Update last_used_at
-            self.repository.update_last_used(UUID(token_data["id"]))
+            # Update last_used_at (debounced, in the background)
+            self._touch_last_used(token_data["id"])
 
-            return token_data
+            # Copy, so callers cannot mutate the cached row
+            return dict(token_data)
 
         except Exception as e:
             logger.error(f"Error validating token: {str(e)}")
             return None
 
+    def _touch_last_used(self, token_id: str) -> None:
+        """Queue a last_used_at update unless one was queued recently for this token"""
+        if token_id in _last_used_recent:
+            return
+        _last_used_recent.set(token_id, True)
+        _last_used_executor.submit(self.repository.update_last_used, UUID(token_id))
+
     def revoke_token(self, token_id: UUID, bot_id: UUID, user_id: UUID) -> bool:
         """
         Revoke (delete) a widget token.
@@ -262,8 +308,10 @@ class WidgetTokenService:
             DatabaseError: If database operation fails
         """
         # Verify user owns the bot
-        bot_service = BotService()
-        bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
+        self.bot_service.get_bot(str(bot_id), str(user_id), access_token=self.access_token)
 
-        return self.repository.delete_token(token_id, bot_id)
+        deleted = self.repository.delete_token(token_id, bot_id)
+        # Cached entries are keyed by the raw token, which isn't known here
+        _token_cache.clear()
+        return deleted
 
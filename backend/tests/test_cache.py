@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from core import cache as cache_module
+from core.cache import SemanticCache, TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_ttl_cache_expires_entries(clock):
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+
+    clock.now += 5
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert "a" not in cache
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_falsy_values_and_pop(clock):
+    cache = TTLCache()
+    cache.set("none", None)
+    cache.set("zero", 0)
+
+    assert "none" in cache and cache.get("zero", "default") == 0
+    assert cache.pop("zero") == 0
+    assert cache.pop("zero", "gone") == "gone"
+
+
+def _unit(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_semantic_cache_hits_similar_vectors(clock):
+    cache = SemanticCache(capacity=4, threshold=0.95, ttl=60)
+    cache.set("bot", _unit(1, 0, 0), "answer")
+
+    assert cache.get("bot", _unit(2, 0.1, 0)) == "answer"
+    assert cache.get("bot", _unit(0, 1, 0)) is None
+    assert cache.get("other", _unit(1, 0, 0)) is None
+    assert cache.get("bot", _unit(0, 0, 0)) is None
+    assert cache.get("bot", _unit(1, 0)) is None
+
+
+def test_semantic_cache_returns_best_match(clock):
+    cache = SemanticCache(capacity=4, threshold=0.9, ttl=60)
+    cache.set("bot", _unit(1, 0.3, 0), "near")
+    cache.set("bot", _unit(1, 0, 0), "exact")
+
+    assert cache.get("bot", _unit(1, 0, 0)) == "exact"
+
+
+def test_semantic_cache_expiry_and_ring_overwrite(clock):
+    cache = SemanticCache(capacity=2, threshold=0.99, ttl=10)
+    cache.set("bot", _unit(1, 0, 0), "x")
+    clock.now += 5
+    cache.set("bot", _unit(0, 1, 0), "y")
+    clock.now += 5
+    assert cache.get("bot", _unit(1, 0, 0)) is None
+    assert cache.get("bot", _unit(0, 1, 0)) == "y"
+
+    cache.set("bot", _unit(0, 0, 1), "z")
+    cache.set("bot", _unit(1, 1, 0), "w")
+    assert cache.get("bot", _unit(0, 1, 0)) is None
+    assert cache.get("bot", _unit(0, 0, 1)) == "z"
+
+
+def test_semantic_cache_grows_to_capacity(clock):
+    cache = SemanticCache(capacity=20, threshold=0.999, ttl=60)
+    basis = np.eye(20, dtype=np.float32)
+    for i in range(20):
+        cache.set("bot", basis[i], i)
+
+    assert [cache.get("bot", basis[i]) for i in range(20)] == list(range(20))
+
+
+def test_semantic_cache_invalidate_prefix_and_max_keys(clock):
+    cache = SemanticCache(capacity=2, threshold=0.95, ttl=60, max_keys=2)
+    vector = _unit(1, 0)
+    cache.set(("bot-a", 5), vector, "a5")
+    cache.set(("bot-b", 5), vector, "b5")
+    cache.invalidate("bot-a")
+    assert cache.get(("bot-a", 5), vector) is None
+    assert cache.get(("bot-b", 5), vector) == "b5"
+
+    cache.set(("bot-c", 5), vector, "c5")
+    cache.set(("bot-d", 5), vector, "d5")
+    assert cache.get(("bot-b", 5), vector) is None
+    assert cache.get(("bot-d", 5), vector) == "d5"
@@ -0,0 +1,59 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services.embedding_service import EmbeddingBatcher
+from services.embeddings.base import FatalEmbeddingError, TransientEmbeddingError
+
+
+def _run_batch(embed_fn, texts):
+    """Run one batch through the batcher and return (results, embed_fn calls)"""
+    calls = []
+
+    def recording(batch):
+        calls.append(list(batch))
+        return embed_fn(batch)
+
+    async def go():
+        loop = asyncio.get_running_loop()
+        batcher = EmbeddingBatcher(recording)
+        batch = [(text, loop.create_future()) for text in texts]
+        batcher._in_flight += 1
+        await batcher._run(batch)
+        return await asyncio.gather(*(f for _, f in batch), return_exceptions=True)
+
+    return asyncio.run(go()), calls
+
+
+def test_input_error_only_fails_the_bad_item():
+    def embed(texts):
+        if "bad" in texts:
+            raise FatalEmbeddingError("input too long")
+        return np.ones((len(texts), 2), dtype=np.float32), "openai"
+
+    results, calls = _run_batch(embed, ["a", "bad", "b"])
+
+    assert isinstance(results[1], FatalEmbeddingError)
+    assert results[0][1] == "openai" and results[2][1] == "openai"
+    assert len(calls) == 4
+
+
+def test_transient_error_fails_batch_without_retry():
+    def embed(texts):
+        raise TransientEmbeddingError("rate limited")
+
+    results, calls = _run_batch(embed, ["a", "b", "c"])
+
+    assert all(isinstance(r, TransientEmbeddingError) for r in results)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("texts", [["a"], ["a", "b"]])
+def test_results_match_inputs(texts):
+    def embed(batch):
+        return np.arange(len(batch), dtype=np.float32).reshape(-1, 1), "gemini"
+
+    results, _ = _run_batch(embed, texts)
+
+    assert [float(v[0]) for v, _ in results] == list(range(len(texts)))
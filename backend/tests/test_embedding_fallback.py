@@ -0,0 +1,57 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from services import embedding_service
+from services.embedding_service import EmbeddingService
+from services.embeddings.base import TransientEmbeddingError
+from services.embeddings.gemini_provider import GeminiEmbeddingProvider
+
+
+DIMENSION = 8
+
+
+class _StaticProvider:
+    name = "openai"
+    model = "fake"
+    dimension = DIMENSION
+
+    def embed_texts(self, texts, *, user=None):
+        return np.ones((len(texts), DIMENSION), dtype=np.float32)
+
+
+@pytest.fixture
+def short_gemini(monkeypatch):
+    """Gemini SDK stub that returns one vector fewer than requested"""
+    genai = types.ModuleType("google.generativeai")
+    genai.configure = lambda api_key: None
+    genai.embed_content = lambda model, content, output_dimensionality=None: {
+        "embedding": [[0.1] * DIMENSION for _ in content[:-1]]
+    }
+    google = types.ModuleType("google")
+    google.generativeai = genai
+    monkeypatch.setitem(sys.modules, "google", google)
+    monkeypatch.setitem(sys.modules, "google.generativeai", genai)
+    monkeypatch.setenv("GEMINI_API_KEY", "test-key")
+
+
+def test_malformed_gemini_response_is_transient(short_gemini):
+    provider = GeminiEmbeddingProvider(model="text-embedding-004", target_dimension=DIMENSION)
+    with pytest.raises(TransientEmbeddingError):
+        provider.embed_texts(["a", "b"])
+
+
+def test_malformed_preferred_response_falls_back(short_gemini, monkeypatch):
+    monkeypatch.setattr(embedding_service, "ChunkRepository", lambda access_token=None: None)
+    service = EmbeddingService(preferred="gemini", embedding_dimension=DIMENSION)
+    service.providers = [
+        GeminiEmbeddingProvider(model="text-embedding-004", target_dimension=DIMENSION),
+        _StaticProvider(),
+    ]
+
+    vectors, provider = service._embed_with_fallback(["a", "b"])
+
+    assert provider == "openai"
+    assert vectors.shape == (2, DIMENSION)
@@ -0,0 +1,38 @@
+import pytest
+
+from services.widget_token_service import OriginMatcher
+
+
+@pytest.mark.parametrize(
+    "allowed, origin",
+    [
+        (["example.com"], "https://example.com"),
+        (["example.com"], "http://example.com/"),
+        (["example.com"], "https://app.example.com"),
+        (["Example.com "], "https://EXAMPLE.com"),
+        (["example.com"], "https://example.com:8443"),
+        (["https://example.com"], "https://example.com"),
+        (["localhost:3000"], "http://localhost:3000"),
+        (["http://localhost:3000"], "http://localhost:3000"),
+    ],
+)
+def test_allowed(allowed, origin):
+    assert OriginMatcher(allowed).matches(origin)
+
+
+@pytest.mark.parametrize(
+    "allowed, origin",
+    [
+        (["example.com"], "https://example.com.attacker.net"),
+        (["example.com"], "https://attacker-example.com"),
+        (["example.com"], "https://example.com.attacker.net:443"),
+        (["https://example.com"], "http://example.com"),
+        (["https://example.com"], "https://app.example.com"),
+        (["https://example.com"], "https://example.com:8443"),
+        (["localhost:3000"], "http://localhost:4000"),
+        (["http://localhost:3000"], "http://localhost"),
+        ([], "https://example.com"),
+    ],
+)
+def test_rejected(allowed, origin):
+    assert not OriginMatcher(allowed).matches(origin)
@@ -0,0 +1,43 @@
+import asyncio
+
+from core.exceptions import DatabaseError
+from services import query_log_service
+from services.query_log_service import QueryLogWriter
+
+
+class _FakeRepo:
+    """Rejects any insert containing a row marked bad"""
+
+    def __init__(self):
+        self.inserted = []
+        self.calls = 0
+
+    def create_queries(self, rows):
+        self.calls += 1
+        if any(row.get("bad") for row in rows):
+            raise DatabaseError("invalid input syntax")
+        self.inserted.extend(rows)
+
+
+def test_failing_batch_only_drops_bad_row(monkeypatch):
+    async def no_sleep(_):
+        pass
+
+    monkeypatch.setattr(query_log_service.asyncio, "sleep", no_sleep)
+    writer = QueryLogWriter()
+    writer._repository = _FakeRepo()
+    rows = [{"bot_id": str(i), "bad": i == 5} for i in range(8)]
+
+    asyncio.run(writer._write(rows))
+
+    assert [row["bot_id"] for row in writer._repository.inserted] == [str(i) for i in range(8) if i != 5]
+
+
+def test_successful_batch_is_one_insert():
+    writer = QueryLogWriter()
+    writer._repository = _FakeRepo()
+
+    asyncio.run(writer._write([{"bot_id": "a"}, {"bot_id": "b"}]))
+
+    assert writer._repository.calls == 1
+    assert len(writer._repository.inserted) == 2
@@ -0,0 +1,95 @@
+from uuid import uuid4
+
+import pytest
+
+from core.exceptions import DatabaseError
+from services import rate_limit_service as rls
+
+
+class _FakeRepo:
+    def __init__(self, error=None):
+        self.error = error
+        self.totals = {}
+
+    def add_to_window(self, bot_id, window_start, delta):
+        if self.error is not None:
+            raise self.error
+        key = (str(bot_id), window_start)
+        self.totals[key] = self.totals.get(key, 0) + delta
+        return self.totals[key]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(rls, "_windows", {})
+    monkeypatch.setattr(rls, "_closed_windows", [])
+    monkeypatch.setattr(rls, "_db_sync_disabled", False)
+    monkeypatch.setattr(rls.settings, "rate_limit_db_sync", True)
+    monkeypatch.setattr(rls.RateLimitService, "_ensure_flush_thread", lambda self: None)
+    svc = rls.RateLimitService.__new__(rls.RateLimitService)
+    svc.default_limit = 100
+    svc.window_size_minutes = 1
+    return svc
+
+
+def _check(service, bot_id, minute, max_requests=None):
+    token = rls._request_minute.set(minute)
+    try:
+        return service.check_rate_limit(bot_id, max_requests)
+    finally:
+        rls._request_minute.reset(token)
+
+
+def test_limit_is_enforced_within_window(service):
+    bot_id = uuid4()
+    results = [_check(service, bot_id, 1000, max_requests=2)[0] for _ in range(3)]
+    assert results == [True, True, False]
+
+
+def test_rollover_keeps_pending_counts(service, monkeypatch):
+    bot_id = uuid4()
+    for _ in range(3):
+        _check(service, bot_id, 1000)
+    _check(service, bot_id, 1001)
+
+    assert rls._closed_windows == [(str(bot_id), 1000, 3)]
+
+    repo = _FakeRepo()
+    monkeypatch.setattr(rls.time, "time", lambda: 1001 * 60)
+    rls._flush_windows(repo)
+
+    assert repo.totals[(str(bot_id), rls.window_start_datetime(1000))] == 3
+    assert repo.totals[(str(bot_id), rls.window_start_datetime(1001))] == 1
+    assert rls._closed_windows == []
+
+
+def test_failed_flush_restores_pending(service, monkeypatch):
+    bot_id = uuid4()
+    _check(service, bot_id, 1000)
+    _check(service, bot_id, 1001)
+    _check(service, bot_id, 1001)
+    monkeypatch.setattr(rls.time, "time", lambda: 1001 * 60)
+
+    rls._flush_windows(_FakeRepo(error=DatabaseError("connection reset")))
+
+    assert rls._windows[str(bot_id)] == [1001, 0, 2]
+    assert rls._closed_windows == [(str(bot_id), 1000, 1)]
+
+    repo = _FakeRepo()
+    rls._flush_windows(repo)
+    assert sum(repo.totals.values()) == 3
+
+
+def test_missing_function_disables_sync(service, monkeypatch):
+    bot_id = uuid4()
+    _check(service, bot_id, 1000)
+    _check(service, bot_id, 1001)
+    monkeypatch.setattr(rls.time, "time", lambda: 1001 * 60)
+    error = DatabaseError("Could not find the function public.add_rate_limit_count (PGRST202)")
+
+    rls._flush_windows(_FakeRepo(error=error))
+
+    assert not rls._db_sync_enabled()
+    assert rls._closed_windows == []
+    _check(service, bot_id, 1002)
+    assert rls._closed_windows == []
@@ -0,0 +1,92 @@
+import hashlib
+
+import pytest
+
+from config.settings import settings
+from services import widget_token_service as wts
+from services.widget_token_service import WidgetTokenService, _expiry_epoch
+
+TOKEN = "plain-widget-token"
+
+
+class _FakeRepo:
+    def __init__(self, row):
+        self.row = row
+        self.lookups = 0
+
+    def get_token_by_hash(self, token_hash):
+        self.lookups += 1
+        if token_hash == hashlib.sha256(TOKEN.encode()).hexdigest():
+            return dict(self.row)
+        return None
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    wts._token_cache.clear()
+    monkeypatch.setattr(settings, "environment", "production")
+    monkeypatch.setattr(WidgetTokenService, "_touch_last_used", lambda self, token_id: None)
+
+    def make(**row):
+        service = WidgetTokenService.__new__(WidgetTokenService)
+        service.repository = _FakeRepo({"id": "t1", "allowed_domains": ["example.com"], **row})
+        return service
+
+    yield make
+    wts._token_cache.clear()
+
+
+def test_cached_token_skips_lookup(make_service):
+    service = make_service()
+
+    assert service.validate_token(TOKEN, "https://example.com") is not None
+    assert service.validate_token(TOKEN, "https://app.example.com") is not None
+    assert service.repository.lookups == 1
+
+
+def test_cached_token_still_checks_origin(make_service):
+    service = make_service()
+
+    assert service.validate_token(TOKEN, "https://example.com") is not None
+    assert service.validate_token(TOKEN, "https://example.com.attacker.net") is None
+    assert service.validate_token(TOKEN, None) is None
+
+
+def test_token_expiring_while_cached_is_rejected(make_service, monkeypatch):
+    service = make_service(expires_at="2030-01-01T00:00:00Z")
+    expires = _expiry_epoch("2030-01-01T00:00:00Z")
+    monkeypatch.setattr(wts.time, "time", lambda: expires - 1)
+    assert service.validate_token(TOKEN, "https://example.com") is not None
+
+    monkeypatch.setattr(wts.time, "time", lambda: expires)
+    assert service.validate_token(TOKEN, "https://example.com") is None
+    assert service.repository.lookups == 1
+
+
+def test_returned_row_does_not_alias_cache(make_service):
+    service = make_service()
+
+    first = service.validate_token(TOKEN, "https://example.com")
+    first["allowed_domains"] = ["attacker.net"]
+    first["id"] = "changed"
+
+    assert service.validate_token(TOKEN, "https://example.com")["id"] == "t1"
+
+
+def test_unknown_token_rejected(make_service):
+    assert make_service().validate_token("other-token", "https://example.com") is None
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, None),
+        ("", None),
+        ("2030-01-01T00:00:00Z", 1893456000.0),
+        ("2030-01-01T00:00:00+00:00", 1893456000.0),
+        ("2030-01-01T00:00:00", 1893456000.0),
+        ("2030-01-01T02:00:00+02:00", 1893456000.0),
+    ],
+)
+def test_expiry_epoch(value, expected):
+    assert _expiry_epoch(value) == expected
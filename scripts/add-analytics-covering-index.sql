@@ -0,0 +1,52 @@
+-- =====================================================
+-- COVERING INDEX FOR ANALYTICS QUERIES
+-- =====================================================
+-- Replaces idx_queries_bot_created (bot_id, created_at DESC)
+-- with the same key plus INCLUDE columns, so analytics reads
+-- over a bot's date window (summary stats, session counts,
+-- daily usage fallback) become index-only scans with no heap
+-- fetches.
+--
+-- CREATE/DROP INDEX CONCURRENTLY cannot run inside a
+-- transaction block: run this script with psql (not the
+-- Supabase SQL editor, which wraps scripts in a transaction).
+--
+--   psql "$DATABASE_URL" -f scripts/add-analytics-covering-index.sql
+-- =====================================================
+
+-- =====================================================
+-- 1. CREATE COVERING INDEX
+-- =====================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_queries_bot_created_covering
+    ON public.queries(bot_id, created_at DESC)
+    INCLUDE (session_id, tokens_used, prompt_tokens, completion_tokens, confidence, latency_ms);
+
+-- =====================================================
+-- 2. DROP REDUNDANT INDEX
+-- =====================================================
+
+-- Same key columns as the covering index; keeping both only
+-- doubles write cost on every logged query
+DROP INDEX CONCURRENTLY IF EXISTS public.idx_queries_bot_created;
+
+-- =====================================================
+-- 3. UPDATE TABLE STATISTICS
+-- =====================================================
+
+-- Also refreshes the visibility map used by index-only scans
+VACUUM (ANALYZE) public.queries;
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+-- Expect "Index Only Scan using idx_queries_bot_created_covering"
+-- with "Heap Fetches: 0" (or close to it right after a vacuum):
+--
+-- EXPLAIN (ANALYZE, BUFFERS)
+-- SELECT COUNT(*), COUNT(DISTINCT session_id), SUM(tokens_used),
+--        SUM(prompt_tokens), SUM(completion_tokens),
+--        AVG(confidence), AVG(latency_ms)
+-- FROM public.queries
+-- WHERE bot_id = '<bot-uuid>'
+-- AND created_at >= NOW() - INTERVAL '30 days';
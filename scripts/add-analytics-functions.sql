@@ -0,0 +1,350 @@
+-- =====================================================
+-- ANALYTICS AGGREGATION FUNCTIONS
+-- =====================================================
+-- Server-side aggregates used by AnalyticsService so the
+-- dashboard no longer pulls raw query rows into Python.
+-- Safe to re-run: the daily rollup is rebuilt from scratch
+-- and functions use CREATE OR REPLACE.
+--
+-- The backend falls back to the previous table queries if a
+-- function is missing, so this script can be applied at any time.
+-- =====================================================
+
+-- =====================================================
+-- 1. DAILY ROLLUP TABLE
+-- =====================================================
+
+-- One row per (bot, UTC day), maintained on write so 30-day
+-- dashboards read ~30 rows instead of every logged query.
+-- Sums and counts (not averages) are stored so days can be combined.
+CREATE TABLE IF NOT EXISTS public.queries_daily_stats (
+    bot_id UUID NOT NULL REFERENCES public.bots(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    query_count BIGINT NOT NULL DEFAULT 0,
+    total_tokens BIGINT NOT NULL DEFAULT 0,
+    prompt_tokens BIGINT NOT NULL DEFAULT 0,
+    completion_tokens BIGINT NOT NULL DEFAULT 0,
+    confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    confidence_count BIGINT NOT NULL DEFAULT 0,
+    latency_sum BIGINT NOT NULL DEFAULT 0,
+    latency_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bot_id, day)
+);
+
+ALTER TABLE public.queries_daily_stats ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own bot daily stats" ON public.queries_daily_stats;
+CREATE POLICY "Users can view own bot daily stats" ON public.queries_daily_stats
+    FOR SELECT USING (
+        EXISTS (
+            SELECT 1 FROM public.bots b
+            WHERE b.id = queries_daily_stats.bot_id
+            AND b.created_by = auth.uid()
+        )
+    );
+
+-- Statement-level triggers with transition tables, so the bulk
+-- DELETE in cleanup_old_queries() updates each day once
+CREATE OR REPLACE FUNCTION public.queries_daily_stats_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.queries_daily_stats AS d (
+        bot_id, day, query_count, total_tokens, prompt_tokens, completion_tokens,
+        confidence_sum, confidence_count, latency_sum, latency_count
+    )
+    SELECT
+        n.bot_id,
+        (n.created_at AT TIME ZONE 'UTC')::DATE,
+        COUNT(*),
+        COALESCE(SUM(n.tokens_used), 0),
+        COALESCE(SUM(n.prompt_tokens), 0),
+        COALESCE(SUM(n.completion_tokens), 0),
+        COALESCE(SUM(n.confidence), 0),
+        COUNT(n.confidence),
+        COALESCE(SUM(n.latency_ms), 0),
+        COUNT(n.latency_ms)
+    FROM new_rows n
+    GROUP BY 1, 2
+    ON CONFLICT (bot_id, day) DO UPDATE SET
+        query_count = d.query_count + EXCLUDED.query_count,
+        total_tokens = d.total_tokens + EXCLUDED.total_tokens,
+        prompt_tokens = d.prompt_tokens + EXCLUDED.prompt_tokens,
+        completion_tokens = d.completion_tokens + EXCLUDED.completion_tokens,
+        confidence_sum = d.confidence_sum + EXCLUDED.confidence_sum,
+        confidence_count = d.confidence_count + EXCLUDED.confidence_count,
+        latency_sum = d.latency_sum + EXCLUDED.latency_sum,
+        latency_count = d.latency_count + EXCLUDED.latency_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+CREATE OR REPLACE FUNCTION public.queries_daily_stats_on_delete()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE public.queries_daily_stats d SET
+        query_count = d.query_count - o.query_count,
+        total_tokens = d.total_tokens - o.total_tokens,
+        prompt_tokens = d.prompt_tokens - o.prompt_tokens,
+        completion_tokens = d.completion_tokens - o.completion_tokens,
+        confidence_sum = d.confidence_sum - o.confidence_sum,
+        confidence_count = d.confidence_count - o.confidence_count,
+        latency_sum = d.latency_sum - o.latency_sum,
+        latency_count = d.latency_count - o.latency_count
+    FROM (
+        SELECT
+            r.bot_id,
+            (r.created_at AT TIME ZONE 'UTC')::DATE AS day,
+            COUNT(*) AS query_count,
+            COALESCE(SUM(r.tokens_used), 0) AS total_tokens,
+            COALESCE(SUM(r.prompt_tokens), 0) AS prompt_tokens,
+            COALESCE(SUM(r.completion_tokens), 0) AS completion_tokens,
+            COALESCE(SUM(r.confidence), 0) AS confidence_sum,
+            COUNT(r.confidence) AS confidence_count,
+            COALESCE(SUM(r.latency_ms), 0) AS latency_sum,
+            COUNT(r.latency_ms) AS latency_count
+        FROM old_rows r
+        GROUP BY 1, 2
+    ) o
+    WHERE d.bot_id = o.bot_id
+    AND d.day = o.day;
+
+    DELETE FROM public.queries_daily_stats
+    WHERE query_count <= 0;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Rebuild the rollup and (re)install the triggers atomically so no
+-- query logged while the script runs is missed or counted twice
+BEGIN;
+
+LOCK TABLE public.queries IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS queries_daily_stats_insert ON public.queries;
+DROP TRIGGER IF EXISTS queries_daily_stats_delete ON public.queries;
+
+TRUNCATE public.queries_daily_stats;
+
+INSERT INTO public.queries_daily_stats (
+    bot_id, day, query_count, total_tokens, prompt_tokens, completion_tokens,
+    confidence_sum, confidence_count, latency_sum, latency_count
+)
+SELECT
+    q.bot_id,
+    (q.created_at AT TIME ZONE 'UTC')::DATE,
+    COUNT(*),
+    COALESCE(SUM(q.tokens_used), 0),
+    COALESCE(SUM(q.prompt_tokens), 0),
+    COALESCE(SUM(q.completion_tokens), 0),
+    COALESCE(SUM(q.confidence), 0),
+    COUNT(q.confidence),
+    COALESCE(SUM(q.latency_ms), 0),
+    COUNT(q.latency_ms)
+FROM public.queries q
+GROUP BY 1, 2;
+
+CREATE TRIGGER queries_daily_stats_insert
+    AFTER INSERT ON public.queries
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.queries_daily_stats_on_insert();
+
+CREATE TRIGGER queries_daily_stats_delete
+    AFTER DELETE ON public.queries
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.queries_daily_stats_on_delete();
+
+COMMIT;
+
+-- =====================================================
+-- 2. SUMMARY STATISTICS
+-- =====================================================
+
+-- Totals for queries at or after p_start. Full UTC days after p_start's
+-- day come from the rollup; the partial first day is summed from raw
+-- query rows so the window matches the other analytics exactly.
+-- Distinct sessions cannot be summed across days, so that one count
+-- still reads raw query rows.
+CREATE OR REPLACE FUNCTION public.bot_summary_stats(
+    p_bot_id UUID,
+    p_start TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE (
+    total_queries BIGINT,
+    unique_sessions BIGINT,
+    total_tokens BIGINT,
+    prompt_tokens BIGINT,
+    completion_tokens BIGINT,
+    avg_confidence DOUBLE PRECISION,
+    avg_latency_ms DOUBLE PRECISION
+) AS $$
+    WITH parts AS (
+        SELECT
+            d.query_count, d.total_tokens, d.prompt_tokens, d.completion_tokens,
+            d.confidence_sum, d.confidence_count, d.latency_sum, d.latency_count
+        FROM public.queries_daily_stats d
+        WHERE d.bot_id = p_bot_id
+        AND d.day > (p_start AT TIME ZONE 'UTC')::DATE
+        UNION ALL
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(q.tokens_used), 0),
+            COALESCE(SUM(q.prompt_tokens), 0),
+            COALESCE(SUM(q.completion_tokens), 0),
+            COALESCE(SUM(q.confidence), 0),
+            COUNT(q.confidence),
+            COALESCE(SUM(q.latency_ms), 0),
+            COUNT(q.latency_ms)
+        FROM public.queries q
+        WHERE q.bot_id = p_bot_id
+        AND q.created_at >= p_start
+        AND q.created_at < (((p_start AT TIME ZONE 'UTC')::DATE + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+    )
+    SELECT
+        COALESCE(SUM(p.query_count), 0)::BIGINT,
+        (
+            SELECT COUNT(DISTINCT q.session_id)
+            FROM public.queries q
+            WHERE q.bot_id = p_bot_id
+            AND q.created_at >= p_start
+        )::BIGINT,
+        COALESCE(SUM(p.total_tokens), 0)::BIGINT,
+        COALESCE(SUM(p.prompt_tokens), 0)::BIGINT,
+        COALESCE(SUM(p.completion_tokens), 0)::BIGINT,
+        (SUM(p.confidence_sum) / NULLIF(SUM(p.confidence_count), 0))::DOUBLE PRECISION,
+        (SUM(p.latency_sum)::DOUBLE PRECISION / NULLIF(SUM(p.latency_count), 0))::DOUBLE PRECISION
+    FROM parts p;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- 3. DAILY USAGE
+-- =====================================================
+
+-- One row per UTC day from the rollup table, except p_start's own day,
+-- which only counts queries at or after p_start (from raw rows)
+CREATE OR REPLACE FUNCTION public.bot_usage_daily(
+    p_bot_id UUID,
+    p_start TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE (
+    date DATE,
+    query_count BIGINT,
+    total_tokens BIGINT,
+    avg_confidence DOUBLE PRECISION
+) AS $$
+    SELECT
+        (p_start AT TIME ZONE 'UTC')::DATE,
+        COUNT(*),
+        COALESCE(SUM(q.tokens_used), 0)::BIGINT,
+        AVG(q.confidence)::DOUBLE PRECISION
+    FROM public.queries q
+    WHERE q.bot_id = p_bot_id
+    AND q.created_at >= p_start
+    AND q.created_at < (((p_start AT TIME ZONE 'UTC')::DATE + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+    HAVING COUNT(*) > 0
+    UNION ALL
+    SELECT
+        d.day,
+        d.query_count,
+        d.total_tokens,
+        (d.confidence_sum / NULLIF(d.confidence_count, 0))::DOUBLE PRECISION
+    FROM public.queries_daily_stats d
+    WHERE d.bot_id = p_bot_id
+    AND d.day > (p_start AT TIME ZONE 'UTC')::DATE
+    ORDER BY 1;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- 4. UNANSWERED QUERIES
+-- =====================================================
+
+-- Low-confidence or source-less queries, newest first, filtered and
+-- limited in SQL so only the rows shown on the dashboard are returned.
+-- Responses are trimmed to the 200-character preview the dashboard shows.
+CREATE OR REPLACE FUNCTION public.bot_unanswered(
+    p_bot_id UUID,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_limit INT DEFAULT 20
+)
+RETURNS TABLE (
+    query_text TEXT,
+    confidence DOUBLE PRECISION,
+    sources_count INT,
+    response_summary TEXT,
+    created_at TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        q.query_text,
+        q.confidence::DOUBLE PRECISION,
+        COALESCE(jsonb_array_length(q.returned_sources), 0),
+        LEFT(q.response_summary, 200),
+        q.created_at
+    FROM public.queries q
+    WHERE q.bot_id = p_bot_id
+    AND q.created_at >= p_start
+    AND (q.confidence < 0.3 OR COALESCE(jsonb_array_length(q.returned_sources), 0) = 0)
+    ORDER BY q.created_at DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- 5. TOP QUERIES
+-- =====================================================
+
+-- Normalized text used to group repeated questions, matching the
+-- backend's previous strip().lower()[:100] key. Adding a stored
+-- generated column rewrites the table once.
+ALTER TABLE public.queries
+    ADD COLUMN IF NOT EXISTS query_text_norm TEXT
+    GENERATED ALWAYS AS (LEFT(LOWER(BTRIM(query_text)), 100)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_queries_bot_text_norm
+    ON public.queries(bot_id, query_text_norm);
+
+-- Questions asked at least twice in the window, most frequent first
+CREATE OR REPLACE FUNCTION public.bot_top_queries(
+    p_bot_id UUID,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_limit INT DEFAULT 10
+)
+RETURNS TABLE (
+    query_text TEXT,
+    frequency BIGINT,
+    avg_confidence DOUBLE PRECISION,
+    total_tokens BIGINT,
+    first_seen TIMESTAMP WITH TIME ZONE,
+    last_seen TIMESTAMP WITH TIME ZONE
+) AS $$
+    SELECT
+        MIN(q.query_text),
+        COUNT(*)::BIGINT,
+        AVG(q.confidence)::DOUBLE PRECISION,
+        COALESCE(SUM(q.tokens_used), 0)::BIGINT,
+        MIN(q.created_at),
+        MAX(q.created_at)
+    FROM public.queries q
+    WHERE q.bot_id = p_bot_id
+    AND q.created_at >= p_start
+    GROUP BY q.query_text_norm
+    HAVING COUNT(*) >= 2
+    ORDER BY 2 DESC
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE;
+
+-- =====================================================
+-- 6. PERMISSIONS
+-- =====================================================
+
+-- Functions run as the caller, so RLS on queries still applies
+-- to authenticated users; the backend calls them as service role
+GRANT SELECT ON public.queries_daily_stats TO authenticated;
+GRANT ALL ON public.queries_daily_stats TO service_role;
+GRANT EXECUTE ON FUNCTION public.bot_summary_stats(UUID, TIMESTAMP WITH TIME ZONE) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.bot_summary_stats(UUID, TIMESTAMP WITH TIME ZONE) TO service_role;
+GRANT EXECUTE ON FUNCTION public.bot_usage_daily(UUID, TIMESTAMP WITH TIME ZONE) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.bot_usage_daily(UUID, TIMESTAMP WITH TIME ZONE) TO service_role;
+GRANT EXECUTE ON FUNCTION public.bot_unanswered(UUID, TIMESTAMP WITH TIME ZONE, INT) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.bot_unanswered(UUID, TIMESTAMP WITH TIME ZONE, INT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.bot_top_queries(UUID, TIMESTAMP WITH TIME ZONE, INT) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.bot_top_queries(UUID, TIMESTAMP WITH TIME ZONE, INT) TO service_role;
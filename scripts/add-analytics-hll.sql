@@ -0,0 +1,147 @@
+-- =====================================================
+-- APPROXIMATE UNIQUE SESSIONS (HYPERLOGLOG) - OPTIONAL
+-- =====================================================
+-- Adds a per-day HyperLogLog sketch of session_id to
+-- queries_daily_stats so bot_summary_stats can estimate
+-- unique sessions (~1% error) by merging ~30 small sketches
+-- instead of COUNT(DISTINCT) over every raw query row.
+--
+-- Requires the `hll` extension (Database -> Extensions in
+-- the Supabase dashboard) and add-analytics-functions.sql.
+-- Re-run this script after add-analytics-functions.sql, which
+-- rebuilds the rollup and redefines bot_summary_stats.
+-- =====================================================
+
+CREATE EXTENSION IF NOT EXISTS hll;
+
+-- =====================================================
+-- 1. SKETCH COLUMN AND TRIGGER
+-- =====================================================
+
+ALTER TABLE public.queries_daily_stats
+    ADD COLUMN IF NOT EXISTS session_hll hll NOT NULL DEFAULT hll_empty();
+
+-- Separate trigger so add-analytics-functions.sql stays independent of
+-- the extension. Both triggers upsert, so their firing order does not matter.
+-- Sketches cannot be decremented: deleted queries leave their sessions in
+-- the day's sketch until the whole day is removed by retention cleanup.
+CREATE OR REPLACE FUNCTION public.queries_daily_stats_hll_on_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.queries_daily_stats AS d (bot_id, day, session_hll)
+    SELECT
+        n.bot_id,
+        (n.created_at AT TIME ZONE 'UTC')::DATE,
+        hll_add_agg(hll_hash_text(n.session_id))
+    FROM new_rows n
+    GROUP BY 1, 2
+    ON CONFLICT (bot_id, day) DO UPDATE SET
+        session_hll = hll_union(d.session_hll, EXCLUDED.session_hll);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+BEGIN;
+
+LOCK TABLE public.queries IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS queries_daily_stats_hll_insert ON public.queries;
+
+UPDATE public.queries_daily_stats d
+SET session_hll = s.session_hll
+FROM (
+    SELECT
+        q.bot_id,
+        (q.created_at AT TIME ZONE 'UTC')::DATE AS day,
+        hll_add_agg(hll_hash_text(q.session_id)) AS session_hll
+    FROM public.queries q
+    GROUP BY 1, 2
+) s
+WHERE d.bot_id = s.bot_id
+AND d.day = s.day;
+
+CREATE TRIGGER queries_daily_stats_hll_insert
+    AFTER INSERT ON public.queries
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.queries_daily_stats_hll_on_insert();
+
+COMMIT;
+
+-- =====================================================
+-- 2. SUMMARY STATISTICS
+-- =====================================================
+
+-- Same result shape and window as add-analytics-functions.sql: full UTC
+-- days after p_start's day from the rollup, the partial first day from raw
+-- query rows. Exact distinct counts are kept for windows up to 1M queries;
+-- above that the merged daily sketches are used.
+CREATE OR REPLACE FUNCTION public.bot_summary_stats(
+    p_bot_id UUID,
+    p_start TIMESTAMP WITH TIME ZONE
+)
+RETURNS TABLE (
+    total_queries BIGINT,
+    unique_sessions BIGINT,
+    total_tokens BIGINT,
+    prompt_tokens BIGINT,
+    completion_tokens BIGINT,
+    avg_confidence DOUBLE PRECISION,
+    avg_latency_ms DOUBLE PRECISION
+) AS $$
+    WITH parts AS (
+        SELECT
+            d.query_count, d.total_tokens, d.prompt_tokens, d.completion_tokens,
+            d.confidence_sum, d.confidence_count, d.latency_sum, d.latency_count,
+            d.session_hll
+        FROM public.queries_daily_stats d
+        WHERE d.bot_id = p_bot_id
+        AND d.day > (p_start AT TIME ZONE 'UTC')::DATE
+        UNION ALL
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(q.tokens_used), 0),
+            COALESCE(SUM(q.prompt_tokens), 0),
+            COALESCE(SUM(q.completion_tokens), 0),
+            COALESCE(SUM(q.confidence), 0),
+            COUNT(q.confidence),
+            COALESCE(SUM(q.latency_ms), 0),
+            COUNT(q.latency_ms),
+            COALESCE(hll_add_agg(hll_hash_text(q.session_id)), hll_empty())
+        FROM public.queries q
+        WHERE q.bot_id = p_bot_id
+        AND q.created_at >= p_start
+        AND q.created_at < (((p_start AT TIME ZONE 'UTC')::DATE + 1)::TIMESTAMP AT TIME ZONE 'UTC')
+    ),
+    totals AS (
+        SELECT
+            COALESCE(SUM(p.query_count), 0)::BIGINT AS total_queries,
+            COALESCE(SUM(p.total_tokens), 0)::BIGINT AS total_tokens,
+            COALESCE(SUM(p.prompt_tokens), 0)::BIGINT AS prompt_tokens,
+            COALESCE(SUM(p.completion_tokens), 0)::BIGINT AS completion_tokens,
+            (SUM(p.confidence_sum) / NULLIF(SUM(p.confidence_count), 0))::DOUBLE PRECISION AS avg_confidence,
+            (SUM(p.latency_sum)::DOUBLE PRECISION / NULLIF(SUM(p.latency_count), 0))::DOUBLE PRECISION AS avg_latency_ms,
+            hll_cardinality(hll_union_agg(p.session_hll)) AS approx_sessions
+        FROM parts p
+    )
+    SELECT
+        t.total_queries,
+        CASE
+            WHEN t.total_queries > 1000000 THEN COALESCE(ROUND(t.approx_sessions), 0)::BIGINT
+            ELSE (
+                SELECT COUNT(DISTINCT q.session_id)
+                FROM public.queries q
+                WHERE q.bot_id = p_bot_id
+                AND q.created_at >= p_start
+            )::BIGINT
+        END,
+        t.total_tokens,
+        t.prompt_tokens,
+        t.completion_tokens,
+        t.avg_confidence,
+        t.avg_latency_ms
+    FROM totals t;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION public.bot_summary_stats(UUID, TIMESTAMP WITH TIME ZONE) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.bot_summary_stats(UUID, TIMESTAMP WITH TIME ZONE) TO service_role;
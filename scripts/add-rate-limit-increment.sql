@@ -0,0 +1,27 @@
+-- =====================================================
+-- ATOMIC RATE LIMIT INCREMENT
+-- =====================================================
+-- Used by RateLimitRepository.add_to_window: each replica
+-- periodically adds its locally counted requests to the shared
+-- per-minute window. The upsert increments in one statement, so
+-- concurrent flushes from several replicas never overwrite each
+-- other's counts.
+-- Safe to re-run (CREATE OR REPLACE).
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.add_rate_limit_count(
+    p_bot_id UUID,
+    p_window_start TIMESTAMP WITH TIME ZONE,
+    p_delta INTEGER
+)
+RETURNS INTEGER AS $$
+    INSERT INTO public.rate_limits AS r (bot_id, window_start, count)
+    VALUES (p_bot_id, p_window_start, p_delta)
+    ON CONFLICT (bot_id, window_start)
+    DO UPDATE SET count = r.count + EXCLUDED.count
+    RETURNING r.count;
+$$ LANGUAGE sql VOLATILE;
+
+-- Rate limiting is internal: only the backend (service role) calls it
+REVOKE EXECUTE ON FUNCTION public.add_rate_limit_count(UUID, TIMESTAMP WITH TIME ZONE, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.add_rate_limit_count(UUID, TIMESTAMP WITH TIME ZONE, INTEGER) TO service_role;
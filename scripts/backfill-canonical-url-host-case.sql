@@ -0,0 +1,38 @@
+-- =====================================================
+-- BACKFILL: LOWERCASE HOSTS IN STORED SOURCE URLS
+-- =====================================================
+-- New URL sources are stored with a lowercased host (userinfo,
+-- port, path and query are kept as given). This rewrites rows
+-- created before that change so the same site always has the same
+-- canonical_url. URL sources store the canonical URL as their
+-- storage_path too, so that is updated for html sources.
+-- Safe to re-run: rows whose host is already lowercase are skipped.
+-- =====================================================
+
+BEGIN;
+
+WITH parts AS (
+    SELECT id, regexp_match(canonical_url, '^(https?://)([^/?#]*@)?(\[[^]]*\]|[^/?#:]*)(.*)$') AS m
+    FROM public.sources
+    WHERE canonical_url IS NOT NULL
+)
+UPDATE public.sources s
+SET canonical_url = p.m[1] || COALESCE(p.m[2], '') || lower(p.m[3]) || p.m[4]
+FROM parts p
+WHERE s.id = p.id
+AND p.m IS NOT NULL
+AND p.m[3] <> lower(p.m[3]);
+
+WITH parts AS (
+    SELECT id, regexp_match(storage_path, '^(https?://)([^/?#]*@)?(\[[^]]*\]|[^/?#:]*)(.*)$') AS m
+    FROM public.sources
+    WHERE source_type = 'html'
+)
+UPDATE public.sources s
+SET storage_path = p.m[1] || COALESCE(p.m[2], '') || lower(p.m[3]) || p.m[4]
+FROM parts p
+WHERE s.id = p.id
+AND p.m IS NOT NULL
+AND p.m[3] <> lower(p.m[3]);
+
+COMMIT;